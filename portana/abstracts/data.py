@@ -1,9 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Dict, Union
+from typing import List, Tuple, Dict, Type, Union, Hashable
+import asyncio
 
 from .timeseries import AbstractTimeSeries
 
-
 """ Defines abstract classes used for data interfaces and representation
 """
 
@@ -76,6 +76,8 @@ class AbstractSecurity(ABC):
         Security's exposure data
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def get_isin(self):
         """Getter for attribute Security.isin
@@ -121,8 +123,57 @@ class AbstractSecurity(ABC):
         pass
 
 
+class AbstractSecurityPanel(ABC):
+    """Abstract class holding time series and fields of many securities at once,
+    returned by bulk fetches of connections
+    """
+
+    @classmethod
+    @abstractmethod
+    def from_securities(
+        cls, securities: List[AbstractSecurity]
+    ) -> "AbstractSecurityPanel":
+        """Build a panel from securities
+
+        Parameters
+        -------
+        securities: List[AbstractSecurity]
+            Securities to hold
+
+        Returns
+        -------
+        AbstractSecurityPanel
+            Panel of the securities
+        """
+        pass
+
+    @abstractmethod
+    def get_isins(self) -> List[str]:
+        """Returns ISINs of the panel's securities"""
+        pass
+
+    @abstractmethod
+    def get_security(self, isin: str) -> AbstractSecurity:
+        """Returns one security of the panel"""
+        pass
+
+    @abstractmethod
+    def get_securities(self) -> List[AbstractSecurity]:
+        """Returns every security of the panel, in order"""
+        pass
+
+
 class AbstractConnection(ABC):
-    """Abstract class for database connections"""
+    """Abstract class for database connections
+
+
+    Attributes
+    -------
+    panel_class: Type[AbstractSecurityPanel]
+        Class of the panels returned by get_securities
+    """
+
+    panel_class: Type[AbstractSecurityPanel] = None
 
     @abstractmethod
     def get_security(self, isin: str, date_range: Tuple[str, str]) -> AbstractSecurity:
@@ -142,6 +193,105 @@ class AbstractConnection(ABC):
         """
         pass
 
+    def get_source(self) -> Hashable:
+        """Get a key identifying the data this connection returns
+
+        Connections with equal sources return the same data for the same ISIN
+        and date range, so that their securities can be shared,
+        see portana.data.registry. Defaults to the connection itself.
+
+        Returns
+        -------
+        Hashable
+            Key of the connection's data
+        """
+        return self
+
+    def get_securities(self, isins: List[str], date_range: Tuple[str, str]):
+        """Retrieve many securities and their data from database at once
+
+        Defaults to one get_security call per ISIN, connections able to
+        fetch in bulk should override it.
+
+        Parameters
+        -------
+        isins: List[str]
+            Securities' ISINs (unique identifiers)
+        date_range: Tuple[str, str]
+            Date range by which to retrive data from. Should be in "yyyy-mm-dd" format.
+
+        Returns
+        -------
+        AbstractSecurityPanel
+            Panel of time series, descriptions and exposures of every security
+        """
+        if self.panel_class is None:
+            raise NotImplementedError(f"{type(self).__name__} has no panel_class")
+
+        return self.panel_class.from_securities(
+            [self.get_security(isin, date_range) for isin in isins]
+        )
+
+
+class AsyncAbstractConnection(ABC):
+    """Abstract class for asynchronous database connections
+
+
+    Attributes
+    -------
+    panel_class: Type[AbstractSecurityPanel]
+        Class of the panels returned by get_securities
+    """
+
+    panel_class: Type[AbstractSecurityPanel] = None
+
+    @abstractmethod
+    async def get_security(
+        self, isin: str, date_range: Tuple[str, str]
+    ) -> AbstractSecurity:
+        """Retrieve security and data from database by isin and date_range
+
+        Parameters
+        -------
+        isin: str
+            Security's ISIN (unique identifier)
+        date_range: Tuple[str, str]
+            Date range by which to retrive data from. Should be in "yyyy-mm-dd" format.
+
+        Returns
+        -------
+        AbstractSecurity
+            Class containing information of the security
+        """
+        pass
+
+    async def get_securities(self, isins: List[str], date_range: Tuple[str, str]):
+        """Retrieve many securities and their data from database at once
+
+        Defaults to concurrent get_security calls, one per ISIN, connections able to
+        fetch in bulk should override it.
+
+        Parameters
+        -------
+        isins: List[str]
+            Securities' ISINs (unique identifiers)
+        date_range: Tuple[str, str]
+            Date range by which to retrive data from. Should be in "yyyy-mm-dd" format.
+
+        Returns
+        -------
+        AbstractSecurityPanel
+            Panel of time series, descriptions and exposures of every security
+        """
+        if self.panel_class is None:
+            raise NotImplementedError(f"{type(self).__name__} has no panel_class")
+
+        securities = await asyncio.gather(
+            *(self.get_security(isin, date_range) for isin in isins)
+        )
+
+        return self.panel_class.from_securities(list(securities))
+
 
 class AbstractQuery(ABC):
     """Class for sending queries to database"""
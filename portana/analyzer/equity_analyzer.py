@@ -5,6 +5,7 @@ import numpy as np
 from ..abstracts import data
 from ..abstracts import analyzer
 from ..timeseries.analyzerseries import AnalyzerSeries
+from ..data.async_connection import resolve_universe
 
 # Not Implemented
 # -------------------------------------
@@ -129,6 +130,13 @@ class EquityAnalyzer(analyzer.AbstractAnalyzer):
 
         return series, index
 
+    def __update(self) -> None:
+        self.__build_col_names()
+        self.__update_earliest_common_date()
+        self.__update_latest_common_date()
+        self.__build_dates()
+        self.__build_series()
+
     def add_security(self, security: data.AbstractSecurity) -> None:
         """Add a Security to analyze
 
@@ -142,18 +150,29 @@ class EquityAnalyzer(analyzer.AbstractAnalyzer):
         -------
         -   Check data frequency of incoming security, convert all security
             to a lower freq if necessary
-        -   Add a update routine function to wrap all the individual calls
         """
         self.securities.append(security)
 
         if self.comp_index is None:
-            self.set_comp_index(security)
+            self.comp_index = security
 
-        self.__build_col_names()
-        self.__update_earliest_common_date()
-        self.__update_latest_common_date()
-        self.__build_dates()
-        self.__build_series()
+        self.__update()
+
+    def add_securities(self, securities: List[data.AbstractSecurity]) -> None:
+        """Add a list of Securities to analyze, building series only once
+
+        Parameters
+        -------
+        securities: List[AbstractSecurity]
+            Securities to be analyzed, or a SecurityPanel of them, or an awaitable
+            returning either (e.g. AsyncFetcher.fetch(isins, date_range))
+        """
+        self.securities.extend(resolve_universe(securities))
+
+        if self.comp_index is None:
+            self.comp_index = self.securities[0]
+
+        self.__update()
 
     def set_comp_index(self, comp_index: data.AbstractSecurity) -> None:
         """Add a benchmark to compare against
@@ -177,10 +196,7 @@ class EquityAnalyzer(analyzer.AbstractAnalyzer):
             to a lower freq if necessary
         """
         self.comp_index = comp_index
-        self.__update_earliest_common_date()
-        self.__update_latest_common_date()
-        self.__build_dates()
-        self.__build_series()
+        self.__update()
 
     def get_rebased_index(
         self, mode: Literal["px", "tr"], initial_val: float = 100.0
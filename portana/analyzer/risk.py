@@ -0,0 +1,309 @@
+from typing import List, Dict, Literal, Tuple
+
+import numpy as np
+
+from ..abstracts import data
+from ..abstracts import analyzer
+from ..timeseries.analyzerseries import AnalyzerSeries
+from .equity_analyzer import EquityAnalyzer
+
+
+class RiskAnalyzer(analyzer.AbstractAnalyzer):
+    """Class to run historical-simulation risk on many portfolios at once
+
+
+    Every portfolio is represented by a row of weights over a shared universe of
+    securities, so that the returns of K portfolios over history are a single
+    (T x N) @ (N x K) matrix product. Portfolios added through add_portfolio are
+    represented by their latest drifted weights.
+
+
+    Attributes
+    -------
+    securities: List[AbstractSecurity]
+        Universe of securities held by the portfolios
+    comp_index: AbstractSecurity
+        Benchmark used to find stress windows
+    portfolio_names: List[str]
+        Name of each portfolio, in the order they were added
+
+
+    Example
+    -------
+    >>> risk = RiskAnalyzer()
+    >>> risk.set_comp_index(index)
+    >>> for portfolio in portfolios:
+    ...     risk.add_portfolio(portfolio)
+    >>> risk.get_vars("tr", 0.99).to_df()
+                Portfolio 1  Portfolio 2  ...
+    2020-12-31    -0.031822    -0.024417  ...
+    >>> risk.get_stress_returns("tr", length=20).to_df()
+    """
+
+    def __init__(self):
+        self.securities: List[data.AbstractSecurity] = []
+        self.comp_index: data.AbstractSecurity = None
+        self.portfolio_names: List[str] = []
+
+        self._isins: Dict[str, int] = {}
+        self._weights: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._analyzer: EquityAnalyzer = None
+
+    def __add_to_universe(self, securities: List[data.AbstractSecurity]) -> np.ndarray:
+        cols = []
+        for security in securities:
+            isin = security.get_isin()
+            if isin not in self._isins:
+                self._isins[isin] = len(self.securities)
+                self.securities.append(security)
+                self._analyzer = None
+
+            cols.append(self._isins[isin])
+
+        return np.array(cols, dtype=np.int64)
+
+    def __get_analyzer(self) -> EquityAnalyzer:
+        if self._analyzer is None:
+            self._analyzer = EquityAnalyzer()
+            if self.comp_index is not None:
+                self._analyzer.comp_index = self.comp_index
+            self._analyzer.add_securities(self.securities)
+
+        return self._analyzer
+
+    def __get_weights_matrix(self) -> np.ndarray:
+        weights = np.zeros((len(self._weights), len(self.securities)), dtype=np.float64)
+        for row, (cols, values) in enumerate(self._weights):
+            np.add.at(weights[row], cols, values)
+
+        return weights
+
+    def __get_levels(
+        self, mode: Literal["px", "tr"]
+    ) -> Tuple[AnalyzerSeries, AnalyzerSeries]:
+        return self.__get_analyzer().get_rebased_index(mode, 1.0)
+
+    def __get_tail(
+        self, mode: Literal["px", "tr"], level: float
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        returns = self.get_returns(mode)
+        results = returns.get_data()
+
+        # Select the k smallest returns of each portfolio in O(T) instead of sorting
+        k = min(int(np.floor(len(results) * (1 - level))), len(results) - 1)
+        tail = np.partition(results, k, axis=0)
+
+        return returns.get_dates()[[-1]], tail, k
+
+    def add_security(self, security: data.AbstractSecurity) -> None:
+        """Add a security to the universe
+
+        Parameters
+        -------
+        security: AbstractSecurity
+            Security that portfolios can hold
+        """
+        self.__add_to_universe([security])
+
+    def set_comp_index(self, comp_index: data.AbstractSecurity) -> None:
+        """Set the benchmark whose worst windows are replayed as stress scenarios
+
+        Parameters
+        -------
+        comp_index: AbstractSecurity
+            A Security containing the benchmark
+        """
+        self.comp_index = comp_index
+        self._analyzer = None
+
+    def add_portfolio(self, portfolio, name: str = None) -> None:
+        """Add a portfolio, represented by its latest drifted weights
+
+        Parameters
+        -------
+        portfolio: Portfolio
+            Portfolio to analyze
+        name: str
+            Name of the portfolio, defaults to portfolio.name
+        """
+        cols = self.__add_to_universe(portfolio.securities)
+        weights = portfolio.get_weights_timeseries().get_data()[-1]
+
+        self._weights.append((cols, weights.copy()))
+        self.portfolio_names.append(portfolio.name if name is None else name)
+
+    def add_weights(self, weights: np.ndarray, names: List[str]) -> None:
+        """Add portfolios as rows of weights over the current universe
+
+        Parameters
+        -------
+        weights: numpy.ndarray
+            (K x N) matrix of weights, with columns in the order of securities
+        names: List[str]
+            Name of each of the K portfolios
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        if weights.ndim != 2 or weights.shape[1] != len(self.securities):
+            raise ValueError(
+                f"weights must have one column per security ({len(self.securities)}), "
+                f"got shape {weights.shape}"
+            )
+        if len(names) != len(weights):
+            raise ValueError("names must have one name per row of weights")
+
+        cols = np.arange(weights.shape[1])
+
+        for row in weights:
+            active = np.flatnonzero(row)
+            self._weights.append((cols[active], row[active]))
+
+        self.portfolio_names.extend(names)
+
+    def get_returns(self, mode: Literal["px", "tr"]) -> AnalyzerSeries:
+        """Get historical returns of every portfolio
+
+
+        Parameters
+        -------
+        mode: str
+            "px" for price returns, "tr" for total returns
+
+
+        Returns
+        -------
+        AnalyzerSeries
+            (T x K) AnalyzerSeries of portfolio returns
+        """
+        returns, _ = self.__get_analyzer().get_returns(mode)
+        results = returns.get_data() @ self.__get_weights_matrix().transpose()
+
+        return AnalyzerSeries(returns.get_dates(), results, self.portfolio_names)
+
+    def get_vars(
+        self, mode: Literal["px", "tr"], level: float = 0.95
+    ) -> AnalyzerSeries:
+        """Get historical Value at Risk of every portfolio
+
+
+        Parameters
+        -------
+        mode: str
+            "px" for price returns, "tr" for total returns
+        level: float
+            Confidence level, defaults to 0.95
+
+
+        Note
+        -------
+        VaR is reported as a return, so losses are negative like drawdowns.
+        It is the k-th smallest historical return, with k = floor(T * (1 - level)).
+
+
+        Returns
+        -------
+        AnalyzerSeries
+            (1 x K) AnalyzerSeries of VaRs, dated on the last date analyzed
+        """
+        dates, tail, k = self.__get_tail(mode, level)
+
+        return AnalyzerSeries(dates, tail[[k]], self.portfolio_names)
+
+    def get_cvars(
+        self, mode: Literal["px", "tr"], level: float = 0.95
+    ) -> AnalyzerSeries:
+        """Get historical Conditional Value at Risk (expected shortfall) of every portfolio
+
+
+        Parameters
+        -------
+        mode: str
+            "px" for price returns, "tr" for total returns
+        level: float
+            Confidence level, defaults to 0.95
+
+
+        Note
+        -------
+        CVaR is the average of returns at or below VaR, reported as a return.
+
+
+        Returns
+        -------
+        AnalyzerSeries
+            (1 x K) AnalyzerSeries of CVaRs, dated on the last date analyzed
+        """
+        dates, tail, k = self.__get_tail(mode, level)
+
+        return AnalyzerSeries(
+            dates, tail[: k + 1].mean(axis=0, keepdims=True), self.portfolio_names
+        )
+
+    def get_worst_window(
+        self, mode: Literal["px", "tr"], length: int = 20
+    ) -> Tuple[np.datetime64, np.datetime64]:
+        """Get the window of the benchmark with the worst return
+
+
+        Parameters
+        -------
+        mode: str
+            "px" for price returns, "tr" for total returns
+        length: int
+            Number of periods in the window, defaults to 20
+
+
+        Returns
+        -------
+        Tuple[numpy.datetime64, numpy.datetime64]
+            Start and end dates of the window
+        """
+        _, index = self.__get_levels(mode)
+        levels = index.get_data().ravel()
+        dates = index.get_dates()
+
+        length = min(length, len(levels) - 1)
+        start = np.argmin(levels[length:] / levels[:-length])
+
+        return dates[start], dates[start + length]
+
+    def get_stress_returns(
+        self,
+        mode: Literal["px", "tr"],
+        date_range: Tuple[str, str] = None,
+        length: int = 20,
+    ) -> AnalyzerSeries:
+        """Replay a stress window on every portfolio
+
+
+        Parameters
+        -------
+        mode: str
+            "px" for price returns, "tr" for total returns
+        date_range: Tuple[str, str]
+            Window to replay, defaults to the benchmark's worst window of length periods
+        length: int
+            Number of periods in the worst window, used if date_range is None
+
+
+        Returns
+        -------
+        AnalyzerSeries
+            (1 x K) AnalyzerSeries of portfolio returns over the window,
+            dated on the last date of the window
+        """
+        if date_range is None:
+            date_range = self.get_worst_window(mode, length)
+
+        series, _ = self.__get_levels(mode)
+        window = series[str(date_range[0]) : str(date_range[1])]
+        levels = window.get_data()
+
+        shocks = levels[-1] / levels[0] - 1
+        results = self.__get_weights_matrix() @ shocks
+
+        return AnalyzerSeries(
+            window.get_dates()[[-1]], results[np.newaxis], self.portfolio_names
+        )
+
+    def analyze(self):
+        pass
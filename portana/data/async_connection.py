@@ -0,0 +1,196 @@
+from typing import List, Tuple, Union, Awaitable
+from concurrent.futures import Executor, ThreadPoolExecutor
+import asyncio
+import inspect
+
+from ..abstracts import data
+from .panel import SecurityPanel
+
+"""Asynchronous access to database connections
+
+A remote database is latency-bound: fetching a universe one security at a time
+costs one round trip per security. AsyncFetcher sends batches of ISINs
+concurrently, so that a universe costs about one round trip as long as
+max_concurrency * batch_size covers it.
+
+
+Example
+-------
+>>> connection = SimConnection()
+>>> connection.set_asset_type(SimEquityAssetType())
+>>> connection.set_latency(0.1)
+>>> fetcher = AsyncFetcher(ThreadedConnection(connection), batch_size=50)
+>>> analyzer = EquityAnalyzer()
+>>> analyzer.add_securities(fetcher.fetch(isins, ("2020-01-01", "2020-12-31")))
+"""
+
+
+class ThreadedConnection(data.AsyncAbstractConnection):
+    """Asynchronous adapter running a synchronous connection in a thread pool
+
+    A concrete implementation of AsyncAbstractConnection.
+
+
+    Parameters
+    -------
+    connection: AbstractConnection
+        Synchronous connection to run, must be safe to call from several threads
+    executor: Executor
+        Thread pool running the calls, default None (the event loop's default pool)
+    """
+
+    panel_class = SecurityPanel
+
+    def __init__(self, connection: data.AbstractConnection, executor: Executor = None):
+        self.connection = connection
+        self.executor = executor
+
+    async def get_security(
+        self, isin: str, date_range: Tuple[str, str]
+    ) -> data.AbstractSecurity:
+        """Returns a security by ISIN and date range, fetched in a thread
+
+
+        Parameters
+        -------
+        isin: str
+        date_range: Tuple[str, str]
+
+        Returns
+        -------
+        AbstractSecurity
+            Security returned by the wrapped connection
+        """
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(
+            self.executor, self.connection.get_security, isin, date_range
+        )
+
+    async def get_securities(
+        self, isins: List[str], date_range: Tuple[str, str]
+    ) -> SecurityPanel:
+        """Returns securities by ISINs and date range, fetched in bulk in a thread
+
+
+        Parameters
+        -------
+        isins: List[str]
+        date_range: Tuple[str, str]
+
+        Returns
+        -------
+        SecurityPanel
+            Panel returned by the wrapped connection's get_securities
+        """
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(
+            self.executor, self.connection.get_securities, isins, date_range
+        )
+
+
+class AsyncFetcher:
+    """Class to fetch many securities with bounded concurrency
+
+    ISINs are split into batches of batch_size, each fetched with one
+    get_securities call, and at most max_concurrency calls are in flight at once.
+
+
+    Parameters
+    -------
+    connection: AsyncAbstractConnection
+        Connection to fetch from
+    max_concurrency: int
+        Maximum number of requests in flight, default 8
+    batch_size: int
+        Number of ISINs per request, default 100
+    """
+
+    def __init__(
+        self,
+        connection: data.AsyncAbstractConnection,
+        max_concurrency: int = 8,
+        batch_size: int = 100,
+    ):
+        self.connection = connection
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+
+    async def fetch(
+        self, isins: List[str], date_range: Tuple[str, str]
+    ) -> SecurityPanel:
+        """Fetch securities by ISINs and date range
+
+
+        Parameters
+        -------
+        isins: List[str]
+        date_range: Tuple[str, str]
+
+        Returns
+        -------
+        SecurityPanel
+            Panel of every security, in the order of isins
+        """
+        isins = list(isins)
+        if not isins:
+            return SecurityPanel.from_securities([])
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_batch(batch: List[str]) -> SecurityPanel:
+            async with semaphore:
+                return await self.connection.get_securities(batch, date_range)
+
+        panels = await asyncio.gather(
+            *(
+                fetch_batch(isins[start : start + self.batch_size])
+                for start in range(0, len(isins), self.batch_size)
+            )
+        )
+
+        return SecurityPanel.concat(list(panels))
+
+
+async def _await(awaitable: Awaitable):
+    return await awaitable
+
+
+def resolve_universe(
+    universe: Union[
+        List[data.AbstractSecurity], SecurityPanel, Awaitable[SecurityPanel]
+    ],
+) -> List[data.AbstractSecurity]:
+    """Get securities of a universe given as a list, a panel or an awaitable of either
+
+    An awaitable is run to completion on a new event loop. When called from a running
+    event loop (e.g. in a notebook), it is run on a new loop in another thread,
+    so it must not depend on the running loop.
+
+
+    Parameters
+    -------
+    universe: Union[List[AbstractSecurity], SecurityPanel, Awaitable]
+        Securities, or a panel of them, or an awaitable returning either,
+        such as AsyncFetcher.fetch(isins, date_range)
+
+
+    Returns
+    -------
+    List[AbstractSecurity]
+        Securities of the universe
+    """
+    if inspect.isawaitable(universe):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            universe = asyncio.run(_await(universe))
+        else:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                universe = executor.submit(asyncio.run, _await(universe)).result()
+
+    if isinstance(universe, SecurityPanel):
+        return universe.get_securities()
+
+    return list(universe)
@@ -0,0 +1,229 @@
+from typing import Dict, Tuple
+from collections import OrderedDict
+import copy
+import threading
+
+import numpy as np
+
+from ..abstracts import data
+from .panel import SecurityPanel
+from ..timeseries.securitytimeseries import SecurityTimeSeries
+
+"""Memoizing cache in front of any database connection
+
+Each ISIN is cached once, over the union of every date range fetched for it.
+A request within the cached range is served as a zero-copy slice of the cached
+arrays, a request reaching outside of it only fetches the missing dates and merges
+them into the cached range.
+"""
+
+_DAY = np.timedelta64(1, "D")
+
+
+class _Entry:
+    """Cached security and the date range it covers"""
+
+    def __init__(self, security: data.AbstractSecurity, start, end):
+        self.security = security
+        self.start: np.datetime64 = start
+        self.end: np.datetime64 = end
+
+        timeseries = security.get_timeseries()
+        self.dates: np.ndarray = timeseries.get_dates()
+        self.prices, self.tot_ret_idx = timeseries.get_data()
+
+        # Slices handed out share memory with the cache, protect it
+        for array in (self.dates, self.prices, self.tot_ret_idx):
+            array.flags.writeable = False
+
+        self.nbytes: int = self.dates.nbytes + self.prices.nbytes
+        self.nbytes += self.tot_ret_idx.nbytes
+
+    def get_security(self, start, end) -> data.AbstractSecurity:
+        first, last = np.searchsorted(self.dates, [start, end + _DAY])
+
+        security = copy.copy(self.security)
+        security.timeseries = SecurityTimeSeries(
+            self.dates[first:last],
+            self.prices[first:last],
+            self.tot_ret_idx[first:last],
+        )
+
+        return security
+
+
+class CachedConnection(data.AbstractConnection):
+    """Connection caching securities fetched through another connection
+
+    A concrete implementation of AbstractConnection, wrapping any other connection.
+
+
+    Parameters
+    -------
+    connection: AbstractConnection
+        Connection to fetch securities from
+    max_bytes: int
+        Maximum total size of cached time series in bytes, least recently used
+        securities are evicted past it, default 256 MB
+
+
+    Attributes
+    -------
+    hits: int
+        Number of requests served from the cache only
+    misses: int
+        Number of requests that fetched data from connection
+    evictions: int
+        Number of securities evicted to stay within max_bytes
+    nbytes: int
+        Total size of cached time series in bytes
+
+
+    Note
+    -------
+    Merging cached and newly fetched dates assumes that the wrapped connection
+    returns the same data for a date whatever the date range requested,
+    as SimConnection does.
+
+
+    Example
+    -------
+    >>> connection = SimConnection()
+    >>> connection.set_asset_type(SimEquityAssetType())
+    >>> cached = CachedConnection(connection)
+    >>> cached.get_security("15000", ("2000-01-01", "2020-12-31"))
+    >>> cached.get_security("15000", ("2019-01-01", "2019-12-31"))  # zero-copy slice
+    >>> cached.get_stats()
+    {'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 1, 'bytes': 184104}
+    """
+
+    panel_class = SecurityPanel
+
+    def __init__(self, connection: data.AbstractConnection, max_bytes: int = 2**28):
+        self.connection = connection
+        self.max_bytes = max_bytes
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.nbytes: int = 0
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_source(self):
+        """Returns the source of the wrapped connection"""
+        return self.connection.get_source()
+
+    def __fetch(self, isin: str, start, end) -> data.AbstractSecurity:
+        return self.connection.get_security(isin, (str(start), str(end)))
+
+    def __merge(self, entry: _Entry, isin: str, start, end) -> _Entry:
+        """Fetch dates of start to end missing from entry, merged into a new entry"""
+        parts = [entry.security]
+        if start < entry.start:
+            parts.insert(0, self.__fetch(isin, start, entry.start - _DAY))
+        if end > entry.end:
+            parts.append(self.__fetch(isin, entry.end + _DAY, end))
+
+        timeseries = [part.get_timeseries() for part in parts]
+        levels = [part.get_data() for part in timeseries]
+
+        security = copy.copy(entry.security)
+        security.timeseries = SecurityTimeSeries(
+            np.concatenate([part.get_dates() for part in timeseries]),
+            np.concatenate([prices for prices, _ in levels]),
+            np.concatenate([tot_ret_idx for _, tot_ret_idx in levels]),
+        )
+
+        return _Entry(security, min(start, entry.start), max(end, entry.end))
+
+    def __store(self, isin: str, entry: _Entry) -> None:
+        with self._lock:
+            if isin in self._entries:
+                self.nbytes -= self._entries.pop(isin).nbytes
+
+            self._entries[isin] = entry
+            self.nbytes += entry.nbytes
+
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def get_security(
+        self, isin: str, date_range: Tuple[str, str]
+    ) -> data.AbstractSecurity:
+        """Returns a security by ISIN and date range, from the cache if possible
+
+
+        Parameters
+        -------
+        isin: str
+        date_range: Tuple[str, str]
+
+        Returns
+        -------
+        AbstractSecurity
+            Security returned by the wrapped connection, whose time series is
+            a read-only view of the cache
+        """
+        isin = str(isin)
+        start = np.datetime64(date_range[0], "D")
+        end = np.datetime64(date_range[1], "D")
+
+        with self._lock:
+            entry = self._entries.get(isin)
+            if entry is not None:
+                self._entries.move_to_end(isin)
+
+            if entry is not None and entry.start <= start and end <= entry.end:
+                self.hits += 1
+                return entry.get_security(start, end)
+
+            self.misses += 1
+
+        if entry is None:
+            entry = _Entry(self.__fetch(isin, start, end), start, end)
+        else:
+            entry = self.__merge(entry, isin, start, end)
+
+        self.__store(isin, entry)
+
+        return entry.get_security(start, end)
+
+    def invalidate(self, isin: str = None) -> None:
+        """Drop cached securities
+
+
+        Parameters
+        -------
+        isin: str
+            Only drop this security, default None (drop every security)
+        """
+        with self._lock:
+            if isin is None:
+                self._entries.clear()
+                self.nbytes = 0
+            elif str(isin) in self._entries:
+                self.nbytes -= self._entries.pop(str(isin)).nbytes
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache statistics
+
+
+        Returns
+        -------
+        dict
+            Hits, misses, evictions, number of entries and size in bytes
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+        }
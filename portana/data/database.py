@@ -0,0 +1,602 @@
+from typing import List, Dict, Union
+import itertools
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .index import BitmapIndex, SortedIndex
+from .predicates import Predicate, from_fields
+from .query_cache import QueryCache
+from . import snapshot
+
+"""In-memory tables backing the simulated database
+
+Each table is loaded once per process and kept in memory. Categorical columns
+are stored as category codes with a bitmap index, other columns get a sorted index
+so that range predicates are binary searches.
+
+Tables are opened from binary snapshots of the csv files when they are up to date,
+see portana.data.snapshot, and parsed from the csv files otherwise.
+"""
+
+DB_DIR = os.path.join(os.path.dirname(__file__), "simulated_db")
+
+DB_FILES = {"equity": "equities.csv", "equityfund": "equity_funds.csv"}
+
+SNAPSHOT_DIR = os.path.join(DB_DIR, "snapshots")
+
+CATEGORICAL_FIELDS = ("sector", "geography", "strategy", "risk")
+
+_tables: Dict[str, "SimTable"] = {}
+_tables_lock = threading.Lock()
+_generations = itertools.count()
+
+query_cache = QueryCache()
+""" Process-wide cache of query results, invalidated when a table is reloaded """
+
+
+class SimTable:
+    """Class to hold one table of the simulated database in memory
+
+    Tables are built either from a DataFrame with SimTable.from_df, or from the
+    arrays of a binary snapshot, see portana.data.snapshot.
+
+
+    Parameters
+    -------
+    isins: numpy.ndarray
+        ISIN of each row
+    fields: List[str]
+        Column names, in the order of the source table
+    columns: Dict[str, numpy.ndarray]
+        Values of each non-categorical column
+    categories: Dict[str, numpy.ndarray]
+        Sorted distinct values of each categorical column
+    codes: Dict[str, numpy.ndarray]
+        Category code of each row for each categorical column, -1 for missing values
+    orders: Dict[str, numpy.ndarray]
+        Precomputed sort order of numeric columns, default None (sort on load)
+
+
+    Attributes
+    -------
+    isins: numpy.ndarray
+        ISIN of each row
+    fields: List[str]
+        Column names, in the order of the source table
+    columns: Dict[str, numpy.ndarray]
+        Values of each non-categorical column
+    categories: Dict[str, numpy.ndarray]
+        Distinct values of each categorical column
+    codes: Dict[str, numpy.ndarray]
+        Category code of each row for each categorical column
+    indexes: Dict[str, Union[BitmapIndex, SortedIndex]]
+        Index of each column. Numeric and categorical columns are indexed on load,
+        other columns the first time they are filtered on.
+    generation: int
+        Number identifying this load of the table, part of query cache keys
+    """
+
+    def __init__(
+        self,
+        isins: np.ndarray,
+        fields: List[str],
+        columns: Dict[str, np.ndarray],
+        categories: Dict[str, np.ndarray],
+        codes: Dict[str, np.ndarray],
+        orders: Dict[str, np.ndarray] = None,
+    ):
+        self.isins: np.ndarray = isins
+        self.fields: List[str] = list(fields)
+        self.columns: Dict[str, np.ndarray] = columns
+        self.categories: Dict[str, np.ndarray] = categories
+        self.codes: Dict[str, np.ndarray] = codes
+
+        self.indexes: Dict[str, Union[BitmapIndex, SortedIndex]] = {}
+        self.generation: int = next(_generations)
+
+        orders = orders or {}
+        for field in self.fields:
+            if field in self.codes:
+                self.indexes[field] = BitmapIndex(
+                    self.codes[field], self.categories[field]
+                )
+            elif np.issubdtype(self.columns[field].dtype, np.number):
+                self.indexes[field] = SortedIndex(
+                    self.columns[field], orders.get(field)
+                )
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> "SimTable":
+        """Build a table from a DataFrame
+
+        Fields listed in CATEGORICAL_FIELDS are stored as category codes.
+
+
+        Parameters
+        -------
+        df: pandas.DataFrame
+            Table to hold, indexed by isin
+
+
+        Returns
+        -------
+        SimTable
+            Table holding df
+        """
+        columns = {}
+        categories = {}
+        codes = {}
+
+        for field in df.columns:
+            if field in CATEGORICAL_FIELDS:
+                field_codes, field_categories = pd.factorize(df[field], sort=True)
+                codes[field] = field_codes.astype(np.int32)
+                categories[field] = np.asarray(field_categories, dtype=object)
+            else:
+                columns[field] = df[field].to_numpy()
+
+        return cls(df.index.to_numpy(), list(df.columns), columns, categories, codes)
+
+    def __len__(self):
+        return len(self.isins)
+
+    def to_df(self) -> pd.DataFrame:
+        """Get the table as a DataFrame indexed by isin, the inverse of from_df
+
+
+        Returns
+        -------
+        pandas.DataFrame
+            Values of every field, missing categories as NaN
+        """
+        values = {}
+        for field in self.fields:
+            if field in self.codes:
+                codes = self.codes[field]
+                values[field] = np.where(
+                    codes >= 0, self.categories[field][codes], np.nan
+                )
+            else:
+                values[field] = np.asarray(self.columns[field])
+
+        return pd.DataFrame(values, index=pd.Index(self.isins, name="isin"))
+
+    def with_columns(self, columns: Dict[str, np.ndarray]) -> "SimTable":
+        """Get a copy of the table with columns added or replaced
+
+        Other columns and their indexes are shared with this table, so that only
+        the new columns are sorted.
+
+
+        Parameters
+        -------
+        columns: Dict[str, numpy.ndarray]
+            Values of each column, one per row. New fields are appended after
+            the existing ones.
+
+
+        Returns
+        -------
+        SimTable
+            New table, with a new generation
+        """
+        for field, values in columns.items():
+            if len(values) != len(self):
+                raise ValueError(
+                    f"Column {field} has {len(values)} values for {len(self)} rows"
+                )
+
+        fields = self.fields + [field for field in columns if field not in self.fields]
+
+        new_columns = {
+            field: values
+            for field, values in self.columns.items()
+            if field not in columns
+        }
+        orders = {
+            field: index.order
+            for field, index in self.indexes.items()
+            if isinstance(index, SortedIndex) and field not in columns
+        }
+
+        for field, values in columns.items():
+            new_columns[field] = np.asarray(values)
+
+        return SimTable(
+            self.isins,
+            fields,
+            new_columns,
+            {
+                field: categories
+                for field, categories in self.categories.items()
+                if field not in columns
+            },
+            {
+                field: codes
+                for field, codes in self.codes.items()
+                if field not in columns
+            },
+            orders,
+        )
+
+    def get_column(self, field: str) -> np.ndarray:
+        """Get values of a column
+
+
+        Parameters
+        -------
+        field: str
+            Column name
+
+
+        Returns
+        -------
+        numpy.ndarray
+            Values of the column, one per row
+        """
+        if field in self.codes:
+            return self.categories[field][self.codes[field]]
+
+        return self.columns[field]
+
+    def get_index(self, field: str) -> Union[BitmapIndex, SortedIndex]:
+        """Get index of a column, building it on first use
+
+
+        Parameters
+        -------
+        field: str
+            Column name
+
+
+        Returns
+        -------
+        Union[BitmapIndex, SortedIndex]
+            Index of the column
+        """
+        if field not in self.indexes:
+            self.indexes[field] = SortedIndex(self.get_column(field))
+
+        return self.indexes[field]
+
+    def filter(
+        self, fields: Union[Dict[str, Union[str, float, list]], Predicate]
+    ) -> np.ndarray:
+        """Get rows matching fields
+
+
+        Parameters
+        -------
+        fields: Union[dict, Predicate]
+            Either a Predicate, or column names and values to match,
+            see portana.data.predicates.from_fields. Example: {"geography": "Canada"}
+
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted row numbers
+        """
+        return from_fields(fields).evaluate(self).to_rows()
+
+    def sort_rows(self, rows: np.ndarray, field: str, top: int = None) -> np.ndarray:
+        """Sort rows by field in descending order
+
+
+        Parameters
+        -------
+        rows: numpy.ndarray
+            Row numbers to sort
+        field: str
+            Column to sort by
+        top: int
+            If set, only the first top rows are returned. For numeric columns they are
+            selected with a partial sort in O(n) before sorting those top rows,
+            default None (sort every row)
+
+
+        Returns
+        -------
+        numpy.ndarray
+            Row numbers, ties are kept in their original order
+        """
+        values = self.get_column(field)[rows]
+
+        if not np.issubdtype(values.dtype, np.number):
+            # Stable descending sort of the rank of each value, so ties keep their order
+            _, ranks = np.unique(values, return_inverse=True)
+            return rows[np.argsort(-ranks.ravel(), kind="stable")][:top]
+
+        # NaNs are sorted last, as in DataFrame.sort_values
+        keys = np.where(np.isnan(values), np.inf, -values.astype(np.float64))
+
+        if top is not None and top < len(rows):
+            if top <= 0:
+                return rows[:0]
+
+            # Keep every row tied with the top-th key, so that ties are broken by
+            # position exactly as the full stable sort would
+            kth = np.partition(keys, top - 1)[top - 1]
+            candidates = np.flatnonzero(keys <= kth)
+            order = candidates[np.lexsort((candidates, keys[candidates]))][:top]
+
+            return rows[order]
+
+        return rows[np.argsort(keys, kind="stable")]
+
+    def get_records(self, rows: np.ndarray) -> Dict[str, Dict[str, Union[str, float]]]:
+        """Get rows as a dict of records keyed by ISIN
+
+
+        Parameters
+        -------
+        rows: numpy.ndarray
+            Row numbers, in the order in which they should be returned
+
+
+        Returns
+        -------
+        dict
+            Values of every field for each row
+        """
+        values = [self.get_column(field)[rows].tolist() for field in self.fields]
+        isins = self.isins[rows].tolist()
+
+        return {
+            str(isin): dict(zip(self.fields, record))
+            for isin, record in zip(isins, zip(*values))
+        }
+
+
+class Cursor:
+    """Class to iterate over rows of a query result without building them all at once
+
+    Rows are decoded batch by batch into tuples of (isin, field 1, field 2, ...).
+
+
+    Parameters
+    -------
+    table: SimTable
+        Table the rows belong to
+    rows: numpy.ndarray
+        Row numbers, in the order in which they should be returned
+    batch_size: int
+        Number of rows decoded at a time, default 1000
+
+
+    Attributes
+    -------
+    description: List[str]
+        Name of each element of the returned tuples
+
+
+    Example
+    -------
+    >>> cursor = SimQuery("equity", {"geography": "Canada"}, "5y_sharpe").fetch_cursor()
+    >>> cursor.description
+    ['isin', 'name', 'ticker', 'sector', 'geography', '5y_sharpe']
+    >>> cursor.fetchone()
+    (16366, 'Simulated Security 16366', 'W', 'Industrials', 'Canada', 221.8231716)
+    >>> for row in cursor:
+    ...     pass
+    """
+
+    def __init__(self, table: SimTable, rows: np.ndarray, batch_size: int = 1000):
+        self.table = table
+        self.rows = rows
+        self.batch_size = batch_size
+        self.description: List[str] = ["isin"] + table.fields
+
+        self._position = 0
+
+    def __iter__(self):
+        while True:
+            batch = self.fetchmany()
+            if not batch:
+                return
+            yield from batch
+
+    def __len__(self):
+        return len(self.rows)
+
+    def fetchmany(self, size: int = None) -> List[tuple]:
+        """Returns the next size rows, default batch_size rows"""
+        size = self.batch_size if size is None else size
+        rows = self.rows[self._position : self._position + size]
+        self._position += len(rows)
+
+        columns = [self.table.isins[rows].tolist()]
+        columns += [
+            self.table.get_column(field)[rows].tolist() for field in self.table.fields
+        ]
+
+        return list(zip(*columns))
+
+    def fetchone(self) -> tuple:
+        """Returns the next row, None if every row has been returned"""
+        batch = self.fetchmany(1)
+        return batch[0] if batch else None
+
+    def fetchall(self) -> List[tuple]:
+        """Returns every remaining row"""
+        return self.fetchmany(len(self.rows) - self._position)
+
+
+def get_snapshot_dir(asset_type: str) -> str:
+    """Returns the snapshot directory of a table"""
+    return os.path.join(SNAPSHOT_DIR, asset_type.lower())
+
+
+def load_csv(asset_type: str) -> SimTable:
+    """Load a table of the simulated database by parsing its csv file
+
+
+    Parameters
+    -------
+    asset_type: str
+        Either "equity" or "equityfund"
+
+
+    Returns
+    -------
+    SimTable
+        Freshly loaded table
+    """
+    path = os.path.join(DB_DIR, DB_FILES[asset_type.lower()])
+
+    return SimTable.from_df(pd.read_csv(path, index_col=0))
+
+
+def load_table(asset_type: str, use_snapshot: bool = True) -> SimTable:
+    """Load a table of the simulated database from disk
+
+
+    Parameters
+    -------
+    asset_type: str
+        Either "equity" or "equityfund"
+    use_snapshot: bool
+        Whether to memory-map the table's snapshot when it is up to date with
+        the csv file, default True
+
+
+    Returns
+    -------
+    SimTable
+        Freshly loaded table
+    """
+    source = os.path.join(DB_DIR, DB_FILES[asset_type.lower()])
+    directory = get_snapshot_dir(asset_type)
+
+    if use_snapshot and snapshot.is_fresh(directory, source):
+        return SimTable(**snapshot.read_snapshot(directory))
+
+    return load_csv(asset_type)
+
+
+def build_snapshot(asset_type: str) -> str:
+    """Rebuild the binary snapshot of a table from its csv file
+
+
+    Parameters
+    -------
+    asset_type: str
+        Either "equity" or "equityfund"
+
+
+    Returns
+    -------
+    str
+        Snapshot directory
+    """
+    source = os.path.join(DB_DIR, DB_FILES[asset_type.lower()])
+    directory = get_snapshot_dir(asset_type)
+
+    snapshot.write_snapshot(load_csv(asset_type), directory, source)
+
+    return directory
+
+
+def get_table(asset_type: str) -> SimTable:
+    """Get a table of the simulated database, loading it on first use
+
+    Tables are shared by every SimQuery in the process.
+
+
+    Parameters
+    -------
+    asset_type: str
+        Either "equity" or "equityfund"
+
+
+    Returns
+    -------
+    SimTable
+        Table of the asset type
+    """
+    asset_type = asset_type.lower()
+
+    table = _tables.get(asset_type)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(asset_type)
+            if table is None:
+                table = load_table(asset_type)
+                _tables[asset_type] = table
+
+    return table
+
+
+def reload_table(asset_type: str) -> SimTable:
+    """Reload a table of the simulated database from disk,
+    dropping cached query results of that table
+
+
+    Parameters
+    -------
+    asset_type: str
+        Either "equity" or "equityfund"
+
+
+    Returns
+    -------
+    SimTable
+        Reloaded table
+    """
+    asset_type = asset_type.lower()
+    table = load_table(asset_type)
+
+    with _tables_lock:
+        _tables[asset_type] = table
+
+    query_cache.invalidate(asset_type)
+
+    return table
+
+
+def update_columns(
+    asset_type: str, columns: Dict[str, np.ndarray], persist: bool = False
+) -> SimTable:
+    """Add or replace columns of a table of the simulated database,
+    dropping cached query results of that table
+
+    Columns are indexed like those loaded from disk, so that SimQuery can filter
+    and sort on them.
+
+
+    Parameters
+    -------
+    asset_type: str
+        Either "equity" or "equityfund"
+    columns: Dict[str, numpy.ndarray]
+        Values of each column, in the row order of the table
+    persist: bool
+        Whether to also rewrite the table's csv file, default False (only the
+        table held by this process is updated). The snapshot of the table is then
+        stale, and is rebuilt with python -m portana.data.snapshot
+
+
+    Returns
+    -------
+    SimTable
+        Updated table
+    """
+    asset_type = asset_type.lower()
+    table = get_table(asset_type).with_columns(columns)
+
+    if persist:
+        path = os.path.join(DB_DIR, DB_FILES[asset_type])
+
+        # Written aside then renamed, so that the csv file is never partly written
+        table.to_df().to_csv(f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+    with _tables_lock:
+        _tables[asset_type] = table
+
+    query_cache.invalidate(asset_type)
+
+    return table
@@ -0,0 +1,230 @@
+from typing import List, Tuple
+import copy
+import zlib
+
+import numpy as np
+
+from ..timeseries.analyzerseries import AnalyzerSeries
+from .generator import ORIGIN, _get_cumulative_draws
+
+"""Factor-model simulation of correlated universes
+
+Securities simulated one by one by Generator are independent. FactorModel draws a
+market factor and one factor per exposure value (e.g. sector == "Technology",
+geography == "Canada") once, and loads each security on the market and on the
+factors of its own exposures, so that securities sharing a sector or geography
+move together.
+"""
+
+
+class FactorModel:
+    """Class to simulate a universe of correlated securities
+
+
+    Standardized daily returns of security i are
+
+        z_i = sqrt(market_weight) * f_market
+            + sqrt(group_weight / M) * (sum of the factors of its M exposures)
+            + sqrt(1 - market_weight - group_weight) * e_i
+
+    with every factor f and idiosyncratic noise e independent standard normals,
+    so z_i is a standard normal like the draws of Generator. Paths follow the model
+    of Generator.generate_batch: log prices are drift * days + vol * (sum of z since
+    ORIGIN), with drift, vol, distribution and initial price of each security set by
+    the asset type's Generator, and exposures by the asset type.
+
+    Factors are drawn from counter-based streams keyed by seed and factor name, and
+    e_i are the security's own draws in Generator, so windows of the same securities
+    agree on their common dates, and a model with no factor weights returns the
+    series of SimConnection. The factor part is a (N x K) @ (K x T) matrix product.
+
+
+    Parameters
+    -------
+    asset_type: AbstractAssetType
+        Simulated asset type, e.g. SimEquityAssetType(), providing the generator
+        and exposures of each security
+
+
+    Attributes
+    -------
+    market_weight: float
+        Share of each security's variance explained by the market factor
+    group_weight: float
+        Share of each security's variance explained by its exposure factors
+    seed: int
+        Seed of factor draws
+    chunk_size: int
+        Number of securities simulated at a time, bounds temporary memory
+    factor_names: List[str]
+        Name of each factor of the last simulation, "market" then "field=value"
+    loadings: numpy.ndarray
+        (N x K) loadings of the last simulation
+
+
+    Example
+    -------
+    >>> model = FactorModel(SimEquityAssetType())
+    >>> model.set_market_weight(0.3)
+    >>> model.set_group_weight(0.3)
+    >>> model.set_seed(412843)
+    >>> prices, tot_ret_idx = model.simulate(range(15000, 20000), ("2020-01-01", "2020-12-31"))
+    >>> prices.get_data().shape
+    (366, 5000)
+    """
+
+    def __init__(self, asset_type):
+        self.asset_type = asset_type
+        self.market_weight: float = 0.3
+        self.group_weight: float = 0.2
+        self.seed: int = None
+        self.chunk_size: int = 256
+
+        self.factor_names: List[str] = []
+        self.loadings: np.ndarray = None
+
+    def __get_loadings(self, isins: List[str]) -> Tuple[List[str], np.ndarray]:
+        exposures = [self.asset_type.get_exposures(int(isin)) for isin in isins]
+        fields = list(exposures[0]) if exposures else []
+
+        factor_names = ["market"]
+        cols = []
+        for field in fields:
+            values, codes = np.unique(
+                [exposure[field] for exposure in exposures], return_inverse=True
+            )
+            cols.append(len(factor_names) + codes)
+            factor_names.extend(f"{field}={value}" for value in values)
+
+        loadings = np.zeros((len(isins), len(factor_names)), dtype=np.float64)
+        loadings[:, 0] = np.sqrt(self.market_weight)
+
+        rows = np.arange(len(isins))
+        for field_cols in cols:
+            loadings[rows, field_cols] = np.sqrt(self.group_weight / len(fields))
+
+        return factor_names, loadings
+
+    def __get_factor_seeds(self) -> List[int]:
+        root = np.random.SeedSequence(self.seed)
+
+        return [
+            int(
+                np.random.SeedSequence(
+                    [root.entropy, zlib.crc32(name.encode())]
+                ).generate_state(1, np.uint64)[0]
+            )
+            for name in self.factor_names
+        ]
+
+    def set_market_weight(self, market_weight: float) -> None:
+        """Setter for market_weight
+
+
+        Parameters
+        -------
+        market_weight: float
+            Share of each security's variance explained by the market factor
+        """
+        self.market_weight = market_weight
+
+    def set_group_weight(self, group_weight: float) -> None:
+        """Setter for group_weight
+
+
+        Parameters
+        -------
+        group_weight: float
+            Share of each security's variance explained by its exposure factors,
+            split evenly across exposure fields
+        """
+        self.group_weight = group_weight
+
+    def set_seed(self, seed: int) -> None:
+        """Setter for seed
+
+
+        Parameters
+        -------
+        seed: int
+            Seed of factor draws
+        """
+        self.seed = seed
+
+    def set_chunk_size(self, chunk_size: int) -> None:
+        """Setter for chunk_size
+
+
+        Parameters
+        -------
+        chunk_size: int
+            Number of securities simulated at a time
+        """
+        self.chunk_size = chunk_size
+
+    def simulate(
+        self, isins: List[str], date_range: Tuple[str, str]
+    ) -> Tuple[AnalyzerSeries, AnalyzerSeries]:
+        """Simulate prices and total returns index of every security
+
+
+        Parameters
+        -------
+        isins: List[str]
+            ISINs of the securities to simulate
+        date_range: Tuple[str, str]
+            Date range to simulate
+
+
+        Returns
+        -------
+        Tuple[AnalyzerSeries, AnalyzerSeries]
+            (T x N) prices and total returns index, one column per ISIN
+        """
+        if self.market_weight + self.group_weight > 1:
+            raise ValueError("market_weight and group_weight must add up to at most 1")
+
+        isins = [str(isin) for isin in isins]
+        seeds = [int(isin) for isin in isins]
+
+        generator = copy.copy(self.asset_type.generator)
+        generator.set_date_range(date_range)
+        dates = generator.generate_dates()
+
+        drift, vol, distribution, initial_price = generator.generate_parameters(seeds)
+        self.factor_names, self.loadings = self.__get_loadings(isins)
+
+        first = int((dates[0] - ORIGIN).astype(int))
+        last = first + len(dates) - 1
+        days = np.arange(first, last + 1) + 1
+
+        # Cumulative factor draws since ORIGIN, keyed by seed and factor name
+        factors = _get_cumulative_draws(self.__get_factor_seeds(), first, last)
+        idiosyncratic = np.sqrt(1 - self.market_weight - self.group_weight)
+
+        prices = np.empty((len(dates), len(isins)), dtype=np.float64)
+        tot_ret_idx = np.empty_like(prices)
+
+        for start in range(0, len(isins), self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+
+            # Idiosyncratic draws are the security's own draws, see Generator
+            cumulative = self.loadings[chunk] @ factors
+            cumulative += idiosyncratic * _get_cumulative_draws(
+                seeds[chunk], first, last
+            )
+
+            log_prices = drift[chunk, np.newaxis] * days
+            log_prices += vol[chunk, np.newaxis] * cumulative
+
+            prices[:, chunk] = (
+                initial_price[chunk, np.newaxis] * np.exp(log_prices)
+            ).transpose()
+            tot_ret_idx[:, chunk] = (
+                100 * np.exp(log_prices + distribution[chunk, np.newaxis] * days)
+            ).transpose()
+
+        return (
+            AnalyzerSeries(dates, prices, isins),
+            AnalyzerSeries(dates, tot_ret_idx, isins),
+        )
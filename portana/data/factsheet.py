@@ -0,0 +1,325 @@
+from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+import re
+
+from .snapshot import hash_file
+
+"""Parallel, cached ingestion of fund factsheets
+
+Tables of PDF factsheets are extracted with camelot-py by worker processes.
+Extracting tables from a PDF takes seconds, so extracted tables are cached on
+disk as json, keyed by the sha1 of the PDF: a factsheet is only parsed again
+when its content changes, whatever its path.
+
+Tables are then read into the description and exposures of an EquityFund:
+
+-   a row whose label is a fee (e.g. "Management Fee", "MER") gives
+    description["fee"], and a "Fund Name" row gives description["name"]
+-   a table whose header is an exposure field (e.g. "Sector", "Region")
+    gives exposures[field], as a dict of category weights
+-   a "Top Holdings" table gives description["holdings"], as a dict of weights
+
+Weights and fees are percentages in factsheets, and fractions once read
+(e.g. "0.75%" is 0.0075), as in the simulated database.
+
+
+Example
+-------
+>>> parser = FactsheetParser("factsheet_cache")
+>>> fields = parser.get_fields(["XYZ123.pdf"])
+>>> description, exposures = fields[0]
+>>> exposures["geography"]
+{'Canada': 0.452, 'United States': 0.548}
+>>> fund = EquityFund("XYZ123", store.get_timeseries("XYZ123"), description, exposures)
+"""
+
+EXPOSURE_FIELDS = {
+    "sector": "sector",
+    "sector allocation": "sector",
+    "geography": "geography",
+    "geographic allocation": "geography",
+    "region": "geography",
+    "country": "geography",
+    "asset allocation": "asset_class",
+    "asset class": "asset_class",
+}
+""" Exposure field of each table header, compared in lower case """
+
+HOLDINGS_HEADERS = ("holdings", "top holdings", "top 10 holdings")
+""" Headers of holdings tables, compared in lower case """
+
+_FEE_LABEL = re.compile(r"\b(fee|fees|mer|ter|expense ratio)\b", re.IGNORECASE)
+
+_NAME_LABEL = re.compile(r"^fund name$", re.IGNORECASE)
+
+
+def _read_tables(path: str, flavor: str) -> List[List[List[str]]]:
+    """Extract every table of a PDF as rows of cells
+
+    Module-level so that it can be sent to worker processes.
+    """
+    try:
+        import camelot
+    except ImportError as error:
+        raise ImportError(
+            "Parsing factsheets requires camelot-py, see pyproject.toml"
+        ) from error
+
+    tables = camelot.read_pdf(path, pages="all", flavor=flavor)
+
+    return [table.df.astype(str).values.tolist() for table in tables]
+
+
+def _clean(cell: str) -> str:
+    return " ".join(cell.split())
+
+
+def _parse_percent(cell: str) -> float:
+    """Read a percentage as a fraction, None if it is not a number"""
+    try:
+        return float(_clean(cell).rstrip("%").replace(",", "")) / 100
+    except ValueError:
+        return None
+
+
+def _read_weights(rows: List[List[str]]) -> Dict[str, float]:
+    """Read (label, ..., weight) rows as a dict, skipping rows without a weight"""
+    weights = {}
+    for row in rows:
+        if len(row) < 2:
+            continue
+
+        weight = _parse_percent(row[-1])
+        if weight is not None and _clean(row[0]):
+            weights[_clean(row[0])] = weight
+
+    return weights
+
+
+def read_fields(tables: List[List[List[str]]]) -> Tuple[dict, dict]:
+    """Read the description and exposures of a fund from its factsheet's tables
+
+
+    Parameters
+    -------
+    tables: List[List[List[str]]]
+        Tables of the factsheet, each a list of rows of cells
+
+
+    Returns
+    -------
+    Tuple[dict, dict]
+        Description and exposures, see Security. Fields that are not found
+        are left out.
+    """
+    description = {}
+    exposures = {}
+
+    for rows in tables:
+        if not rows:
+            continue
+
+        header = _clean(rows[0][0]).lower() if rows[0] else ""
+
+        if header in EXPOSURE_FIELDS:
+            exposures[EXPOSURE_FIELDS[header]] = _read_weights(rows[1:])
+            continue
+
+        if header in HOLDINGS_HEADERS:
+            description["holdings"] = _read_weights(rows[1:])
+            continue
+
+        for row in rows:
+            if len(row) < 2:
+                continue
+
+            label = _clean(row[0])
+            if "fee" not in description and _FEE_LABEL.search(label):
+                fee = _parse_percent(row[-1])
+                if fee is not None:
+                    description["fee"] = fee
+            elif "name" not in description and _NAME_LABEL.match(label):
+                description["name"] = _clean(row[-1])
+
+    return description, exposures
+
+
+class FactsheetParser:
+    """Class to extract tables of PDF factsheets in parallel, with a disk cache
+
+
+    Parameters
+    -------
+    cache_dir: str
+        Directory of cached tables, created if needed
+
+
+    Attributes
+    -------
+    flavor: str
+        camelot parsing method, "lattice" for tables with ruling lines
+        or "stream" for tables laid out with whitespace
+    max_workers: int
+        Number of worker processes, None to use every core, 1 to run in this process
+    parsed: int
+        Number of PDFs parsed, i.e. not found in the cache, by this parser
+    errors: Dict[str, Exception]
+        Error raised while parsing each PDF that could not be parsed by the last
+        call to parse, by path
+
+
+    Example
+    -------
+    >>> parser = FactsheetParser("factsheet_cache")
+    >>> parser.set_flavor("stream")
+    >>> tables = parser.parse(glob.glob("factsheets/*.pdf"))
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.flavor: str = "lattice"
+        self.max_workers: int = None
+        self.parsed: int = 0
+        self.errors: Dict[str, Exception] = {}
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __get_cache_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.{self.flavor}.json")
+
+    def __read_cache(self, digest: str) -> List[List[List[str]]]:
+        try:
+            with open(self.__get_cache_path(digest)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def __write_cache(self, digest: str, tables: List[List[List[str]]]) -> None:
+        path = self.__get_cache_path(digest)
+
+        # Written aside then renamed, so that a cache file is never partly written
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(tables, file)
+        os.replace(f"{path}.tmp", path)
+
+    def set_flavor(self, flavor: str) -> None:
+        """Setter for flavor
+
+
+        Parameters
+        -------
+        flavor: str
+            camelot parsing method, "lattice" or "stream"
+        """
+        self.flavor = flavor
+
+    def set_max_workers(self, max_workers: int) -> None:
+        """Setter for max_workers
+
+
+        Parameters
+        -------
+        max_workers: int
+            Number of worker processes, None to use every core, 1 to run in this process
+        """
+        self.max_workers = max_workers
+
+    def __parsed(self, digest: str, tables: dict, errors: dict, result) -> None:
+        """Cache the tables of a parsed PDF, or record the error raised parsing it"""
+        if isinstance(result, Exception):
+            errors[digest] = result
+            return
+
+        self.__write_cache(digest, result)
+        tables[digest] = result
+        self.parsed += 1
+
+    def parse(self, paths: List[str]) -> List[List[List[List[str]]]]:
+        """Extract tables of factsheets, parsing only those missing from the cache
+
+        PDFs with the same content are parsed once. Each PDF is cached as soon as
+        it is parsed, and a PDF that cannot be parsed does not stop the others:
+        its error is recorded in errors.
+
+
+        Parameters
+        -------
+        paths: List[str]
+            Paths of the PDFs
+
+
+        Returns
+        -------
+        List[List[List[List[str]]]]
+            Tables of each PDF, each table a list of rows of cells, None for PDFs
+            that could not be parsed
+        """
+        paths = [str(path) for path in paths]
+        digests = [hash_file(path) for path in paths]
+
+        tables = {}
+        errors = {}
+        missing = {}
+        for path, digest in zip(paths, digests):
+            if digest in tables or digest in missing:
+                continue
+
+            cached = self.__read_cache(digest)
+            if cached is None:
+                missing[digest] = path
+            else:
+                tables[digest] = cached
+
+        if self.max_workers == 1:
+            for digest, path in missing.items():
+                try:
+                    result = _read_tables(path, self.flavor)
+                except Exception as error:
+                    result = error
+
+                self.__parsed(digest, tables, errors, result)
+
+        elif missing:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(_read_tables, path, self.flavor): digest
+                    for digest, path in missing.items()
+                }
+
+                for future in as_completed(futures):
+                    digest = futures[future]
+                    error = future.exception()
+                    result = future.result() if error is None else error
+
+                    self.__parsed(digest, tables, errors, result)
+
+        self.errors = {
+            path: errors[digest]
+            for path, digest in zip(paths, digests)
+            if digest in errors
+        }
+
+        return [tables.get(digest) for digest in digests]
+
+    def get_fields(self, paths: List[str]) -> List[Tuple[dict, dict]]:
+        """Get description and exposures of funds from their factsheets
+
+
+        Parameters
+        -------
+        paths: List[str]
+            Paths of the PDFs
+
+
+        Returns
+        -------
+        List[Tuple[dict, dict]]
+            Description and exposures of each fund, see read_fields, None for
+            factsheets that could not be parsed, see errors
+        """
+        return [
+            None if tables is None else read_fields(tables)
+            for tables in self.parse(paths)
+        ]
@@ -1,4 +1,5 @@
 from typing import Tuple
+import copy
 import string
 import random
 
@@ -9,12 +10,104 @@ import numpy as np
 Used by AssetClass class to retrieve data specific
 for each asset class
 
+Every random draw comes from a random.Random or numpy.random.Generator
+instance seeded for that draw, so the process-wide random module is never reseeded.
+
+Windows of a security's path (generate_window) are drawn from a counter-based
+Philox generator keyed by seed, with the day number as counter, so any window
+can be generated directly and agrees with every other window of the same path.
+Cumulative draws are checkpointed every BLOCK_DAYS days: the sum of each block
+is drawn first, and daily draws are bridged between checkpoints, so reaching a
+window costs one draw per block instead of one per day.
+
 Todo
 -------
 -   Seperate into different classes for
     different AssetClass
 """
 
+ORIGIN = np.datetime64("2000-01-01")
+""" Day 0 of generate_window, the day after which prices start at initial price """
+
+BLOCK_DAYS = 256
+""" Number of days between checkpoints of cumulative draws """
+
+_COUNTER_OFFSET = 2**62
+
+
+def _philox_normals(
+    seeds: np.ndarray, stream: int, start: int, count: int
+) -> np.ndarray:
+    """Standard normals number start to start + count - 1 of a stream, for each seed
+
+    Normal number i only depends on (seed, stream, i): it is made by Box-Muller from
+    the Philox block at counter i, so any range of normals is drawn directly.
+
+
+    Returns
+    -------
+    numpy.ndarray
+        (len(seeds) x count) normals, one row per seed
+    """
+    words = np.empty((len(seeds), count, 4), dtype=np.uint64)
+    for row, seed in enumerate(seeds):
+        bit_generator = np.random.Philox(
+            key=[int(seed), stream], counter=[start + _COUNTER_OFFSET, 0, 0, 0]
+        )
+        words[row] = bit_generator.random_raw(4 * count).reshape(count, 4)
+
+    # 53-bit uniforms, in (0, 1] for the log
+    uniforms = (words[:, :, :2] >> np.uint64(11)).astype(np.float64) * 2.0**-53
+    radius = np.sqrt(-2 * np.log(1 - uniforms[:, :, 0]))
+
+    return radius * np.cos(2 * np.pi * uniforms[:, :, 1])
+
+
+def _get_cumulative_draws(seeds: np.ndarray, first: int, last: int) -> np.ndarray:
+    """Get cumulative sums of daily draws since ORIGIN for days first to last
+
+    Days before ORIGIN count negatively, so that the sum is 0 on the day before.
+
+
+    Returns
+    -------
+    numpy.ndarray
+        (len(seeds) x (last - first + 1)) cumulative draws, one row per seed
+    """
+    first_block = first // BLOCK_DAYS
+    last_block = last // BLOCK_DAYS
+    blocks = range(first_block, last_block + 1)
+
+    # Checkpoints: sum of every block between ORIGIN and the window, each block
+    # sum being the sum of BLOCK_DAYS standard normals
+    low = min(first_block, 0)
+    high = max(last_block + 1, 0)
+    block_sums = _philox_normals(seeds, 1, low, high - low)
+    block_sums *= np.sqrt(BLOCK_DAYS)
+
+    # Summed outward from ORIGIN, so that a checkpoint never depends on the window
+    after = np.concatenate(
+        (np.zeros((len(seeds), 1)), np.cumsum(block_sums[:, -low:], axis=1)), axis=1
+    )
+    before = -np.cumsum(block_sums[:, :-low][:, ::-1], axis=1)
+    checkpoints = np.stack(
+        [after[:, block] if block >= 0 else before[:, -block - 1] for block in blocks],
+        axis=1,
+    )
+
+    # Bridge daily draws between checkpoints: shifting iid normals to a given sum
+    # keeps them iid normals conditioned on that sum
+    draws = _philox_normals(
+        seeds, 0, first_block * BLOCK_DAYS, len(blocks) * BLOCK_DAYS
+    ).reshape(len(seeds), len(blocks), BLOCK_DAYS)
+    shifts = block_sums[:, first_block - low : last_block - low + 1] / BLOCK_DAYS
+    draws += (shifts - draws.mean(axis=2))[:, :, np.newaxis]
+
+    cumulative = checkpoints[:, :, np.newaxis] + np.cumsum(draws, axis=2)
+    start = first - first_block * BLOCK_DAYS
+
+    return cumulative.reshape(len(seeds), -1)[:, start : start + last - first + 1]
+
 
 class Generator:
     """Class used for generating random data.
@@ -56,6 +149,9 @@ class Generator:
     >>> # Make sure to set seed last
     >>> generator.set_seed(412843)
 
+    >>> # Or get a seeded copy, to share one configured Generator between threads
+    >>> seeded = generator.for_seed(412843)
+
     >>> # Using Generator
     >>> generator.generate_dates()
     numpy.ndarray
@@ -63,6 +159,11 @@ class Generator:
     numpy.ndarray
     >>> generator.generate_sector()
     "Technology"
+
+    >>> # Generating many securities at once, one column per seed
+    >>> prices, tot_ret_idx = generator.generate_batch(np.arange(15000, 20000))
+    >>> prices.shape
+    (32, 5000)
     """
 
     def __init__(self):
@@ -93,18 +194,56 @@ class Generator:
         """
         self.seed = seed
 
-        random.seed(a=self.seed)
-        self._drift = random.uniform(0, self.max_drift)
+        drift, vol, distribution, initial_price = self.generate_parameters([seed])
+        self._drift = float(drift[0])
+        self._vol = float(vol[0])
+        self._distribution = float(distribution[0])
+        self._initial_price = float(initial_price[0])
 
-        random.seed(a=self.seed)
-        self._vol = random.uniform(0, self.max_vol)
+    def for_seed(self, seed: int) -> "Generator":
+        """Get a copy of the generator with seed set
 
-        random.seed(a=self.seed)
-        self._distribution = random.uniform(0, self.max_distribution)
+        The copy shares no state with this generator, so copies can be used
+        concurrently from several threads.
 
-        random.seed(a=self.seed)
-        self._initial_price = random.uniform(
-            self.initial_price_range[0], self.initial_price_range[1]
+
+        Parameters
+        -------
+        seed: int
+            The seed with which to feed into random number generator
+
+
+        Returns
+        -------
+        Generator
+            Generator with the same settings and seed set
+        """
+        generator = copy.copy(self)
+        generator.set_seed(seed)
+
+        return generator
+
+    def get_settings(self) -> tuple:
+        """Get the settings of the generator, without seed and date range
+
+        Generators with equal settings generate the same data for the same seed
+        and date range.
+
+
+        Returns
+        -------
+        tuple
+            max_drift, max_vol, max_distribution and initial_price_range
+        """
+        initial_price_range = self.initial_price_range
+        if initial_price_range is not None:
+            initial_price_range = tuple(initial_price_range)
+
+        return (
+            self.max_drift,
+            self.max_vol,
+            self.max_distribution,
+            initial_price_range,
         )
 
     def set_max_drift(self, max_drift: float) -> None:
@@ -185,7 +324,7 @@ class Generator:
         return dates
 
     def generate_prices(self) -> np.ndarray:
-        """Generate a price time series
+        """Generate a price time series, see generate_window
 
 
         Returns
@@ -193,20 +332,10 @@ class Generator:
         numpy.ndarray
             Numpy array of prices
         """
-        prices = (
-            np.random.default_rng(self.seed).normal(
-                self._drift, self._vol, self._days_delta
-            )
-            + 1
-        )
-
-        prices[0] = self._initial_price
-        prices = np.cumprod(prices)
-
-        return prices
+        return self.generate_window()[0]
 
     def generate_tot_ret_idx(self) -> np.ndarray:
-        """Generate a total returns index time series
+        """Generate a total returns index time series, see generate_window
 
 
         Returns
@@ -214,17 +343,136 @@ class Generator:
         numpy.ndarray
             Numpy array of total returns index
         """
-        tot_ret_idx = (
-            np.random.default_rng(self.seed).normal(
-                self._drift, self._vol, self._days_delta
-            )
-            + 1
-            + self._distribution
-        )
-        tot_ret_idx[0] = 100
-        tot_ret_idx = np.cumprod(tot_ret_idx)
+        return self.generate_window()[1]
+
+    def generate_window(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Generate price and total returns index time series over date_range
 
-        return tot_ret_idx
+        The path does not depend on where date_range starts: daily log returns are
+        drift + vol * z, where z of each day is drawn from a counter-based generator
+        keyed by seed, and levels are anchored on ORIGIN. Any window of a path is
+        generated in O(window + distance to ORIGIN / BLOCK_DAYS), and equals the
+        same dates sliced out of any longer window.
+
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Prices, starting from initial price on the day before ORIGIN,
+            and total returns index, starting from 100 on the day before ORIGIN
+        """
+        prices, tot_ret_idx = self.generate_batch([self.seed])
+
+        return prices[:, 0], tot_ret_idx[:, 0]
+
+    def generate_batch(
+        self, seeds: np.ndarray, chunk_size: int = 256
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Generate price and total returns index time series of many seeds at once
+
+        Column j is generate_window() after set_seed(seeds[j]): every seed of a
+        chunk is generated by the same array operations, only drawing Philox
+        blocks is done seed by seed.
+
+
+        Parameters
+        -------
+        seeds: numpy.ndarray
+            Seed of each security
+        chunk_size: int
+            Number of securities simulated at a time, bounds temporary memory,
+            default 256
+
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            (T x N) prices and (T x N) total returns index
+        """
+        seeds = [int(seed) for seed in seeds]
+        drift, vol, distribution, initial_price = self.generate_parameters(seeds)
+
+        first = int((np.datetime64(self.date_range[0], "D") - ORIGIN).astype(int))
+        last = first + self._days_delta - 1
+        days = np.arange(first, last + 1) + 1
+
+        # Column-major, so that each security's series is contiguous
+        prices = np.empty((self._days_delta, len(seeds)), dtype=np.float64, order="F")
+        tot_ret_idx = np.empty_like(prices, order="F")
+
+        for start in range(0, len(seeds), chunk_size):
+            chunk = slice(start, min(start + chunk_size, len(seeds)))
+
+            log_prices = drift[chunk, np.newaxis] * days + vol[
+                chunk, np.newaxis
+            ] * _get_cumulative_draws(seeds[chunk], first, last)
+
+            prices[:, chunk] = (
+                initial_price[chunk, np.newaxis] * np.exp(log_prices)
+            ).transpose()
+            tot_ret_idx[:, chunk] = (
+                100 * np.exp(log_prices + distribution[chunk, np.newaxis] * days)
+            ).transpose()
+
+        return prices, tot_ret_idx
+
+    def generate_prices_batch(
+        self, seeds: np.ndarray, chunk_size: int = 256
+    ) -> np.ndarray:
+        """Generate price time series of many seeds at once, see generate_batch
+
+
+        Returns
+        -------
+        numpy.ndarray
+            (T x N) prices, column j is generate_prices() of seeds[j]
+        """
+        return self.generate_batch(seeds, chunk_size)[0]
+
+    def generate_tot_ret_idx_batch(
+        self, seeds: np.ndarray, chunk_size: int = 256
+    ) -> np.ndarray:
+        """Generate total returns index time series of many seeds at once,
+        see generate_batch
+
+
+        Returns
+        -------
+        numpy.ndarray
+            (T x N) total returns index, column j is generate_tot_ret_idx() of seeds[j]
+        """
+        return self.generate_batch(seeds, chunk_size)[1]
+
+    def generate_parameters(
+        self, seeds: list
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Generate drift, vol, distribution and initial price of each seed
+
+        Each parameter is random.uniform over its range after seeding with seed,
+        i.e. low + (high - low) * random(), so one draw per seed is enough.
+
+
+        Parameters
+        -------
+        seeds: list
+            Seed of each security
+
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]
+            Drift, vol, distribution and initial price, one element per seed
+        """
+        draws = np.array([random.Random(int(seed)).random() for seed in seeds])
+
+        drift = 0 + (self.max_drift - 0) * draws
+        vol = 0 + (self.max_vol - 0) * draws
+        distribution = 0 + (self.max_distribution - 0) * draws
+
+        low, high = self.initial_price_range
+        initial_price = low + (high - low) * draws
+
+        return drift, vol, distribution, initial_price
 
     def generate_name(self) -> str:
         """Generate security name
@@ -248,14 +496,12 @@ class Generator:
         str
             Ticker
         """
-        random.seed(a=self.seed)
-        length = random.choice(range(1, 5))
+        length = random.Random(self.seed).choice(range(1, 5))
         letters = string.ascii_uppercase
 
         ticker = ""
         for i in range(length):
-            random.seed(a=self.seed + i)
-            ticker += random.choice(letters)
+            ticker += random.Random(self.seed + i).choice(letters)
 
         return ticker
 
@@ -271,8 +517,7 @@ class Generator:
         float
             Amount of fees
         """
-        random.seed(a=self.seed)
-        fee = random.uniform(0, 0.02)
+        fee = random.Random(self.seed).uniform(0, 0.02)
 
         return round(fee, 3)
 
@@ -336,13 +581,12 @@ class Generator:
         return self.__random_choice(risks, 4)
 
     def __random_choice(self, choices: list, delta: int = 0) -> str:
-        """Generate a price time series
+        """Choose one of choices, seeded with seed + delta
 
 
         Returns
         -------
-        numpy.ndarray
-            Numpy array of prices
+        str
+            Chosen element of choices
         """
-        random.seed(a=self.seed + delta)
-        return random.choice(choices)
+        return random.Random(self.seed + delta).choice(choices)
@@ -0,0 +1,232 @@
+from typing import List, Tuple, Union
+
+import numpy as np
+
+"""Bitmaps and column indexes used by the simulated database
+
+Rows matching a predicate are represented as bitmaps packed into uint64 words,
+so that AND/OR/NOT of predicates are vectorized bitwise operations.
+"""
+
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+class Bitmap:
+    """Class to represent a set of rows as a packed bitmap
+
+
+    Parameters
+    -------
+    words: numpy.ndarray
+        uint64 words, bit i of the bitmap is bit (i % 64) of word (i // 64)
+    size: int
+        Number of rows in the table
+    """
+
+    def __init__(self, words: np.ndarray, size: int):
+        self.words = words
+        self.size = size
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray) -> "Bitmap":
+        """Build a bitmap from a boolean array, one element per row"""
+        size = len(mask)
+        padded = np.zeros(-(-size // 64) * 64, dtype=bool)
+        padded[:size] = mask
+
+        return cls(np.packbits(padded, bitorder="little").view(np.uint64), size)
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray, size: int) -> "Bitmap":
+        """Build a bitmap from row numbers"""
+        mask = np.zeros(size, dtype=bool)
+        mask[rows] = True
+
+        return cls.from_mask(mask)
+
+    @classmethod
+    def empty(cls, size: int) -> "Bitmap":
+        """Build a bitmap with no rows"""
+        return cls(np.zeros(-(-size // 64), dtype=np.uint64), size)
+
+    @classmethod
+    def full(cls, size: int) -> "Bitmap":
+        """Build a bitmap with every row"""
+        return ~cls.empty(size)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap(self.words & other.words, self.size)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap(self.words | other.words, self.size)
+
+    def __invert__(self) -> "Bitmap":
+        words = ~self.words
+
+        # Clear padding bits past the last row
+        tail = self.size % 64
+        if tail:
+            words[-1] &= np.uint64((1 << tail) - 1)
+
+        return Bitmap(words, self.size)
+
+    def count(self) -> int:
+        """Returns number of rows in the bitmap"""
+        return int(_POPCOUNT[self.words.view(np.uint8)].sum(dtype=np.int64))
+
+    def to_rows(self) -> np.ndarray:
+        """Returns sorted row numbers in the bitmap"""
+        bits = np.unpackbits(self.words.view(np.uint8), bitorder="little")
+
+        return np.flatnonzero(bits[: self.size])
+
+
+class BitmapIndex:
+    """Class to index a categorical column with one bitmap per category
+
+
+    Parameters
+    -------
+    codes: numpy.ndarray
+        Category code of each row, -1 for missing values
+    categories: numpy.ndarray
+        Sorted distinct values of the column
+    """
+
+    def __init__(self, codes: np.ndarray, categories: np.ndarray):
+        self.categories = categories
+        self.size = len(codes)
+        self.bitmaps: List[Bitmap] = [
+            Bitmap.from_mask(codes == code) for code in range(len(categories))
+        ]
+        self.counts: np.ndarray = np.bincount(
+            codes[codes >= 0], minlength=len(categories)
+        )
+
+    def __codes(self, values: list) -> List[int]:
+        codes = np.searchsorted(self.categories, values)
+        return [
+            code
+            for code, value in zip(codes, values)
+            if code < len(self.categories) and self.categories[code] == value
+        ]
+
+    def __codes_between(
+        self, low, high, include_low: bool, include_high: bool
+    ) -> range:
+        start = 0
+        if low is not None:
+            side = "left" if include_low else "right"
+            start = np.searchsorted(self.categories, low, side=side)
+
+        stop = len(self.categories)
+        if high is not None:
+            side = "right" if include_high else "left"
+            stop = np.searchsorted(self.categories, high, side=side)
+
+        return range(start, stop)
+
+    def __union(self, codes) -> Bitmap:
+        bitmap = Bitmap.empty(self.size)
+        for code in codes:
+            bitmap = bitmap | self.bitmaps[code]
+
+        return bitmap
+
+    def count_isin(self, values: list) -> int:
+        """Returns number of rows whose value is in values"""
+        return int(self.counts[self.__codes(values)].sum())
+
+    def isin(self, values: list) -> Bitmap:
+        """Returns rows whose value is in values"""
+        return self.__union(self.__codes(values))
+
+    def count_between(
+        self, low, high, include_low: bool = True, include_high: bool = True
+    ) -> int:
+        """Returns number of rows whose value is between low and high"""
+        codes = self.__codes_between(low, high, include_low, include_high)
+        return int(self.counts[codes.start : codes.stop].sum())
+
+    def between(
+        self, low, high, include_low: bool = True, include_high: bool = True
+    ) -> Bitmap:
+        """Returns rows whose value is between low and high"""
+        return self.__union(self.__codes_between(low, high, include_low, include_high))
+
+
+class SortedIndex:
+    """Class to index a column by sorting it, so that lookups are binary searches
+
+
+    Parameters
+    -------
+    values: numpy.ndarray
+        Value of each row
+    order: numpy.ndarray
+        Precomputed stable argsort of values, default None (sort values)
+    """
+
+    def __init__(self, values: np.ndarray, order: np.ndarray = None):
+        self.size = len(values)
+        if order is None:
+            order = np.argsort(values, kind="stable")
+        self.order: np.ndarray = order
+        self.sorted_values: np.ndarray = values[self.order]
+
+        # NaNs are sorted last and never match
+        if self.sorted_values.dtype.kind == "f":
+            self.valid = int(np.searchsorted(np.isnan(self.sorted_values), True))
+        else:
+            self.valid = self.size
+
+    def __bounds(
+        self, low, high, include_low: bool, include_high: bool
+    ) -> Tuple[int, int]:
+        values = self.sorted_values[: self.valid]
+
+        start = 0
+        if low is not None:
+            side = "left" if include_low else "right"
+            start = int(np.searchsorted(values, low, side=side))
+
+        stop = self.valid
+        if high is not None:
+            side = "right" if include_high else "left"
+            stop = int(np.searchsorted(values, high, side=side))
+
+        return start, max(start, stop)
+
+    def count_isin(self, values: list) -> int:
+        """Returns number of rows whose value is in values"""
+        bounds = [self.__bounds(value, value, True, True) for value in set(values)]
+        return sum(stop - start for start, stop in bounds)
+
+    def isin(self, values: list) -> Bitmap:
+        """Returns rows whose value is in values"""
+        bounds = [self.__bounds(value, value, True, True) for value in set(values)]
+        rows = [self.order[start:stop] for start, stop in bounds]
+
+        return Bitmap.from_rows(np.concatenate(rows + [[]]).astype(np.int64), self.size)
+
+    def count_between(
+        self,
+        low: Union[str, float],
+        high: Union[str, float],
+        include_low: bool = True,
+        include_high: bool = True,
+    ) -> int:
+        """Returns number of rows whose value is between low and high"""
+        start, stop = self.__bounds(low, high, include_low, include_high)
+        return stop - start
+
+    def between(
+        self,
+        low: Union[str, float],
+        high: Union[str, float],
+        include_low: bool = True,
+        include_high: bool = True,
+    ) -> Bitmap:
+        """Returns rows whose value is between low and high"""
+        start, stop = self.__bounds(low, high, include_low, include_high)
+        return Bitmap.from_rows(self.order[start:stop], self.size)
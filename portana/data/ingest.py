@@ -0,0 +1,352 @@
+from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import warnings
+
+import numpy as np
+
+from ..timeseries.securitytimeseries import SecurityTimeSeries
+
+"""Parallel ingestion of price history csv files
+
+Each csv file holds the history of one security, with a header and one row per date:
+
+    date,price,tot_ret_idx
+    2020-01-02,101.25,143.8871
+    ...
+
+Files are parsed and validated by worker processes with numpy.loadtxt (which has
+a C parser from numpy 1.23), reading each file once. Parsed chunks are appended in
+order to the store's column files as they come back, so that every row is written
+once, and the headers of the columns are written last, once the number of rows of
+every file is known.
+
+
+Example
+-------
+>>> ingester = CSVIngester()
+>>> store = ingester.ingest(glob.glob("prices/*.csv"), "store")
+>>> store.get_timeseries("US0378331005")["2020-01-01":"2020-12-31"]
+"""
+
+COLUMNS = ("date", "price", "tot_ret_idx")
+""" Header of price history csv files """
+
+_ROW_DTYPE = np.dtype(
+    [("date", "S10"), ("price", np.float64), ("tot_ret_idx", np.float64)]
+)
+
+_STORE_DTYPES = (
+    ("dates", np.dtype("datetime64[D]")),
+    ("prices", np.dtype(np.float64)),
+    ("tot_ret_idx", np.dtype(np.float64)),
+)
+""" Column files of a RaggedStore and their dtypes """
+
+
+def _parse_chunk(paths: List[str]) -> Tuple[List[np.ndarray], List[int]]:
+    """Parse and validate csv files, returns the dates, prices and total returns
+    index of the chunk back to back, and the number of rows of each file
+
+    Each file is read once. Module-level so that it can be sent to worker processes.
+    """
+    parts = []
+    for path in paths:
+        with open(path) as file:
+            header = file.readline()
+            if tuple(header.strip().split(",")) != COLUMNS:
+                raise ValueError(f"{path}: header should be {','.join(COLUMNS)}")
+
+            with warnings.catch_warnings():
+                # Files with a header only are empty histories
+                warnings.simplefilter("ignore", UserWarning)
+                rows = np.loadtxt(file, dtype=_ROW_DTYPE, delimiter=",", ndmin=1)
+
+        days = rows["date"].astype("datetime64[D]")
+        if len(days) > 1 and not (days[1:] > days[:-1]).all():
+            raise ValueError(f"{path}: dates should be strictly increasing")
+
+        parts.append((days, rows["price"], rows["tot_ret_idx"]))
+
+    columns = [np.concatenate([part[idx] for part in parts]) for idx in range(3)]
+
+    return columns, [len(part[0]) for part in parts]
+
+
+def _write_header(file, dtype: np.dtype, size: int) -> None:
+    """Write the .npy header of a column of size rows at the start of file
+
+    Headers of 1-D columns take 128 bytes whatever their size, so the header written
+    before the rows are known is overwritten in place.
+    """
+    file.seek(0)
+    np.lib.format.write_array_header_1_0(
+        file,
+        {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": (size,),
+        },
+    )
+
+
+class RaggedStore:
+    """Class to hold price histories of many securities on disk, one after another
+
+    Histories can span different dates. They are stored back to back in
+    memory-mapped .npy columns of dates, prices and total returns index, with an
+    ISIN index giving the rows of each security.
+
+
+    Parameters
+    -------
+    path: str
+        Directory of the store
+    mode: str
+        Mode in which the columns are memory-mapped, see numpy.load, default "r"
+        (read-only)
+
+
+    Attributes
+    -------
+    offsets: numpy.ndarray
+        Rows of the n-th security are offsets[n] to offsets[n + 1] - 1
+
+
+    Example
+    -------
+    >>> store = RaggedStore("store")
+    >>> len(store)
+    10000
+    >>> store.get_timeseries("US0378331005")["2020-01-01":"2020-12-31"]
+    """
+
+    def __init__(self, path: str, mode: str = "r"):
+        self.path = path
+
+        self._isins: np.ndarray = np.load(os.path.join(path, "isins.npy"))
+        self.offsets: np.ndarray = np.load(os.path.join(path, "offsets.npy"))
+        self._dates: np.ndarray = np.load(
+            os.path.join(path, "dates.npy"), mmap_mode=mode
+        )
+        self._prices: np.ndarray = np.load(
+            os.path.join(path, "prices.npy"), mmap_mode=mode
+        )
+        self._tot_ret_idx: np.ndarray = np.load(
+            os.path.join(path, "tot_ret_idx.npy"), mmap_mode=mode
+        )
+        self._cols: Dict[str, int] = None
+
+    def __len__(self):
+        return len(self._isins)
+
+    @classmethod
+    def create(cls, path: str, isins: List[str], lengths: List[int]) -> "RaggedStore":
+        """Create an empty store on disk
+
+
+        Parameters
+        -------
+        path: str
+            Directory of the store, created if needed
+        isins: List[str]
+            ISIN of each security
+        lengths: List[int]
+            Number of dates of each security
+
+
+        Returns
+        -------
+        RaggedStore
+            Writable store
+        """
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "isins.npy"), np.asarray(isins, dtype=str))
+        np.save(os.path.join(path, "offsets.npy"), offsets)
+
+        for name, dtype in (
+            ("dates", "datetime64[D]"),
+            ("prices", np.float64),
+            ("tot_ret_idx", np.float64),
+        ):
+            np.lib.format.open_memmap(
+                os.path.join(path, f"{name}.npy"),
+                mode="w+",
+                dtype=dtype,
+                shape=(int(offsets[-1]),),
+            ).flush()
+
+        return cls(path, mode="r+")
+
+    def get_isins(self) -> np.ndarray:
+        """Returns ISIN of each security"""
+        return self._isins
+
+    def get_data(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns memory-mapped dates, prices and total returns index columns"""
+        return self._dates, self._prices, self._tot_ret_idx
+
+    def get_timeseries(self, isin: str) -> SecurityTimeSeries:
+        """Get time series of one security
+
+
+        Parameters
+        -------
+        isin: str
+            ISIN of the security
+
+
+        Returns
+        -------
+        SecurityTimeSeries
+            Prices and total returns index of the security, read from the store
+        """
+        if self._cols is None:
+            self._cols = {str(isin): col for col, isin in enumerate(self._isins)}
+
+        col = self._cols[str(isin)]
+        first, last = self.offsets[col], self.offsets[col + 1]
+
+        return SecurityTimeSeries(
+            np.array(self._dates[first:last]),
+            np.array(self._prices[first:last]),
+            np.array(self._tot_ret_idx[first:last]),
+        )
+
+    def flush(self) -> None:
+        """Write changes of a writable store to disk"""
+        for array in (self._dates, self._prices, self._tot_ret_idx):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+
+class CSVIngester:
+    """Class to ingest price history csv files in parallel
+
+
+    Files are split in chunks of chunk_size files, parsed by worker processes, and
+    appended to the store in order as chunks are parsed. Parsing is done by numpy without Python work per row, so the
+    ingestion of many files is bound by reading them from disk.
+
+
+    Attributes
+    -------
+    chunk_size: int
+        Number of files handled by a worker at a time
+    max_workers: int
+        Number of worker processes, None to use every core, 1 to run in this process
+
+
+    Example
+    -------
+    >>> ingester = CSVIngester()
+    >>> ingester.set_chunk_size(200)
+    >>> store = ingester.ingest(glob.glob("prices/*.csv"), "store")
+    """
+
+    def __init__(self):
+        self.chunk_size: int = 100
+        self.max_workers: int = None
+
+    def set_chunk_size(self, chunk_size: int) -> None:
+        """Setter for chunk_size
+
+
+        Parameters
+        -------
+        chunk_size: int
+            Number of files handled by a worker at a time
+        """
+        self.chunk_size = chunk_size
+
+    def set_max_workers(self, max_workers: int) -> None:
+        """Setter for max_workers
+
+
+        Parameters
+        -------
+        max_workers: int
+            Number of worker processes, None to use every core, 1 to run in this process
+        """
+        self.max_workers = max_workers
+
+    def __append(self, files: list, results) -> List[int]:
+        lengths = []
+        for columns, chunk_lengths in results:
+            for file, column, (_, dtype) in zip(files, columns, _STORE_DTYPES):
+                file.write(np.ascontiguousarray(column, dtype=dtype).tobytes())
+            lengths.extend(chunk_lengths)
+
+        return lengths
+
+    def ingest(
+        self, paths: List[str], path: str, isins: List[str] = None
+    ) -> RaggedStore:
+        """Ingest csv files into a new store
+
+
+        Parameters
+        -------
+        paths: List[str]
+            Paths of the csv files, one per security
+        path: str
+            Directory of the store, an existing store is overwritten
+        isins: List[str]
+            ISIN of each file, default None (the name of each file without extension)
+
+
+        Returns
+        -------
+        RaggedStore
+            Read-only store of the histories, in the order of paths
+        """
+        paths = [str(file_path) for file_path in paths]
+        if isins is None:
+            isins = [
+                os.path.splitext(os.path.basename(file_path))[0] for file_path in paths
+            ]
+
+        if len(set(isins)) != len(isins):
+            raise ValueError("ISINs should be unique")
+
+        chunks = [
+            paths[start : start + self.chunk_size]
+            for start in range(0, len(paths), self.chunk_size)
+        ]
+
+        os.makedirs(path, exist_ok=True)
+        column_paths = [os.path.join(path, f"{name}.npy") for name, _ in _STORE_DTYPES]
+        files = [open(column_path, "wb") for column_path in column_paths]
+
+        try:
+            for file, (_, dtype) in zip(files, _STORE_DTYPES):
+                _write_header(file, dtype, 0)
+
+            if self.max_workers == 1:
+                lengths = self.__append(files, map(_parse_chunk, chunks))
+            else:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                    lengths = self.__append(files, executor.map(_parse_chunk, chunks))
+
+            for file, (_, dtype) in zip(files, _STORE_DTYPES):
+                _write_header(file, dtype, sum(lengths))
+        except BaseException:
+            for file in files:
+                file.close()
+            for column_path in column_paths:
+                os.remove(column_path)
+            raise
+        else:
+            for file in files:
+                file.close()
+
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        np.save(os.path.join(path, "isins.npy"), np.asarray(isins, dtype=str))
+        np.save(os.path.join(path, "offsets.npy"), offsets)
+
+        return RaggedStore(path)
@@ -0,0 +1,224 @@
+from typing import List, Dict, Type
+
+import numpy as np
+import pandas as pd
+
+from ..abstracts import data
+from ..timeseries.securitytimeseries import SecurityTimeSeries
+
+"""Panel of many securities, returned by bulk fetches of connections
+"""
+
+
+class SecurityPanel(data.AbstractSecurityPanel):
+    """Class holding time series and fields of many securities at once.
+    A concrete implementation of AbstractSecurityPanel.
+
+    Prices and total returns index are (T x N) arrays sharing one date axis,
+    stored column-major so that each security's time series is contiguous.
+
+
+    Parameters
+    -------
+    isins: List[str]
+        ISIN of each of the N securities
+    dates: numpy.ndarray
+        Dates of the T rows
+    prices: numpy.ndarray
+        (T x N) prices, NaN where a security has no data
+    tot_ret_idx: numpy.ndarray
+        (T x N) total returns index, NaN where a security has no data
+    descriptions: List[dict]
+        Descriptive fields of each security
+    exposures: List[dict]
+        Exposure fields of each security
+    security_classes: List[Type[AbstractSecurity]]
+        Class of each security, used by get_security
+
+
+    Example
+    -------
+    >>> panel = connection.get_securities(["15000", "15001"], ("2020-01-01", "2020-12-31"))
+    >>> prices, tot_ret_idx = panel.get_data()
+    >>> panel.get_exposures()
+                sector      geography
+    15000   Financials         Canada
+    15001   Financials  United States
+    >>> analyzer.add_securities(panel.get_securities())
+    """
+
+    def __init__(
+        self,
+        isins: List[str],
+        dates: np.ndarray,
+        prices: np.ndarray,
+        tot_ret_idx: np.ndarray,
+        descriptions: List[dict],
+        exposures: List[dict],
+        security_classes: List[Type[data.AbstractSecurity]],
+    ):
+        self.isins: List[str] = [str(isin) for isin in isins]
+        self.dates: np.ndarray = dates
+        self.prices: np.ndarray = prices
+        self.tot_ret_idx: np.ndarray = tot_ret_idx
+        self.descriptions: List[dict] = descriptions
+        self.exposures: List[dict] = exposures
+        self.security_classes: List[Type[data.AbstractSecurity]] = security_classes
+
+        self._cols: Dict[str, int] = {isin: col for col, isin in enumerate(self.isins)}
+
+    def __len__(self):
+        return len(self.isins)
+
+    @classmethod
+    def from_securities(
+        cls, securities: List[data.AbstractSecurity]
+    ) -> "SecurityPanel":
+        """Build a panel from securities
+
+        Dates are the union of every security's dates.
+
+
+        Parameters
+        -------
+        securities: List[AbstractSecurity]
+            Securities to hold
+
+
+        Returns
+        -------
+        SecurityPanel
+            Panel of the securities, NaN where a security has no data on a date
+        """
+        timeseries = [security.get_timeseries() for security in securities]
+        dates = np.unique(
+            np.concatenate(
+                [series.get_dates() for series in timeseries]
+                + [np.array([], dtype="datetime64[D]")]
+            )
+        )
+
+        prices = np.full((len(dates), len(securities)), np.nan, order="F")
+        tot_ret_idx = np.full((len(dates), len(securities)), np.nan, order="F")
+
+        for col, series in enumerate(timeseries):
+            rows = np.searchsorted(dates, series.get_dates())
+            prices[rows, col], tot_ret_idx[rows, col] = series.get_data()
+
+        return cls(
+            [security.get_isin() for security in securities],
+            dates,
+            prices,
+            tot_ret_idx,
+            [dict(security.get_description()) for security in securities],
+            [dict(security.get_exposures()) for security in securities],
+            [type(security) for security in securities],
+        )
+
+    @classmethod
+    def concat(cls, panels: List["SecurityPanel"]) -> "SecurityPanel":
+        """Join panels of different securities side by side
+
+
+        Parameters
+        -------
+        panels: List[SecurityPanel]
+            Panels to join
+
+
+        Returns
+        -------
+        SecurityPanel
+            Panel of every security, in order. Dates are the union of every
+            panel's dates.
+        """
+        if not all(
+            np.array_equal(panel.dates, panels[0].dates) for panel in panels[1:]
+        ):
+            return cls.from_securities(
+                [security for panel in panels for security in panel.get_securities()]
+            )
+
+        return cls(
+            [isin for panel in panels for isin in panel.isins],
+            panels[0].dates,
+            np.concatenate([panel.prices for panel in panels], axis=1),
+            np.concatenate([panel.tot_ret_idx for panel in panels], axis=1),
+            [description for panel in panels for description in panel.descriptions],
+            [exposures for panel in panels for exposures in panel.exposures],
+            [klass for panel in panels for klass in panel.security_classes],
+        )
+
+    def get_isins(self) -> List[str]:
+        """Returns ISIN of each security"""
+        return self.isins
+
+    def get_dates(self) -> np.ndarray:
+        """Returns dates of the panel's rows"""
+        return self.dates
+
+    def get_data(self):
+        """Returns (T x N) prices and total returns index"""
+        return self.prices, self.tot_ret_idx
+
+    def get_descriptions(self) -> pd.DataFrame:
+        """Returns descriptive fields as a table, one row per ISIN"""
+        return pd.DataFrame(self.descriptions, index=self.isins)
+
+    def get_exposures(self) -> pd.DataFrame:
+        """Returns exposure fields as a table, one row per ISIN"""
+        return pd.DataFrame(self.exposures, index=self.isins)
+
+    def get_timeseries(self, isin: str) -> SecurityTimeSeries:
+        """Get time series of one security, as views of the panel
+
+
+        Parameters
+        -------
+        isin: str
+            ISIN of the security
+
+
+        Returns
+        -------
+        SecurityTimeSeries
+            Prices and total returns index, on dates where the security has data
+        """
+        col = self._cols[str(isin)]
+        prices = self.prices[:, col]
+
+        valid = ~np.isnan(prices)
+        if valid.all():
+            return SecurityTimeSeries(self.dates, prices, self.tot_ret_idx[:, col])
+
+        return SecurityTimeSeries(
+            self.dates[valid], prices[valid], self.tot_ret_idx[valid, col]
+        )
+
+    def get_security(self, isin: str) -> data.AbstractSecurity:
+        """Get one security of the panel
+
+
+        Parameters
+        -------
+        isin: str
+            ISIN of the security
+
+
+        Returns
+        -------
+        AbstractSecurity
+            Security of its original class
+        """
+        col = self._cols[str(isin)]
+
+        return self.security_classes[col](
+            self.isins[col],
+            self.get_timeseries(isin),
+            self.descriptions[col],
+            self.exposures[col],
+        )
+
+    def get_securities(self) -> List[data.AbstractSecurity]:
+        """Returns every security of the panel, in order"""
+        return [self.get_security(isin) for isin in self.isins]
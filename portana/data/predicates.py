@@ -0,0 +1,369 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict, Tuple, Union
+
+from .index import Bitmap
+
+"""Predicates for screening tables of the simulated database
+
+Predicates can be combined with & (and), | (or) and ~ (not). They are evaluated
+against the indexes of a SimTable and return bitmaps of matching rows,
+or compiled to SQL for portana.data.sqlite.
+
+
+Example
+-------
+>>> predicate = In("sector", ["Technology", "Financials"]) & Range("5y_sharpe", low=1)
+>>> predicate = predicate & ~Eq("geography", "Canada")
+>>> str(predicate)
+"sector in ['Technology', 'Financials'] and `5y_sharpe` >= 1 and not geography == 'Canada'"
+>>> SimQuery("equity", predicate, "5y_sharpe", 10).send_query()
+"""
+
+
+def _quote(field: str) -> str:
+    """Quote field names that are not identifiers, the way DataFrame.query expects"""
+    return field if field.isidentifier() else f"`{field}`"
+
+
+def quote_sql(name: str) -> str:
+    """Quote a table or column name for SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class Predicate(ABC):
+    """Abstract class for a predicate on rows of a table"""
+
+    def __and__(self, other: "Predicate") -> "Predicate":
+        return And([self, other])
+
+    def __or__(self, other: "Predicate") -> "Predicate":
+        return Or([self, other])
+
+    def __invert__(self) -> "Predicate":
+        return Not(self)
+
+    @abstractmethod
+    def __str__(self):
+        pass
+
+    @abstractmethod
+    def key(self) -> tuple:
+        """Returns a normalized, hashable form of the predicate
+
+        Predicates matching the same rows by construction share a key,
+        e.g. regardless of the order of fields in an And.
+        """
+        pass
+
+    @abstractmethod
+    def to_sql(self) -> Tuple[str, list]:
+        """Returns an SQL condition and its parameters
+
+        As with evaluate, rows with a missing value never match a predicate on
+        that field, and always match its negation.
+        """
+        pass
+
+    @abstractmethod
+    def estimate(self, table) -> int:
+        """Returns an estimate of number of matching rows, used to order evaluation"""
+        pass
+
+    @abstractmethod
+    def evaluate(self, table) -> Bitmap:
+        """Returns matching rows of table"""
+        pass
+
+
+class Eq(Predicate):
+    """Predicate for field == value"""
+
+    def __init__(self, field: str, value: Union[str, float]):
+        self.field = field
+        self.value = value
+
+    def __str__(self):
+        return f"{_quote(self.field)} == {self.value!r}"
+
+    def key(self) -> tuple:
+        return ("in", self.field, frozenset([self.value]))
+
+    def to_sql(self) -> Tuple[str, list]:
+        return f"{quote_sql(self.field)} = ?", [self.value]
+
+    def estimate(self, table) -> int:
+        return table.get_index(self.field).count_isin([self.value])
+
+    def evaluate(self, table) -> Bitmap:
+        return table.get_index(self.field).isin([self.value])
+
+
+class In(Predicate):
+    """Predicate for field in values"""
+
+    def __init__(self, field: str, values: List[Union[str, float]]):
+        self.field = field
+        self.values = list(values)
+
+    def __str__(self):
+        return f"{_quote(self.field)} in {self.values!r}"
+
+    def key(self) -> tuple:
+        return ("in", self.field, frozenset(self.values))
+
+    def to_sql(self) -> Tuple[str, list]:
+        if not self.values:
+            return "0", []
+
+        placeholders = ", ".join("?" * len(self.values))
+
+        return f"{quote_sql(self.field)} IN ({placeholders})", list(self.values)
+
+    def estimate(self, table) -> int:
+        return table.get_index(self.field).count_isin(self.values)
+
+    def evaluate(self, table) -> Bitmap:
+        return table.get_index(self.field).isin(self.values)
+
+
+class Range(Predicate):
+    """Predicate for low <= field <= high
+
+    Either bound can be None for an open range, and made exclusive through
+    include_low and include_high.
+    """
+
+    def __init__(
+        self,
+        field: str,
+        low: Union[str, float] = None,
+        high: Union[str, float] = None,
+        include_low: bool = True,
+        include_high: bool = True,
+    ):
+        self.field = field
+        self.low = low
+        self.high = high
+        self.include_low = include_low
+        self.include_high = include_high
+
+    def __str__(self):
+        bounds = []
+        if self.low is not None:
+            bounds.append(
+                f"{_quote(self.field)} {'>=' if self.include_low else '>'} {self.low!r}"
+            )
+        if self.high is not None:
+            bounds.append(
+                f"{_quote(self.field)} {'<=' if self.include_high else '<'} {self.high!r}"
+            )
+
+        if not bounds:
+            return f"{_quote(self.field)} == {_quote(self.field)}"
+
+        return " and ".join(bounds)
+
+    def key(self) -> tuple:
+        return (
+            "range",
+            self.field,
+            self.low,
+            self.high,
+            self.include_low or self.low is None,
+            self.include_high or self.high is None,
+        )
+
+    def to_sql(self) -> Tuple[str, list]:
+        field = quote_sql(self.field)
+        conditions = []
+        params = []
+
+        if self.low is not None:
+            conditions.append(f"{field} {'>=' if self.include_low else '>'} ?")
+            params.append(self.low)
+        if self.high is not None:
+            conditions.append(f"{field} {'<=' if self.include_high else '<'} ?")
+            params.append(self.high)
+
+        if not conditions:
+            return f"{field} IS NOT NULL", []
+
+        return " AND ".join(conditions), params
+
+    def estimate(self, table) -> int:
+        return table.get_index(self.field).count_between(
+            self.low, self.high, self.include_low, self.include_high
+        )
+
+    def evaluate(self, table) -> Bitmap:
+        return table.get_index(self.field).between(
+            self.low, self.high, self.include_low, self.include_high
+        )
+
+
+class And(Predicate):
+    """Predicate matching rows that match every predicate
+
+    Predicates are evaluated from the most to the least selective,
+    stopping as soon as no row is left.
+    """
+
+    def __init__(self, predicates: List[Predicate]):
+        self.predicates = []
+        for predicate in predicates:
+            if isinstance(predicate, And):
+                self.predicates.extend(predicate.predicates)
+            else:
+                self.predicates.append(predicate)
+
+    def __str__(self):
+        return " and ".join(
+            f"({predicate})" if isinstance(predicate, Or) else str(predicate)
+            for predicate in self.predicates
+        )
+
+    def key(self) -> tuple:
+        keys = frozenset(predicate.key() for predicate in self.predicates)
+        return next(iter(keys)) if len(keys) == 1 else ("and", keys)
+
+    def to_sql(self) -> Tuple[str, list]:
+        if not self.predicates:
+            return "1", []
+
+        compiled = [predicate.to_sql() for predicate in self.predicates]
+
+        return (
+            " AND ".join(f"({condition})" for condition, _ in compiled),
+            [param for _, params in compiled for param in params],
+        )
+
+    def estimate(self, table) -> int:
+        return min(
+            (predicate.estimate(table) for predicate in self.predicates),
+            default=len(table),
+        )
+
+    def evaluate(self, table) -> Bitmap:
+        if not self.predicates:
+            return Bitmap.full(len(table))
+
+        predicates = sorted(
+            self.predicates, key=lambda predicate: predicate.estimate(table)
+        )
+
+        bitmap = predicates[0].evaluate(table)
+        for predicate in predicates[1:]:
+            if not bitmap.words.any():
+                break
+            bitmap = bitmap & predicate.evaluate(table)
+
+        return bitmap
+
+
+class Or(Predicate):
+    """Predicate matching rows that match any predicate"""
+
+    def __init__(self, predicates: List[Predicate]):
+        self.predicates = []
+        for predicate in predicates:
+            if isinstance(predicate, Or):
+                self.predicates.extend(predicate.predicates)
+            else:
+                self.predicates.append(predicate)
+
+    def __str__(self):
+        return " or ".join(
+            f"({predicate})" if isinstance(predicate, And) else str(predicate)
+            for predicate in self.predicates
+        )
+
+    def key(self) -> tuple:
+        keys = frozenset(predicate.key() for predicate in self.predicates)
+        return next(iter(keys)) if len(keys) == 1 else ("or", keys)
+
+    def to_sql(self) -> Tuple[str, list]:
+        if not self.predicates:
+            return "0", []
+
+        compiled = [predicate.to_sql() for predicate in self.predicates]
+
+        return (
+            " OR ".join(f"({condition})" for condition, _ in compiled),
+            [param for _, params in compiled for param in params],
+        )
+
+    def estimate(self, table) -> int:
+        return min(
+            sum(predicate.estimate(table) for predicate in self.predicates), len(table)
+        )
+
+    def evaluate(self, table) -> Bitmap:
+        bitmap = Bitmap.empty(len(table))
+        for predicate in self.predicates:
+            bitmap = bitmap | predicate.evaluate(table)
+
+        return bitmap
+
+
+class Not(Predicate):
+    """Predicate matching rows that do not match predicate"""
+
+    def __init__(self, predicate: Predicate):
+        self.predicate = predicate
+
+    def __str__(self):
+        if isinstance(self.predicate, (And, Or)):
+            return f"not ({self.predicate})"
+
+        return f"not {self.predicate}"
+
+    def key(self) -> tuple:
+        return ("not", self.predicate.key())
+
+    def to_sql(self) -> Tuple[str, list]:
+        condition, params = self.predicate.to_sql()
+
+        # Rows with missing values do not match the predicate, so they match its
+        # negation, whereas NOT NULL is NULL
+        return f"NOT coalesce(({condition}), 0)", params
+
+    def estimate(self, table) -> int:
+        return len(table) - self.predicate.estimate(table)
+
+    def evaluate(self, table) -> Bitmap:
+        return ~self.predicate.evaluate(table)
+
+
+def from_fields(
+    fields: Union[Dict[str, Union[str, float, list]], Predicate],
+) -> Predicate:
+    """Convert SimQuery fields to a predicate
+
+
+    Parameters
+    -------
+    fields: Union[dict, Predicate]
+        Either a predicate, which is returned as is, or a dictionary of fields
+        and values. A list, tuple or set value matches any of its elements,
+        a Predicate value is used as is. Example: {"geography": "Canada",
+        "sector": ["Technology", "Financials"]}
+
+
+    Returns
+    -------
+    Predicate
+        Predicate matching every field
+    """
+    if isinstance(fields, Predicate):
+        return fields
+
+    predicates = []
+    for field, value in fields.items():
+        if isinstance(value, Predicate):
+            predicates.append(value)
+        elif isinstance(value, (list, tuple, set)):
+            predicates.append(In(field, value))
+        else:
+            predicates.append(Eq(field, value))
+
+    return And(predicates)
@@ -0,0 +1,168 @@
+from typing import Dict, Hashable, Set
+from collections import OrderedDict
+import threading
+
+import numpy as np
+
+"""Cache of query results for the simulated database
+
+Results are cached as arrays of row numbers. A sorted screen is cached once, either
+fully sorted or as its first rows, so that every page of it is a slice of the same
+cached array; a page deeper than a cached prefix replaces it with a longer one.
+"""
+
+
+class QueryCache:
+    """Class to cache query results with least-recently-used eviction
+
+
+    Parameters
+    -------
+    max_entries: int
+        Maximum number of cached results, default 1024
+    max_bytes: int
+        Maximum total size of cached results in bytes, default 64 MB
+
+
+    Attributes
+    -------
+    hits: int
+        Number of lookups that found a cached result
+    misses: int
+        Number of lookups that did not
+    evictions: int
+        Number of results evicted to stay within max_entries and max_bytes
+    nbytes: int
+        Total size of cached results in bytes
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.nbytes: int = 0
+
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._prefixes: Set[Hashable] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __pop(self, key: Hashable) -> np.ndarray:
+        self._prefixes.discard(key)
+
+        return self._entries.pop(key)
+
+    def get(self, key: Hashable, min_rows: int = None) -> np.ndarray:
+        """Get a cached result and mark it as most recently used
+
+
+        Parameters
+        -------
+        key: Hashable
+            Normalized query
+        min_rows: int
+            Number of first rows needed, a cached prefix shorter than that is a miss.
+            Default None (the complete result is needed)
+
+
+        Returns
+        -------
+        numpy.ndarray
+            Cached read-only row numbers, None if the query is not cached
+        """
+        with self._lock:
+            rows = self._entries.get(key)
+
+            if rows is not None and key in self._prefixes:
+                if min_rows is None or len(rows) < min_rows:
+                    rows = None
+
+            if rows is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+
+            return rows
+
+    def put(self, key: Hashable, rows: np.ndarray, complete: bool = True) -> np.ndarray:
+        """Cache a result, evicting least recently used results if needed
+
+
+        Parameters
+        -------
+        key: Hashable
+            Normalized query
+        rows: numpy.ndarray
+            Row numbers of the result
+        complete: bool
+            False if rows are only the first rows of the result, default True
+
+
+        Returns
+        -------
+        numpy.ndarray
+            The cached row numbers, made read-only, or rows unchanged if they are
+            larger than max_bytes and not cached
+        """
+        if rows.nbytes > self.max_bytes:
+            return rows
+
+        rows.flags.writeable = False
+
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self.__pop(key).nbytes
+
+            self._entries[key] = rows
+            self.nbytes += rows.nbytes
+            if not complete:
+                self._prefixes.add(key)
+
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                self.nbytes -= self.__pop(next(iter(self._entries))).nbytes
+                self.evictions += 1
+
+        return rows
+
+    def invalidate(self, asset_type: str = None) -> None:
+        """Drop cached results
+
+
+        Parameters
+        -------
+        asset_type: str
+            Only drop results of this table, default None (drop every result).
+            Keys are expected to start with the asset type.
+        """
+        with self._lock:
+            if asset_type is None:
+                self._entries.clear()
+                self._prefixes.clear()
+                self.nbytes = 0
+                return
+
+            for key in [key for key in self._entries if key[0] == asset_type]:
+                self.nbytes -= self.__pop(key).nbytes
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache statistics
+
+
+        Returns
+        -------
+        dict
+            Hits, misses, evictions, number of entries and size in bytes
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+        }
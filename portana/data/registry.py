@@ -0,0 +1,206 @@
+from typing import Dict, Hashable, Tuple
+import threading
+import weakref
+
+import numpy as np
+
+from ..abstracts import data
+from .panel import SecurityPanel
+
+"""Process-wide identity map of securities
+
+Fetching the same ISIN and date range through different connections, or different
+code paths, returns separate but identical securities. A SecurityRegistry keeps
+a weak reference to every security fetched through it, keyed by the connection's
+source (see AbstractConnection.get_source), ISIN and date range, and returns the
+same object for as long as it is referenced anywhere else.
+
+
+Example
+-------
+>>> first = SimConnection()
+>>> first.set_asset_type(SimEquityAssetType())
+>>> second = SimConnection()
+>>> second.set_asset_type(SimEquityAssetType())
+>>> a = RegisteredConnection(first).get_security("15000", ("2020-01-01", "2020-12-31"))
+>>> b = RegisteredConnection(second).get_security("15000", ("2020-01-01", "2020-12-31"))
+>>> a is b
+True
+"""
+
+
+def _get_nbytes(security: data.AbstractSecurity) -> int:
+    timeseries = security.get_timeseries()
+    prices, tot_ret_idx = timeseries.get_data()
+
+    return timeseries.get_dates().nbytes + prices.nbytes + tot_ret_idx.nbytes
+
+
+class SecurityRegistry:
+    """Class to share securities fetched through any connection
+
+
+    Attributes
+    -------
+    hits: int
+        Number of requests served by a registered security
+    misses: int
+        Number of requests that fetched a security from a connection
+    bytes_saved: int
+        Size of the time series that hits did not duplicate, in bytes
+
+
+    Note
+    -------
+    Time series of registered securities are shared by every caller, so their
+    arrays are made read-only.
+
+    Two threads missing the same key at once both fetch the security, but the
+    registry only ever returns one of them.
+    """
+
+    def __init__(self):
+        self.hits: int = 0
+        self.misses: int = 0
+        self.bytes_saved: int = 0
+
+        self._securities: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._securities)
+
+    def get_security(
+        self,
+        connection: data.AbstractConnection,
+        isin: str,
+        date_range: Tuple[str, str],
+    ) -> data.AbstractSecurity:
+        """Get a security, fetching it from connection if it is not registered
+
+
+        Parameters
+        -------
+        connection: AbstractConnection
+            Connection to fetch the security from
+        isin: str
+        date_range: Tuple[str, str]
+
+
+        Returns
+        -------
+        AbstractSecurity
+            Registered security
+        """
+        key = self.get_key(connection.get_source(), isin, date_range)
+
+        with self._lock:
+            security = self._securities.get(key)
+            if security is not None:
+                self.hits += 1
+                self.bytes_saved += _get_nbytes(security)
+                return security
+
+        fetched = connection.get_security(isin, date_range)
+
+        timeseries = fetched.get_timeseries()
+        for array in (timeseries.get_dates(), *timeseries.get_data()):
+            array.flags.writeable = False
+
+        with self._lock:
+            security = self._securities.get(key)
+            if security is not None:
+                self.hits += 1
+                self.bytes_saved += _get_nbytes(security)
+                return security
+
+            self._securities[key] = fetched
+            self.misses += 1
+
+        return fetched
+
+    @staticmethod
+    def get_key(source: Hashable, isin: str, date_range: Tuple[str, str]) -> tuple:
+        """Returns the registry key of a security
+
+        Dates are normalized to days, so that date strings and numpy.datetime64
+        dates share a key.
+        """
+        return (
+            source,
+            str(isin),
+            np.datetime64(date_range[0], "D"),
+            np.datetime64(date_range[1], "D"),
+        )
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get registry statistics
+
+
+        Returns
+        -------
+        dict
+            Hits, misses, number of live securities, size of their time series
+            and size saved by hits, in bytes
+        """
+        with self._lock:
+            securities = list(self._securities.values())
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(securities),
+            "bytes": sum(_get_nbytes(security) for security in securities),
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+registry = SecurityRegistry()
+""" Process-wide registry, used by RegisteredConnection by default """
+
+
+class RegisteredConnection(data.AbstractConnection):
+    """Connection sharing securities fetched through another connection
+
+    A concrete implementation of AbstractConnection, wrapping any other connection.
+
+
+    Parameters
+    -------
+    connection: AbstractConnection
+        Connection to fetch securities from
+    security_registry: SecurityRegistry
+        Registry to share securities through, default None (the process-wide registry)
+    """
+
+    panel_class = SecurityPanel
+
+    def __init__(
+        self,
+        connection: data.AbstractConnection,
+        security_registry: SecurityRegistry = None,
+    ):
+        self.connection = connection
+        self.registry = registry if security_registry is None else security_registry
+
+    def get_source(self):
+        """Returns the source of the wrapped connection"""
+        return self.connection.get_source()
+
+    def get_security(
+        self, isin: str, date_range: Tuple[str, str]
+    ) -> data.AbstractSecurity:
+        """Returns a security by ISIN and date range, shared with other connections
+
+
+        Parameters
+        -------
+        isin: str
+        date_range: Tuple[str, str]
+
+        Returns
+        -------
+        AbstractSecurity
+            Registered security, with read-only time series
+        """
+        return self.registry.get_security(self.connection, isin, date_range)
@@ -0,0 +1,392 @@
+from typing import Dict, Literal, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import tempfile
+
+import numpy as np
+
+from ..abstracts import data
+from . import database
+from .simulated import SimEquityAssetType, SimEquityFundAssetType
+from .universe import PanelStore, UniverseBuilder
+
+"""Vectorized screener recomputing metrics of every security of a database
+
+The metric columns of the simulated database (e.g. 5y_sharpe) are static values
+that do not match the simulated time series. UniverseScreener simulates the series
+of every row of a table into a PanelStore, computes metrics over chunks of columns
+of the panel, and writes them back into the table as indexed columns:
+
+    <prefix>return          cumulative return over the period
+    <prefix>vol             annualized volatility of returns
+    <prefix>sharpe          (return - rfr) / vol
+    <prefix>beta            beta of returns against the benchmark
+    <prefix>max_drawdown    largest drawdown over the period, as a negative fraction
+
+Metrics are computed with the same formulas as EquityAnalyzer, so that a screened
+value matches what EquityAnalyzer returns for that security over the same dates.
+
+
+Example
+-------
+>>> connection = SimConnection()
+>>> connection.set_asset_type(SimEquityAssetType())
+>>> benchmark = connection.get_security("0", ("2016-01-01", "2020-12-31"))
+>>> screener = UniverseScreener("equity", benchmark, ("2016-01-01", "2020-12-31"))
+>>> columns = screener.screen()
+>>> SimQuery("equity", Range("5y_beta", high=1), "5y_sharpe", 10, 0).send_query()
+"""
+
+ASSET_TYPES = {"equity": SimEquityAssetType, "equityfund": SimEquityFundAssetType}
+""" Asset type simulating the securities of each table """
+
+METRICS = ("return", "vol", "sharpe", "beta", "max_drawdown")
+""" Metrics computed by the screener, written as <prefix><metric> columns """
+
+
+def compute_metrics(
+    series: np.ndarray, index: np.ndarray, adj_factor: int, rfr: float
+) -> Dict[str, np.ndarray]:
+    """Compute metrics of securities against a benchmark
+
+
+    Parameters
+    -------
+    series: numpy.ndarray
+        (T x N) prices or total returns index of the securities
+    index: numpy.ndarray
+        T prices or total returns index of the benchmark
+    adj_factor: int
+        Adjustment factor to annualize volatility, see EquityAnalyzer.get_volatilities
+    rfr: float
+        Risk free rate
+
+
+    Returns
+    -------
+    Dict[str, numpy.ndarray]
+        Value of each metric in METRICS, one per security
+    """
+    series = np.asarray(series, dtype=np.float64)
+    index = np.asarray(index, dtype=np.float64)[:, np.newaxis]
+
+    returns = np.diff(series, axis=0) / series[:-1]
+    index_returns = np.diff(index, axis=0) / index[:-1]
+
+    total_return = np.prod(returns + 1, axis=0) - 1
+    vol = np.std(returns, axis=0, ddof=1) * np.sqrt(adj_factor)
+
+    deviations = returns - returns.mean(axis=0)
+    index_deviations = index_returns - index_returns.mean(axis=0)
+    covariance = (deviations * index_deviations).sum(axis=0) / (len(returns) - 1)
+    beta = covariance / np.var(index_returns, ddof=1)
+
+    # Drawdowns of the rebased index, as in EquityAnalyzer.get_drawdowns
+    rebased = np.empty_like(series)
+    rebased[0] = 100.0
+    rebased[1:] = returns + 1
+    np.cumprod(rebased, axis=0, out=rebased)
+    peaks = np.fmax.accumulate(rebased, axis=0)
+    max_drawdown = np.min((rebased - peaks) / peaks, axis=0)
+
+    return {
+        "return": total_return,
+        "vol": vol,
+        "sharpe": (total_return - rfr) / vol,
+        "beta": beta,
+        "max_drawdown": max_drawdown,
+    }
+
+
+def _screen_chunk(
+    path: str,
+    mode: Literal["px", "tr"],
+    start: int,
+    stop: int,
+    index: np.ndarray,
+    adj_factor: int,
+    rfr: float,
+) -> Dict[str, np.ndarray]:
+    """Compute metrics of columns start to stop - 1 of a panel
+
+    Module-level so that it can be sent to worker processes.
+    """
+    prices, tot_ret_idx = PanelStore(path).get_data()
+    series = prices if mode == "px" else tot_ret_idx
+
+    return compute_metrics(series[:, start:stop], index, adj_factor, rfr)
+
+
+class UniverseScreener:
+    """Class to compute metrics of every security of a table in vectorized passes
+
+
+    Parameters
+    -------
+    asset_type: str
+        Table to screen, either "equity" or "equityfund"
+    benchmark: AbstractSecurity
+        Benchmark to compute betas against, with a time series covering date_range
+    date_range: Tuple[str, str]
+        Period over which metrics are computed
+
+
+    Attributes
+    -------
+    mode: str
+        "px" for metrics of prices, "tr" for metrics of total returns
+    adj_factor: int
+        Adjustment factor to annualize volatility, see EquityAnalyzer.get_volatilities
+    rfr: float
+        Risk free rate
+    prefix: str
+        Prefix of the metric columns, e.g. "5y_" for 5y_sharpe, default None (derived
+        from the length of date_range, see get_prefix)
+    chunk_size: int
+        Number of securities simulated or screened by a worker at a time
+    max_workers: int
+        Number of worker processes, None to use every core, 1 to run in this process
+
+
+    Example
+    -------
+    >>> screener = UniverseScreener("equityfund", benchmark, ("2016-01-01", "2020-12-31"))
+    >>> screener.set_max_workers(4)
+    >>> columns = screener.screen(persist=True)
+    >>> columns["5y_sharpe"]
+    array([ 0.5513, -0.0712, ...])
+    """
+
+    def __init__(
+        self,
+        asset_type: str,
+        benchmark: data.AbstractSecurity,
+        date_range: Tuple[str, str],
+    ):
+        self.asset_type = asset_type.lower()
+        self.benchmark = benchmark
+        self.date_range = date_range
+
+        self.mode: str = "tr"
+        self.adj_factor: int = 252
+        self.rfr: float = 0.0
+        self.prefix: str = None
+        self.chunk_size: int = 1000
+        self.max_workers: int = None
+
+    def set_mode(self, mode: Literal["px", "tr"]) -> None:
+        """Setter for mode
+
+
+        Parameters
+        -------
+        mode: str
+            "px" for metrics of prices, "tr" for metrics of total returns
+        """
+        self.mode = mode
+
+    def set_adj_factor(self, adj_factor: int) -> None:
+        """Setter for adj_factor
+
+
+        Parameters
+        -------
+        adj_factor: int
+            Adjustment factor to annualize volatility
+        """
+        self.adj_factor = adj_factor
+
+    def set_rfr(self, rfr: float) -> None:
+        """Setter for rfr
+
+
+        Parameters
+        -------
+        rfr: float
+            Risk free rate
+        """
+        self.rfr = rfr
+
+    def set_prefix(self, prefix: str) -> None:
+        """Setter for prefix
+
+
+        Parameters
+        -------
+        prefix: str
+            Prefix of the metric columns, None to derive it from date_range
+        """
+        self.prefix = prefix
+
+    def get_prefix(self) -> str:
+        """Get the prefix of the metric columns
+
+        Unless set with set_prefix, the prefix is the length of date_range rounded to
+        whole months, written in years when it is a whole number of them, e.g. "5y_"
+        for ("2016-01-01", "2020-12-31") or "18m_" for ("2019-01-01", "2020-06-30").
+
+
+        Returns
+        -------
+        str
+            Prefix of the metric columns
+        """
+        if self.prefix is not None:
+            return self.prefix
+
+        start, end = np.array(self.date_range, dtype="datetime64[D]")
+        days = int((end - start) / np.timedelta64(1, "D")) + 1
+
+        months = max(round(days / 30.4375), 1)
+        if months % 12 == 0:
+            return f"{months // 12}y_"
+
+        return f"{months}m_"
+
+    def set_chunk_size(self, chunk_size: int) -> None:
+        """Setter for chunk_size
+
+
+        Parameters
+        -------
+        chunk_size: int
+            Number of securities simulated or screened by a worker at a time
+        """
+        self.chunk_size = chunk_size
+
+    def set_max_workers(self, max_workers: int) -> None:
+        """Setter for max_workers
+
+
+        Parameters
+        -------
+        max_workers: int
+            Number of worker processes, None to use every core, 1 to run in this process
+        """
+        self.max_workers = max_workers
+
+    def __get_index(self, dates: np.ndarray) -> np.ndarray:
+        timeseries = self.benchmark.get_timeseries()[str(dates[0]) : str(dates[-1])]
+        prices, tot_ret_idx = timeseries.get_data()
+
+        if not np.array_equal(timeseries.get_dates(), dates):
+            raise ValueError(
+                f"Benchmark {self.benchmark.get_isin()} does not cover the dates "
+                "of the panel"
+            )
+
+        return prices if self.mode == "px" else tot_ret_idx
+
+    def __align(
+        self, isins: np.ndarray, columns: Dict[str, np.ndarray]
+    ) -> Dict[str, np.ndarray]:
+        table = database.get_table(self.asset_type)
+
+        cols = {str(isin): col for col, isin in enumerate(isins)}
+        rows = np.array([cols.get(str(isin), -1) for isin in table.isins])
+        found = rows >= 0
+
+        aligned = {}
+        for field, values in columns.items():
+            aligned[field] = np.full(len(table), np.nan)
+            aligned[field][found] = values[rows[found]]
+
+        return aligned
+
+    def build_panel(self, path: str) -> PanelStore:
+        """Simulate every security of the table into a panel
+
+
+        Parameters
+        -------
+        path: str
+            Directory of the panel, an existing panel is overwritten
+
+
+        Returns
+        -------
+        PanelStore
+            Read-only panel, one column per row of the table
+        """
+        builder = UniverseBuilder(ASSET_TYPES[self.asset_type]())
+        builder.set_chunk_size(self.chunk_size)
+        builder.set_max_workers(self.max_workers)
+
+        return builder.build(
+            database.get_table(self.asset_type).isins, self.date_range, path
+        )
+
+    def compute(self, store: PanelStore) -> Dict[str, np.ndarray]:
+        """Compute metrics of every security of a panel
+
+
+        Parameters
+        -------
+        store: PanelStore
+            Panel of the securities
+
+
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Value of each <prefix><metric> column, one per column of the panel
+        """
+        index = self.__get_index(store.get_dates())
+
+        size = len(store.get_isins())
+        starts = list(range(0, size, self.chunk_size))
+        stops = [min(start + self.chunk_size, size) for start in starts]
+        args = (
+            [store.path] * len(starts),
+            [self.mode] * len(starts),
+            starts,
+            stops,
+            [index] * len(starts),
+            [self.adj_factor] * len(starts),
+            [self.rfr] * len(starts),
+        )
+
+        if self.max_workers == 1:
+            results = list(map(_screen_chunk, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(_screen_chunk, *args))
+
+        return {
+            f"{self.get_prefix()}{metric}": np.concatenate(
+                [result[metric] for result in results]
+            )
+            for metric in METRICS
+        }
+
+    def screen(
+        self, store: PanelStore = None, persist: bool = False
+    ) -> Dict[str, np.ndarray]:
+        """Compute metrics of every security of the table and write them back
+        as indexed columns, see portana.data.database.update_columns
+
+
+        Parameters
+        -------
+        store: PanelStore
+            Panel of the securities, e.g. built by build_panel or UniverseBuilder,
+            default None (simulate the table into a temporary panel). Securities
+            of the table missing from the panel get NaN metrics.
+        persist: bool
+            Whether to also rewrite the table's csv file, default False
+
+
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Value of each <prefix><metric> column, in the row order of the table
+        """
+        if store is None:
+            with tempfile.TemporaryDirectory() as path:
+                columns = self.compute(self.build_panel(os.path.join(path, "panel")))
+        else:
+            columns = self.__align(store.get_isins(), self.compute(store))
+
+        database.update_columns(self.asset_type, columns, persist)
+
+        return columns
@@ -1,6 +1,107 @@
+from typing import Dict, Tuple
+from collections.abc import Mapping
+import sys
+import threading
+
 from ..abstracts import data
 from ..timeseries.securitytimeseries import SecurityTimeSeries
 
+"""Securities
+
+Securities are kept compact for universes of many securities: they have no
+instance __dict__, and their description and exposures are stored as one tuple
+of values, laid out by a FieldSchema shared by every security with the same fields.
+String values are interned, so that a category such as "United States" is a single
+object however many securities have it. Securities can be weakly referenced,
+see portana.data.registry.
+"""
+
+_schemas: Dict[Tuple[tuple, tuple], "FieldSchema"] = {}
+_schemas_lock = threading.Lock()
+
+
+def _intern(value):
+    return sys.intern(str(value)) if isinstance(value, str) else value
+
+
+class FieldSchema:
+    """Class holding the layout of description and exposure fields
+
+    Use FieldSchema.get, which returns one shared schema per set of fields.
+
+
+    Attributes
+    -------
+    description: Dict[str, int]
+        Position of each description field in the values of a security
+    exposures: Dict[str, int]
+        Position of each exposure field in the values of a security
+    """
+
+    __slots__ = ("description", "exposures")
+
+    def __init__(self, description_keys: tuple, exposure_keys: tuple):
+        self.description: Dict[str, int] = {
+            _intern(key): position for position, key in enumerate(description_keys)
+        }
+        self.exposures: Dict[str, int] = {
+            _intern(key): position
+            for position, key in enumerate(exposure_keys, len(description_keys))
+        }
+
+    @classmethod
+    def get(cls, description_keys: tuple, exposure_keys: tuple) -> "FieldSchema":
+        """Get the shared schema of description and exposure fields
+
+
+        Parameters
+        -------
+        description_keys: tuple
+            Names of description fields, in order
+        exposure_keys: tuple
+            Names of exposure fields, in order
+
+
+        Returns
+        -------
+        FieldSchema
+            Schema shared by every security with these fields
+        """
+        key = (description_keys, exposure_keys)
+
+        schema = _schemas.get(key)
+        if schema is None:
+            with _schemas_lock:
+                schema = _schemas.setdefault(key, cls(description_keys, exposure_keys))
+
+        return schema
+
+
+class FieldView(Mapping):
+    """Read-only dict-like view of description or exposure fields of a security
+
+    Compares equal to a dict with the same items, convert it with dict()
+    for a mutable copy.
+    """
+
+    __slots__ = ("_positions", "_values")
+
+    def __init__(self, positions: Dict[str, int], values: tuple):
+        self._positions = positions
+        self._values = values
+
+    def __getitem__(self, key: str):
+        return self._values[self._positions[key]]
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __repr__(self):
+        return repr(dict(self))
+
 
 class Security(data.AbstractSecurity):
     """Class containing information pertaining to a security.
@@ -24,12 +125,16 @@ class Security(data.AbstractSecurity):
         Security's ISIN (unique identifier)
     timeseries: SimTimeSeries
         Security's time series data
-    description: dict
-        Security's descriptive data
-    exposures: dict
-        Security's exposure data
+    description: FieldView
+        Security's descriptive data, as a read-only dict-like view. Assign a dict
+        to replace it.
+    exposures: FieldView
+        Security's exposure data, as a read-only dict-like view. Assign a dict
+        to replace it.
     """
 
+    __slots__ = ("isin", "timeseries", "_schema", "_values", "__weakref__")
+
     def __init__(
         self,
         isin: str,
@@ -39,10 +144,43 @@ class Security(data.AbstractSecurity):
     ):
         self.isin: str = isin
         self.timeseries: SecurityTimeSeries = timeseries
-        self.description: dict = description
-        self.exposures: dict = exposures
+        self.__set_fields(description, exposures)
         super().__init__()
 
+    def __set_fields(self, description: Mapping, exposures: Mapping) -> None:
+        self._schema: FieldSchema = FieldSchema.get(
+            tuple(description), tuple(exposures)
+        )
+        self._values: tuple = tuple(
+            _intern(value) for value in (*description.values(), *exposures.values())
+        )
+
+    @property
+    def description(self) -> FieldView:
+        return FieldView(self._schema.description, self._values)
+
+    @description.setter
+    def description(self, description: dict) -> None:
+        self.__set_fields(description, self.exposures)
+
+    @property
+    def exposures(self) -> FieldView:
+        return FieldView(self._schema.exposures, self._values)
+
+    @exposures.setter
+    def exposures(self, exposures: dict) -> None:
+        self.__set_fields(self.description, exposures)
+
+    def __reduce__(self):
+        # Rebuilt from its fields, so that the copy shares the schema and interned
+        # strings of the process it is loaded in
+        return type(self), (
+            self.isin,
+            self.timeseries,
+            dict(self.description),
+            dict(self.exposures),
+        )
+
     def __repr__(self):
         output = ""
         output += f"ISIN:   {self.isin} \n"
@@ -84,8 +222,8 @@ class Security(data.AbstractSecurity):
 
         Returns
         -------
-        dict
-            Security's description fields
+        FieldView
+            Security's description fields, as a read-only dict-like view
         """
         return self.description
 
@@ -94,8 +232,8 @@ class Security(data.AbstractSecurity):
 
         Returns
         -------
-        dict
-            Security's exposure fields
+        FieldView
+            Security's exposure fields, as a read-only dict-like view
         """
         return self.exposures
 
@@ -105,7 +243,7 @@ class Equity(Security):
     Child of Security class.
     """
 
-    pass
+    __slots__ = ()
 
 
 class EquityFund(Security):
@@ -113,7 +251,7 @@ class EquityFund(Security):
     Child of Security class.
     """
 
-    pass
+    __slots__ = ()
 
 
 class PortfolioSecurity(Security):
@@ -121,4 +259,4 @@ class PortfolioSecurity(Security):
     Child of Security class.
     """
 
-    pass
+    __slots__ = ()
@@ -1,11 +1,17 @@
 from typing import List, Tuple, Literal, Dict, Union
+from abc import abstractmethod
+import copy
+import time
 
-import pandas as pd
+import numpy as np
 
 from . import generator
+from . import database
+from . import predicates
 from ..abstracts import data
 from ..timeseries.securitytimeseries import SecurityTimeSeries
 from .security import Equity, EquityFund, Security
+from .panel import SecurityPanel
 
 
 class SimConnection(data.AbstractConnection):
@@ -13,8 +19,11 @@ class SimConnection(data.AbstractConnection):
     A concrete implementation of AbstractConnection class.
     """
 
+    panel_class = SecurityPanel
+
     def __init__(self):
         self._asset_type: data.AbstractAssetType = None
+        self._latency: float = 0.0
 
     def set_asset_type(self, asset_type: data.AbstractAssetType):
         """Sets the connection to retrieve a security in particular asset class
@@ -28,6 +37,32 @@ class SimConnection(data.AbstractConnection):
         """
         self._asset_type = asset_type
 
+    def get_source(self) -> tuple:
+        """Returns a key identifying the data this connection returns
+
+        Simulated data only depends on the asset type's class and the settings of its
+        generator, so every SimConnection set to an asset type of the same class and
+        generator settings has the same source. Classes are compared themselves, not
+        by name, so that subclasses defined elsewhere with the same name do not share
+        securities.
+        """
+        generator = getattr(self._asset_type, "generator", None)
+        settings = None if generator is None else generator.get_settings()
+
+        return (type(self), type(self._asset_type), settings)
+
+    def set_latency(self, latency: float) -> None:
+        """Sets a delay added to every request, to simulate a remote database
+
+
+        Parameters
+        -------
+        latency: float
+            Seconds each get_security or get_securities call waits before
+            returning, default 0
+        """
+        self._latency = latency
+
     def get_security(
         self, isin: str, date_range: Tuple[str, str]
     ) -> data.AbstractSecurity:
@@ -43,16 +78,40 @@ class SimConnection(data.AbstractConnection):
         -------
         Security
             A Security object containing all data relavent to requested security
+
+
+        Note
+        -------
+        Each security has a single simulated path, and date_range selects a window
+        of it: a shorter date_range returns the same data as slicing a longer one.
         """
+        time.sleep(self._latency)
+
         timeseries = self._asset_type.get_timeseries(date_range, int(isin))
         description = self._asset_type.get_description(int(isin))
         exposures = self._asset_type.get_exposures(int(isin))
 
-        # ToDo: Try to find a good pattern to replace the following...
-        if self._asset_type.__class__ == SimEquityAssetType:
-            return Equity(isin, timeseries, description, exposures)
-        elif self._asset_type.__class__ == SimEquityFundAssetType:
-            return EquityFund(isin, timeseries, description, exposures)
+        return self._asset_type.security_class(isin, timeseries, description, exposures)
+
+    def get_securities(
+        self, isins: List[str], date_range: Tuple[str, str]
+    ) -> SecurityPanel:
+        """Returns simulated Securities by ISINs and date range, as a panel
+
+
+        Parameters
+        -------
+        isins: List[str]
+        date_range: Tuple[str, str]
+
+        Returns
+        -------
+        SecurityPanel
+            Panel of every security, identical to fetching them one by one
+        """
+        time.sleep(self._latency)
+
+        return self._asset_type.get_panel(date_range, [int(isin) for isin in isins])
 
 
 class SimQuery(data.AbstractQuery):
@@ -68,16 +127,21 @@ class SimQuery(data.AbstractQuery):
     The equity funds database has "isin", "name", "fee",
     "geography", "strategy", "risk", "5y_sharpe".
 
-    The database is stored as a csv files under portana/data/simulated_db.
-    The query is implemented through pandas.DataFrame's query method.
+    The database is stored as a csv files under portana/data/simulated_db,
+    with binary snapshots of them under portana/data/simulated_db/snapshots.
+    Each table is loaded once per process into an indexed in-memory table,
+    see portana.data.database.
 
 
     Parameters
     -------
     asset_type: str
         Either "equity" or "equityfunds", this determines which database to find data from
-    fields: dict
-        A dictionary containing fields to query. Example: {"geography": "Canada"}
+    fields: Union[dict, Predicate]
+        A dictionary containing fields to query. Example: {"geography": "Canada"}.
+        A list of values matches any of them, e.g. {"sector": ["Technology", "Financials"]}.
+        For OR, NOT and range predicates, pass a Predicate from portana.data.predicates,
+        e.g. Range("5y_sharpe", low=1) & ~Eq("geography", "Canada")
     sort_by: str
         Field by which to sort the result, default None
     limit: int
@@ -85,31 +149,37 @@ class SimQuery(data.AbstractQuery):
     offset: int
         The offset of the results (e.g. offset of 1 will return results from the second row),
         default None (no offset)
+    use_cache: bool
+        Whether to look up and store the result in portana.data.database.query_cache,
+        default True
+
+
+    Note
+    -------
+    When both sort_by and limit are set, only the first offset + limit rows are
+    selected and sorted, which takes O(n) instead of a full sort.
+
+    Cached results are keyed by asset type, fields (in any order) and sort_by, so every
+    page of a screen (limit and offset) is a slice of one cached sorted result, or of
+    its first rows when limit is set. A page deeper than the cached rows sorts a
+    longer prefix, which replaces them.
     """
 
     def __init__(
         self,
         asset_type: str,
-        fields: dict,
+        fields: Union[dict, predicates.Predicate],
         sort_by: str = None,
         limit: int = None,
         offset: int = 0,
+        use_cache: bool = True,
     ):
         self.asset_type = asset_type
         self.fields = fields
         self.sort_by = sort_by
         self.limit = limit
         self.offset = offset
-
-    def _get_sim_equity(self) -> pd.DataFrame:
-        df = pd.read_csv("./portana/data/simulated_db/equities.csv", index_col=0)
-
-        return df
-
-    def _get_sim_equity_fund(self) -> pd.DataFrame:
-        df = pd.read_csv("./portana/data/simulated_db/equity_funds.csv", index_col=0)
-
-        return df
+        self.use_cache = use_cache
 
     def build_query(self):
         """Generate query string to send to database server
@@ -119,12 +189,7 @@ class SimQuery(data.AbstractQuery):
         str
             Query string to send to the server
         """
-        query_str = ""
-
-        for key, item in self.fields.items():
-            query_str += f"{key} == '{item}' and "
-
-        return query_str[:-5]
+        return str(predicates.from_fields(self.fields))
 
     def send_query(self) -> Dict[str, Dict[str, Union[str, float]]]:
         """Sends query and returns data
@@ -149,33 +214,191 @@ class SimQuery(data.AbstractQuery):
         'geography': 'Canada',
         '5y_sharpe': 170.7695025}}
         """
-        if self.asset_type.lower() == "equity":
-            db = self._get_sim_equity()
+        table = database.get_table(self.asset_type)
+
+        return table.get_records(self._get_rows(table))
+
+    def _get_rows(self, table: database.SimTable) -> np.ndarray:
+        top = None
+        if self.sort_by and self.limit:
+            top = self.offset + self.limit
 
-        if self.asset_type.lower() == "equityfund":
-            db = self._get_sim_equity_fund()
+        key = None
+        if self.use_cache:
+            predicate = predicates.from_fields(self.fields)
+            key = (
+                self.asset_type.lower(),
+                table.generation,
+                predicate.key(),
+                self.sort_by,
+            )
 
-        query_str = self.build_query()
+            rows = database.query_cache.get(key, top)
+            if rows is not None:
+                return self.__get_page(rows)
 
-        result = db.query(query_str)
+            # Cache at least twice the rows asked for, so that following pages
+            # are slices of the same prefix
+            if top is not None:
+                top = 1 << (2 * top - 1).bit_length()
+
+        rows = table.filter(self.fields)
+        complete = top is None or len(rows) <= top
 
         if self.sort_by:
-            result = result.sort_values(self.sort_by, ascending=False)
+            rows = table.sort_rows(rows, self.sort_by, top)
+
+        if key is not None:
+            rows = database.query_cache.put(key, rows, complete)
+
+        return self.__get_page(rows)
 
+    def __get_page(self, rows: np.ndarray) -> np.ndarray:
         if self.limit:
-            result = result[self.offset : self.offset + self.limit]
+            rows = rows[self.offset : self.offset + self.limit]
+
+        return rows
+
+    def fetch_cursor(self, batch_size: int = 1000) -> database.Cursor:
+        """Sends query and returns a cursor over the result
+
+        Rows are only decoded as they are fetched, so paging through large
+        results does not build the whole result at once.
+
+
+        Parameters
+        -------
+        batch_size: int
+            Number of rows decoded at a time, default 1000
+
+
+        Returns
+        -------
+        Cursor
+            Cursor returning rows as tuples of (isin, field 1, field 2, ...)
+        """
+        table = database.get_table(self.asset_type)
+
+        return database.Cursor(table, self._get_rows(table), batch_size)
+
+    def fetch_columns(self) -> Dict[str, np.ndarray]:
+        """Sends query and returns the result as column arrays
+
+
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Values of "isin" and every field, one element per result row
+        """
+        table = database.get_table(self.asset_type)
+        rows = self._get_rows(table)
+
+        columns = {"isin": table.isins[rows]}
+        for field in table.fields:
+            columns[field] = table.get_column(field)[rows]
+
+        return columns
+
+
+class SimAssetType(data.AbstractAssetType):
+    """Base class of simulated asset types.
+
+    Subclasses configure self.generator, and fill descriptions and exposures
+    from a seeded Generator, so that one seeded Generator serves every field
+    of a security.
+
+
+    Attributes
+    -------
+    security_class: Type[Security]
+        Class of the securities returned by SimConnection
+    """
+
+    security_class = Security
 
-        result_dict = result.to_dict("index")
-        result_dict = {str(key): value for key, value in result_dict.items()}
+    @abstractmethod
+    def _describe(self, generator: generator.Generator) -> dict:
+        """Returns descriptive fields, from a Generator seeded for the security"""
+        pass
 
-        return result_dict
+    @abstractmethod
+    def _expose(self, generator: generator.Generator) -> dict:
+        """Returns exposure fields, from a Generator seeded for the security"""
+        pass
 
+    def get_timeseries_batch(
+        self, date_range: Tuple[str, str], seeds: List[int]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns time series of many simulated securities, generated together
+        (see Generator.generate_batch)
 
-class SimEquityAssetType(data.AbstractAssetType):
+
+        Parameters
+        -------
+        date_range: Tuple[str, str]
+            Date range to simulate
+        seeds: List[int]
+            Seed of each security
+
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+            T dates, (T x N) prices and (T x N) total returns index, column j
+            being get_timeseries(date_range, seeds[j])
+        """
+        base = copy.copy(self.generator)
+        base.set_date_range(date_range)
+
+        return (base.generate_dates(), *base.generate_batch(seeds))
+
+    def get_panel(self, date_range: Tuple[str, str], seeds: List[int]) -> SecurityPanel:
+        """Returns a panel of simulated securities
+
+
+        Parameters
+        -------
+        date_range: Tuple[str, str]
+            Date range to simulate
+        seeds: List[int]
+            Seed of each security
+
+
+        Returns
+        -------
+        SecurityPanel
+            Time series, descriptions and exposures of every security
+        """
+        dates, prices, tot_ret_idx = self.get_timeseries_batch(date_range, seeds)
+
+        base = copy.copy(self.generator)
+        base.set_date_range(date_range)
+        descriptions = []
+        exposures = []
+
+        for seed in seeds:
+            seeded = base.for_seed(seed)
+            descriptions.append(self._describe(seeded))
+            exposures.append(self._expose(seeded))
+
+        return SecurityPanel(
+            [str(seed) for seed in seeds],
+            dates,
+            prices,
+            tot_ret_idx,
+            descriptions,
+            exposures,
+            [self.security_class] * len(seeds),
+        )
+
+
+class SimEquityAssetType(SimAssetType):
     """Class to return simulated data for an equity security.
     A concrete implementation of AbstractAssetType.
     """
 
+    security_class = Equity
+
     def __init__(self):
         self.generator = generator.Generator()
         self.generator.set_max_drift(0.001)
@@ -195,12 +418,11 @@ class SimEquityAssetType(data.AbstractAssetType):
             Pricing and total returns data for an equity security
         """
 
-        self.generator.set_seed(seed)
-        self.generator.set_date_range(date_range)
+        generator = self.generator.for_seed(seed)
+        generator.set_date_range(date_range)
 
-        dates = self.generator.generate_dates()
-        prices = self.generator.generate_prices()
-        tot_ret_idx = self.generator.generate_tot_ret_idx()
+        dates = generator.generate_dates()
+        prices, tot_ret_idx = generator.generate_window()
 
         return SecurityTimeSeries(dates, prices, tot_ret_idx)
 
@@ -219,11 +441,12 @@ class SimEquityAssetType(data.AbstractAssetType):
         >>> AssetType.get_description()
         {"name": "Apple, Inc.", ...}
         """
-        self.generator.set_seed(seed)
+        return self._describe(self.generator.for_seed(seed))
 
+    def _describe(self, generator: generator.Generator) -> dict:
         description = {}
-        description["name"] = self.generator.generate_name()
-        description["ticker"] = self.generator.generate_ticker()
+        description["name"] = generator.generate_name()
+        description["ticker"] = generator.generate_ticker()
 
         return description
 
@@ -242,19 +465,22 @@ class SimEquityAssetType(data.AbstractAssetType):
         >>> AssetType.get_exposures()
         {"geography": "Canada", ...}
         """
-        self.generator.set_seed(seed)
+        return self._expose(self.generator.for_seed(seed))
 
+    def _expose(self, generator: generator.Generator) -> dict:
         exposures = {}
-        exposures["sector"] = self.generator.generate_sector()
-        exposures["geography"] = self.generator.generate_geography()
+        exposures["sector"] = generator.generate_sector()
+        exposures["geography"] = generator.generate_geography()
 
         return exposures
 
 
-class SimEquityFundAssetType(data.AbstractAssetType):
+class SimEquityFundAssetType(SimAssetType):
     """Class to return simulated data for an equity fund.
     A concrete implementation of AbstractAssetType."""
 
+    security_class = EquityFund
+
     def __init__(self):
         self.generator = generator.Generator()
         self.generator.set_max_drift(0.00025)
@@ -273,12 +499,11 @@ class SimEquityFundAssetType(data.AbstractAssetType):
         TimeSeries
             Pricing and total returns data for an equity fund
         """
-        self.generator.set_seed(seed)
-        self.generator.set_date_range(date_range)
+        generator = self.generator.for_seed(seed)
+        generator.set_date_range(date_range)
 
-        dates = self.generator.generate_dates()
-        prices = self.generator.generate_prices()
-        tot_ret_idx = self.generator.generate_tot_ret_idx()
+        dates = generator.generate_dates()
+        prices, tot_ret_idx = generator.generate_window()
 
         return SecurityTimeSeries(dates, prices, tot_ret_idx)
 
@@ -297,11 +522,12 @@ class SimEquityFundAssetType(data.AbstractAssetType):
         >>> AssetType.get_description()
         {"fee": "0.015", ...}
         """
-        self.generator.set_seed(seed)
+        return self._describe(self.generator.for_seed(seed))
 
+    def _describe(self, generator: generator.Generator) -> dict:
         description = {}
-        description["name"] = self.generator.generate_name()
-        description["fee"] = self.generator.generate_fee()
+        description["name"] = generator.generate_name()
+        description["fee"] = generator.generate_fee()
 
         return description
 
@@ -320,11 +546,12 @@ class SimEquityFundAssetType(data.AbstractAssetType):
         >>> AssetType.get_exposures()
         {"geography": "Canada", ...}
         """
-        self.generator.set_seed(seed)
+        return self._expose(self.generator.for_seed(seed))
 
+    def _expose(self, generator: generator.Generator) -> dict:
         exposures = {}
-        exposures["geography"] = self.generator.generate_geography()
-        exposures["strategy"] = self.generator.generate_strategy()
-        exposures["risk"] = self.generator.generate_risk()
+        exposures["geography"] = generator.generate_geography()
+        exposures["strategy"] = generator.generate_strategy()
+        exposures["risk"] = generator.generate_risk()
 
         return exposures
@@ -0,0 +1,231 @@
+from typing import Dict
+import hashlib
+import json
+import os
+
+import numpy as np
+
+"""Binary columnar snapshots of the simulated database
+
+A snapshot is a directory holding one .npy file per column, so that a table is
+opened by memory-mapping its columns instead of parsing a csv file:
+
+    manifest.json               fields, column kinds, hash and stat of the source csv
+    isin.npy                    ISIN of each row
+    <field>.npy                 values of a numeric or string column
+    <field>.codes.npy           category code of each row of a categorical column
+    <field>.categories.npy      sorted distinct values of a categorical column
+    <field>.order.npy           stable sort order of a numeric column
+
+Strings are stored as fixed-width unicode arrays, which can be memory-mapped.
+The manifest is written last, so a directory without one is an incomplete snapshot.
+The csv files stay the source of truth, snapshots are rebuilt from them with
+
+    python -m portana.data.snapshot
+"""
+
+SNAPSHOT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+
+
+def hash_file(path: str) -> str:
+    """Returns the sha1 hex digest of a file, used to detect stale snapshots"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(2**20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def stat_file(path: str) -> Dict[str, int]:
+    """Returns the size and modification time of a file, as stored in manifests"""
+    stat = os.stat(path)
+
+    return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+
+def _to_storable(values: np.ndarray) -> np.ndarray:
+    """Convert a column to an array that can be saved without pickling"""
+    if values.dtype != object:
+        return values
+
+    if not all(isinstance(value, str) for value in values):
+        raise ValueError("Only numeric and string columns can be stored in a snapshot")
+
+    return values.astype(str)
+
+
+def write_snapshot(table, directory: str, source: str = None) -> None:
+    """Write a table to a snapshot directory
+
+
+    Parameters
+    -------
+    table: SimTable
+        Table to write
+    directory: str
+        Snapshot directory, created if needed. An existing snapshot is replaced.
+    source: str
+        Path of the csv file the table was loaded from, whose hash is recorded so that
+        stale snapshots are detected, default None (never stale)
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    def save(name: str, values: np.ndarray) -> None:
+        np.save(os.path.join(directory, f"{name}.npy"), _to_storable(values))
+
+    save("isin", table.isins)
+
+    kinds = {}
+    for field in table.fields:
+        if field in table.codes:
+            kinds[field] = "categorical"
+            save(f"{field}.codes", table.codes[field])
+            save(f"{field}.categories", table.categories[field])
+        else:
+            kinds[field] = "column"
+            save(field, table.columns[field])
+
+            # Numeric columns are indexed on load, store their sort order
+            if np.issubdtype(table.columns[field].dtype, np.number):
+                kinds[field] = "sorted"
+                save(f"{field}.order", table.get_index(field).order)
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "source_sha1": None if source is None else hash_file(source),
+        **({} if source is None else stat_file(source)),
+        "rows": len(table.isins),
+        "fields": table.fields,
+        "kinds": kinds,
+    }
+
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file, indent=2)
+
+
+def read_manifest(directory: str) -> dict:
+    """Returns the manifest of a snapshot, None if there is no complete snapshot"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return None
+
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        return None
+
+    return manifest
+
+
+def is_fresh(directory: str, source: str = None) -> bool:
+    """Check whether a snapshot exists and was built from the current source
+
+    The size and modification time of the source are compared to the ones stored
+    in the manifest, so that loading a table does not read its csv file. The
+    source is only hashed when its size matches but its modification time does
+    not, e.g. after a checkout rewrote it, or for manifests without them.
+
+
+    Parameters
+    -------
+    directory: str
+        Snapshot directory
+    source: str
+        Path of the csv file the snapshot was built from. If None or missing,
+        any complete snapshot is considered fresh.
+
+
+    Returns
+    -------
+    bool
+        True if the snapshot can be read
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return False
+
+    if source is None or not os.path.exists(source):
+        return True
+
+    if manifest["source_sha1"] is None:
+        return True
+
+    stat = stat_file(source)
+    if manifest.get("source_size", stat["source_size"]) != stat["source_size"]:
+        return False
+    if manifest.get("source_mtime_ns") == stat["source_mtime_ns"]:
+        return True
+
+    return manifest["source_sha1"] == hash_file(source)
+
+
+def read_snapshot(directory: str, mmap_mode: str = "r") -> Dict[str, object]:
+    """Read the arrays of a snapshot
+
+
+    Parameters
+    -------
+    directory: str
+        Snapshot directory
+    mmap_mode: str
+        Mode in which columns are memory-mapped, see numpy.load, default "r"
+        (read-only). None reads columns into memory.
+
+
+    Returns
+    -------
+    dict
+        Keyword arguments of SimTable: isins, fields, columns, categories, codes
+        and orders
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot in {directory}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    columns = {}
+    categories = {}
+    codes = {}
+    orders = {}
+
+    for field, kind in manifest["kinds"].items():
+        if kind == "categorical":
+            codes[field] = load(f"{field}.codes")
+            # Categories are few, keep them as python strings like pandas.factorize
+            categories[field] = np.load(
+                os.path.join(directory, f"{field}.categories.npy")
+            ).astype(object)
+        else:
+            columns[field] = load(field)
+            if kind == "sorted":
+                orders[field] = load(f"{field}.order")
+
+    return {
+        "isins": load("isin"),
+        "fields": manifest["fields"],
+        "columns": columns,
+        "categories": categories,
+        "codes": codes,
+        "orders": orders,
+    }
+
+
+def main():
+    """Rebuild snapshots of every table from the csv files"""
+    from . import database
+
+    for asset_type in database.DB_FILES:
+        print(f"{asset_type}: {database.build_snapshot(asset_type)}")
+
+
+if __name__ == "__main__":
+    main()
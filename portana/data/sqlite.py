@@ -0,0 +1,664 @@
+from typing import List, Dict, Tuple, Union
+import contextlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from ..abstracts import data
+from ..timeseries.securitytimeseries import SecurityTimeSeries
+from .database import SimTable
+from .panel import SecurityPanel
+from .predicates import Predicate, from_fields, quote_sql
+from .security import Equity, EquityFund
+
+"""SQLite backend for securities and their price histories
+
+Screening tables hold one row per security, with an index on (field, isin)
+for each categorical and numeric field, so that screens on a single field
+and the ISINs they return are read from the index alone.
+
+Price histories live in one WITHOUT ROWID table clustered by (isin, date),
+so the history of a security over a date range is a single range scan.
+Each row holds one calendar year of a security's history, keyed by the first
+day of the year, as packed float64 and int64 (days since 1970-01-01) arrays.
+Histories are copied from those buffers straight into preallocated numpy
+arrays, so reading a history costs a few rows instead of a Python tuple per date.
+
+
+Example
+-------
+>>> db = SQLiteDatabase("portana.sqlite")
+>>> db.load_table("equity", database.load_csv("equity"))
+>>> db.load_panel(SimConnection().get_securities(isins, ("2000-01-01", "2020-12-31")))
+>>> SQLiteQuery(db, "equity", {"geography": "Canada"}, "5y_sharpe", 10).send_query()
+>>> connection = SQLiteConnection(db, "equity")
+>>> connection.get_security("15000", ("2020-01-01", "2020-12-31"))
+"""
+
+SECURITY_TYPES = {
+    "equity": (Equity, ["name", "ticker"], ["sector", "geography"]),
+    "equityfund": (EquityFund, ["name", "fee"], ["geography", "strategy", "risk"]),
+}
+""" Security class, description fields and exposure fields of each asset type """
+
+
+def _to_day(date) -> int:
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+def _to_block(day: int) -> int:
+    """Returns the key of the block holding a day, the first day of its year"""
+    return _to_day(np.datetime64(int(day), "D").astype("datetime64[Y]"))
+
+
+def _to_sql_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _split_blocks(isin: str, days: np.ndarray, prices: np.ndarray, tot_ret_idx):
+    """Yields rows of the prices table holding a history, one per calendar year"""
+    years = days.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64)
+    bounds = np.flatnonzero(np.diff(years)) + 1
+
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(days)]):
+        yield (
+            isin,
+            _to_block(days[start]),
+            np.ascontiguousarray(days[start:end], dtype=np.int64).tobytes(),
+            np.ascontiguousarray(prices[start:end], dtype=np.float64).tobytes(),
+            np.ascontiguousarray(tot_ret_idx[start:end], dtype=np.float64).tobytes(),
+        )
+
+
+def _join_blocks(
+    blocks: List[Tuple[bytes, bytes, bytes]], first: int, last: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Copy rows of the prices table into (days, prices, tot_ret_idx) arrays,
+    keeping days from first to last
+    """
+    size = sum(len(days) for days, _, _ in blocks) // 8
+
+    days = np.empty(size, dtype=np.int64)
+    prices = np.empty(size, dtype=np.float64)
+    tot_ret_idx = np.empty(size, dtype=np.float64)
+
+    position = 0
+    for block in blocks:
+        count = len(block[0]) // 8
+        for out, buffer in zip((days, prices, tot_ret_idx), block):
+            out[position : position + count] = np.frombuffer(buffer, dtype=out.dtype)
+        position += count
+
+    start, end = np.searchsorted(days, [first, last + 1])
+
+    return days[start:end], prices[start:end], tot_ret_idx[start:end]
+
+
+class SQLiteDatabase:
+    """Class holding a SQLite database file and a pool of connections to it
+
+    Each thread gets its own connection on first use, which it keeps
+    for as long as the database is open.
+
+
+    Parameters
+    -------
+    path: str
+        Path of the database file, created if it does not exist
+
+
+    Attributes
+    -------
+    path: str
+        Path of the database file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._fields: Dict[str, List[Tuple[str, str]]] = {}
+
+        with self.transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS prices ("
+                "isin TEXT NOT NULL, date INTEGER NOT NULL, "
+                "dates BLOB NOT NULL, prices BLOB NOT NULL, tot_ret_idx BLOB NOT NULL, "
+                "PRIMARY KEY (isin, date)) WITHOUT ROWID"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        """Returns the connection of the calling thread, opening it on first use"""
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None:
+            # Transactions are managed explicitly, see transaction()
+            connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS request "
+                "(col INTEGER PRIMARY KEY, isin TEXT NOT NULL)"
+            )
+
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+
+        return connection
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Context manager running statements in one transaction of the calling
+        thread's connection, so that reads see a consistent database
+        """
+        connection = self.connect()
+        connection.execute("BEGIN")
+
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        connection.execute("COMMIT")
+
+    def close(self) -> None:
+        """Close every connection of the pool"""
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+        self._local = threading.local()
+
+    def get_fields(self, asset_type: str) -> List[Tuple[str, str]]:
+        """Get fields of a screening table
+
+
+        Parameters
+        -------
+        asset_type: str
+            Either "equity" or "equityfund"
+
+
+        Returns
+        -------
+        List[Tuple[str, str]]
+            Name and SQL type of each field, in the order of the source table
+        """
+        asset_type = asset_type.lower()
+
+        fields = self._fields.get(asset_type)
+        if fields is None:
+            info = self.connect().execute(f"PRAGMA table_info({quote_sql(asset_type)})")
+            fields = [
+                (name, kind)
+                for _, name, kind, *_ in info
+                if name not in ("row", "isin")
+            ]
+            self._fields[asset_type] = fields
+
+        return fields
+
+    def load_table(self, asset_type: str, table: SimTable) -> None:
+        """Replace the screening table of an asset type
+
+
+        Parameters
+        -------
+        asset_type: str
+            Either "equity" or "equityfund"
+        table: SimTable
+            Table to load, e.g. portana.data.database.load_csv(asset_type)
+        """
+        asset_type = asset_type.lower()
+        name = quote_sql(asset_type)
+
+        columns = []
+        definitions = []
+        indexed = []
+        for field in table.fields:
+            if field in table.codes:
+                codes = table.codes[field]
+                values = np.where(codes >= 0, table.categories[field][codes], None)
+                kind = "TEXT"
+                indexed.append(field)
+            else:
+                values = table.columns[field]
+                if np.issubdtype(values.dtype, np.integer):
+                    kind = "INTEGER"
+                elif np.issubdtype(values.dtype, np.number):
+                    kind = "REAL"
+                else:
+                    kind = "TEXT"
+
+                if kind != "TEXT":
+                    indexed.append(field)
+
+            columns.append(values.tolist())
+            definitions.append(f"{quote_sql(field)} {kind}")
+
+        placeholders = ", ".join("?" * (len(columns) + 2))
+
+        with self.transaction() as connection:
+            connection.execute(f"DROP TABLE IF EXISTS {name}")
+            connection.execute(
+                f"CREATE TABLE {name} (row INTEGER PRIMARY KEY, "
+                f"isin TEXT NOT NULL UNIQUE, {', '.join(definitions)})"
+            )
+            connection.executemany(
+                f"INSERT INTO {name} VALUES ({placeholders})",
+                zip(range(len(table)), map(str, table.isins.tolist()), *columns),
+            )
+
+            for field in indexed:
+                connection.execute(
+                    f"CREATE INDEX {quote_sql(f'{asset_type}_{field}')} "
+                    f"ON {name} ({quote_sql(field)}, isin)"
+                )
+
+            connection.execute(f"ANALYZE {name}")
+
+        self._fields.pop(asset_type, None)
+
+    def __write_prices(
+        self,
+        connection: sqlite3.Connection,
+        isin: str,
+        days: np.ndarray,
+        prices: np.ndarray,
+        tot_ret_idx: np.ndarray,
+    ) -> None:
+        """Merge a history into the blocks of a security, new values taking precedence"""
+        if not len(days):
+            return
+
+        blocks = connection.execute(
+            "SELECT dates, prices, tot_ret_idx FROM prices "
+            "WHERE isin = ? AND date BETWEEN ? AND ? ORDER BY date",
+            (isin, _to_block(days[0]), int(days[-1])),
+        ).fetchall()
+
+        if blocks:
+            old_days, old_prices, old_tot_ret_idx = _join_blocks(
+                blocks, _to_block(days[0]), days[-1] + 366
+            )
+
+            # np.unique keeps the first occurrence of each day, i.e. the new one
+            days, first = np.unique(np.r_[days, old_days], return_index=True)
+            prices = np.r_[prices, old_prices][first]
+            tot_ret_idx = np.r_[tot_ret_idx, old_tot_ret_idx][first]
+
+        connection.executemany(
+            "INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?)",
+            _split_blocks(isin, days, prices, tot_ret_idx),
+        )
+
+    def load_prices(
+        self, isin: str, dates: np.ndarray, prices: np.ndarray, tot_ret_idx: np.ndarray
+    ) -> None:
+        """Insert or replace the price history of a security over dates
+
+        Stored dates outside of dates are kept.
+
+
+        Parameters
+        -------
+        isin: str
+        dates: numpy.ndarray
+        prices: numpy.ndarray
+        tot_ret_idx: numpy.ndarray
+        """
+        days = dates.astype("datetime64[D]").astype(np.int64)
+
+        with self.transaction() as connection:
+            self.__write_prices(connection, str(isin), days, prices, tot_ret_idx)
+
+    def load_panel(self, panel: SecurityPanel) -> None:
+        """Insert or replace price histories of every security of a panel
+
+        Dates on which a security has no data are skipped,
+        stored dates outside of the panel are kept.
+
+
+        Parameters
+        -------
+        panel: SecurityPanel
+            Securities to load, e.g. from SimConnection.get_securities
+        """
+        prices, tot_ret_idx = panel.get_data()
+        days = panel.get_dates().astype(np.int64)
+
+        with self.transaction() as connection:
+            for col, isin in enumerate(panel.get_isins()):
+                valid = ~np.isnan(prices[:, col])
+                self.__write_prices(
+                    connection,
+                    isin,
+                    days[valid],
+                    prices[valid, col],
+                    tot_ret_idx[valid, col],
+                )
+
+
+class SQLiteConnection(data.AbstractConnection):
+    """Class to retrieve securities from a SQLite database.
+    A concrete implementation of AbstractConnection.
+
+    Connections of the database's pool are per thread, so a SQLiteConnection
+    can be shared by threads, e.g. through ThreadedConnection.
+
+
+    Parameters
+    -------
+    database: SQLiteDatabase
+        Database holding the securities
+    asset_type: str
+        Either "equity" or "equityfund", sets the screening table description
+        and exposures are read from, and the class of returned securities
+    """
+
+    panel_class = SecurityPanel
+
+    def __init__(self, database: SQLiteDatabase, asset_type: str):
+        self.database = database
+        self.asset_type = asset_type.lower()
+
+    def get_source(self) -> tuple:
+        """Returns a key identifying the data this connection returns
+
+        The class itself is compared, not its name, so that subclasses defined
+        elsewhere with the same name do not share securities.
+        """
+        return (
+            type(self),
+            os.path.abspath(self.database.path),
+            self.asset_type,
+        )
+
+    def __get_fields(
+        self, connection: sqlite3.Connection
+    ) -> Dict[int, Tuple[dict, dict]]:
+        """Description and exposures of each requested column"""
+        _, description_fields, exposure_fields = SECURITY_TYPES[self.asset_type]
+        fields = description_fields + exposure_fields
+
+        cursor = connection.execute(
+            f"SELECT r.col, {', '.join(f't.{quote_sql(field)}' for field in fields)} "
+            f"FROM temp.request r JOIN {quote_sql(self.asset_type)} t ON t.isin = r.isin"
+        )
+
+        records = {}
+        for col, *values in cursor:
+            record = dict(zip(fields, values))
+            records[col] = (
+                {field: record[field] for field in description_fields},
+                {field: record[field] for field in exposure_fields},
+            )
+
+        return records
+
+    def __get_levels(
+        self, connection: sqlite3.Connection, first: int, last: int, count: int
+    ) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Days, prices and total returns index of each requested column"""
+        cursor = connection.execute(
+            "SELECT r.col, p.dates, p.prices, p.tot_ret_idx "
+            "FROM temp.request r JOIN prices p "
+            "ON p.isin = r.isin AND p.date BETWEEN ? AND ? ORDER BY r.col, p.date",
+            (_to_block(first), last),
+        )
+
+        blocks = [[] for _ in range(count)]
+        for col, *block in cursor:
+            blocks[col].append(block)
+
+        return [_join_blocks(col_blocks, first, last) for col_blocks in blocks]
+
+    def __request(self, isins: List[str], date_range: Tuple[str, str]):
+        first, last = _to_day(date_range[0]), _to_day(date_range[1])
+
+        with self.database.transaction() as connection:
+            connection.execute("DELETE FROM temp.request")
+            connection.executemany(
+                "INSERT INTO temp.request VALUES (?, ?)",
+                enumerate(str(isin) for isin in isins),
+            )
+
+            records = self.__get_fields(connection)
+            levels = self.__get_levels(connection, first, last, len(isins))
+
+        missing = [isin for col, isin in enumerate(isins) if col not in records]
+        if missing:
+            raise KeyError(f"Securities not found: {missing}")
+
+        return records, levels
+
+    def get_security(
+        self, isin: str, date_range: Tuple[str, str]
+    ) -> data.AbstractSecurity:
+        """Retrieve security and data from database by isin and date_range
+
+
+        Parameters
+        -------
+        isin: str
+        date_range: Tuple[str, str]
+
+        Returns
+        -------
+        AbstractSecurity
+            Equity or EquityFund, depending on the asset type
+        """
+        records, levels = self.__request([isin], date_range)
+        description, exposures = records[0]
+        days, prices, tot_ret_idx = levels[0]
+
+        timeseries = SecurityTimeSeries(
+            days.astype("datetime64[D]"), prices, tot_ret_idx
+        )
+        security_class, _, _ = SECURITY_TYPES[self.asset_type]
+
+        return security_class(str(isin), timeseries, description, exposures)
+
+    def get_securities(
+        self, isins: List[str], date_range: Tuple[str, str]
+    ) -> SecurityPanel:
+        """Retrieve many securities and their data from database at once
+
+        Every security is read by one query, straight into preallocated arrays.
+
+
+        Parameters
+        -------
+        isins: List[str]
+        date_range: Tuple[str, str]
+
+        Returns
+        -------
+        SecurityPanel
+            Panel of every security, identical to fetching them one by one
+        """
+        isins = [str(isin) for isin in isins]
+        records, levels = self.__request(isins, date_range)
+
+        # Securities usually share their dates, skip aligning them if so
+        days = levels[0][0] if levels else np.empty(0, dtype=np.int64)
+        aligned = all(np.array_equal(col_days, days) for col_days, _, _ in levels)
+        if not aligned:
+            days = np.unique(np.concatenate([col_days for col_days, _, _ in levels]))
+
+        prices = np.full((len(days), len(isins)), np.nan, order="F")
+        tot_ret_idx = np.full((len(days), len(isins)), np.nan, order="F")
+        for col, (col_days, col_prices, col_tot_ret_idx) in enumerate(levels):
+            rows = slice(None) if aligned else np.searchsorted(days, col_days)
+            prices[rows, col] = col_prices
+            tot_ret_idx[rows, col] = col_tot_ret_idx
+
+        security_class, _, _ = SECURITY_TYPES[self.asset_type]
+
+        return SecurityPanel(
+            isins,
+            days.astype("datetime64[D]"),
+            prices,
+            tot_ret_idx,
+            [records[col][0] for col in range(len(isins))],
+            [records[col][1] for col in range(len(isins))],
+            [security_class] * len(isins),
+        )
+
+
+class SQLiteQuery(data.AbstractQuery):
+    """Class for sending queries to a SQLite database
+
+    Results are the same as those of SimQuery on the same table, including
+    the order of ties when sorting, and offset being ignored without limit.
+
+
+    Parameters
+    -------
+    database: SQLiteDatabase
+        Database to query
+    asset_type: str
+        Either "equity" or "equityfund", this determines which table to find data from
+    fields: Union[dict, Predicate]
+        A dictionary containing fields to query, or a Predicate,
+        see portana.data.predicates.from_fields
+    sort_by: str
+        Field by which to sort the result in descending order, default None
+    limit: int
+        Number of results to return, default None (all results)
+    offset: int
+        The offset of the results (e.g. offset of 1 will return results from the second row),
+        default None (no offset)
+    """
+
+    def __init__(
+        self,
+        database: SQLiteDatabase,
+        asset_type: str,
+        fields: Union[dict, Predicate],
+        sort_by: str = None,
+        limit: int = None,
+        offset: int = 0,
+    ):
+        self.database = database
+        self.asset_type = asset_type.lower()
+        self.fields = fields
+        self.sort_by = sort_by
+        self.limit = limit
+        self.offset = offset
+
+    def __build(self, columns: str) -> Tuple[str, list]:
+        condition, params = from_fields(self.fields).to_sql()
+        query = f"SELECT {columns} FROM {quote_sql(self.asset_type)} WHERE {condition}"
+
+        if self.sort_by:
+            kinds = dict(self.database.get_fields(self.asset_type))
+            field = quote_sql(self.sort_by)
+
+            # As SimTable.sort_rows: numbers sort NaNs last, and ties keep their order
+            if kinds[self.sort_by] in ("REAL", "INTEGER"):
+                query += f" ORDER BY {field} IS NULL, {field} DESC, row"
+            else:
+                query += f" ORDER BY {field} DESC, row"
+        else:
+            query += " ORDER BY row"
+
+        if self.limit:
+            query += " LIMIT ? OFFSET ?"
+            params = params + [self.limit, self.offset or 0]
+
+        return query, [_to_sql_value(param) for param in params]
+
+    def __fetch(self) -> Tuple[List[str], list]:
+        fields = [field for field, _ in self.database.get_fields(self.asset_type)]
+        columns = ", ".join(["isin"] + [quote_sql(field) for field in fields])
+        query, params = self.__build(columns)
+
+        return fields, self.database.connect().execute(query, params).fetchall()
+
+    def build_query(self) -> str:
+        """Generate query string to send to database server
+
+        Returns
+        -------
+        str
+            SQL statement, with ? placeholders for parameters
+        """
+        fields = [field for field, _ in self.database.get_fields(self.asset_type)]
+        columns = ", ".join(["isin"] + [quote_sql(field) for field in fields])
+
+        return self.__build(columns)[0]
+
+    def send_query(self) -> Dict[str, Dict[str, Union[str, float]]]:
+        """Sends query and returns data
+
+        Returns
+        -------
+        dict
+            Result of the query, values of every field keyed by ISIN
+        """
+        fields, records = self.__fetch()
+
+        # Missing numbers are NaN in SimQuery results
+        kinds = dict(self.database.get_fields(self.asset_type))
+        nan_fields = [field for field in fields if kinds[field] == "REAL"]
+
+        result = {}
+        for isin, *values in records:
+            record = dict(zip(fields, values))
+            for field in nan_fields:
+                if record[field] is None:
+                    record[field] = np.nan
+            result[isin] = record
+
+        return result
+
+    def fetch_isins(self) -> List[str]:
+        """Sends query and returns ISINs of the result only
+
+        Screens on a single indexed field are answered from the index alone.
+
+
+        Returns
+        -------
+        List[str]
+            ISINs of the result, in order
+        """
+        query, params = self.__build("isin")
+
+        return [isin for (isin,) in self.database.connect().execute(query, params)]
+
+    def fetch_columns(self) -> Dict[str, np.ndarray]:
+        """Sends query and returns the result as column arrays
+
+
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Values of "isin" and every field, one element per result row.
+            Numeric fields are float or integer arrays, other fields object arrays.
+        """
+        fields, records = self.__fetch()
+        kinds = dict(self.database.get_fields(self.asset_type))
+
+        values = list(zip(*records)) or [()] * (len(fields) + 1)
+
+        columns = {"isin": np.array(values[0], dtype=object)}
+        for field, column in zip(fields, values[1:]):
+            if kinds[field] == "REAL":
+                columns[field] = np.array(column, dtype=np.float64)
+            elif kinds[field] == "INTEGER":
+                columns[field] = np.array(column, dtype=np.int64)
+            else:
+                columns[field] = np.array(column, dtype=object)
+
+        return columns
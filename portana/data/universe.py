@@ -0,0 +1,270 @@
+from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+
+from ..abstracts import data
+from ..timeseries.securitytimeseries import SecurityTimeSeries
+
+"""Parallel builder of simulated universes
+
+Universes are written into a PanelStore, a directory of memory-mapped (T x N)
+arrays. Worker processes write their chunk of securities straight into the
+memory-mapped files, so no time series is pickled back to the parent process.
+"""
+
+
+def _build_chunk(
+    asset_type: data.AbstractAssetType,
+    date_range: Tuple[str, str],
+    path: str,
+    start: int,
+    isins: List[str],
+) -> int:
+    """Simulate a chunk of securities into columns start to start + len(isins) - 1
+
+    Module-level so that it can be sent to worker processes.
+    """
+    store = PanelStore(path, mode="r+")
+    prices, tot_ret_idx = store.get_data()
+    cols = slice(start, start + len(isins))
+    seeds = [int(isin) for isin in isins]
+
+    # Simulated asset types generate the whole chunk at once
+    if hasattr(asset_type, "get_timeseries_batch"):
+        _, prices[:, cols], tot_ret_idx[:, cols] = asset_type.get_timeseries_batch(
+            date_range, seeds
+        )
+    else:
+        for col, seed in enumerate(seeds, start):
+            prices[:, col], tot_ret_idx[:, col] = asset_type.get_timeseries(
+                date_range, seed
+            ).get_data()
+
+    store.flush()
+
+    return len(isins)
+
+
+class PanelStore:
+    """Class to hold a (T x N) panel of prices and total returns index on disk
+
+    Arrays are stored column-major as .npy files and memory-mapped, so that each
+    security's time series is contiguous and only the parts read are loaded.
+
+
+    Parameters
+    -------
+    path: str
+        Directory of the panel
+    mode: str
+        Mode in which the panel is memory-mapped, see numpy.load, default "r"
+        (read-only)
+
+
+    Example
+    -------
+    >>> store = PanelStore("universe")
+    >>> prices, tot_ret_idx = store.get_data()
+    >>> prices.shape
+    (7671, 50000)
+    >>> store.get_timeseries("15000")["2020-01-01":"2020-12-31"]
+    """
+
+    def __init__(self, path: str, mode: str = "r"):
+        self.path = path
+
+        self._dates: np.ndarray = np.load(os.path.join(path, "dates.npy"))
+        self._isins: np.ndarray = np.load(os.path.join(path, "isins.npy"))
+        self._prices: np.ndarray = np.load(
+            os.path.join(path, "prices.npy"), mmap_mode=mode
+        )
+        self._tot_ret_idx: np.ndarray = np.load(
+            os.path.join(path, "tot_ret_idx.npy"), mmap_mode=mode
+        )
+        self._cols: Dict[str, int] = None
+
+    @classmethod
+    def create(cls, path: str, dates: np.ndarray, isins: List[str]) -> "PanelStore":
+        """Create an empty panel on disk
+
+
+        Parameters
+        -------
+        path: str
+            Directory of the panel, created if needed
+        dates: numpy.ndarray
+            Dates of the T rows
+        isins: List[str]
+            ISINs of the N columns
+
+
+        Returns
+        -------
+        PanelStore
+            Writable panel
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "dates.npy"), np.asarray(dates))
+        np.save(os.path.join(path, "isins.npy"), np.asarray(isins, dtype=str))
+
+        for name in ("prices", "tot_ret_idx"):
+            np.lib.format.open_memmap(
+                os.path.join(path, f"{name}.npy"),
+                mode="w+",
+                dtype=np.float64,
+                shape=(len(dates), len(isins)),
+                fortran_order=True,
+            ).flush()
+
+        return cls(path, mode="r+")
+
+    def get_dates(self) -> np.ndarray:
+        """Returns dates of the panel's rows"""
+        return self._dates
+
+    def get_isins(self) -> np.ndarray:
+        """Returns ISINs of the panel's columns"""
+        return self._isins
+
+    def get_data(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns memory-mapped (T x N) prices and total returns index"""
+        return self._prices, self._tot_ret_idx
+
+    def get_timeseries(self, isin: str) -> SecurityTimeSeries:
+        """Get time series of one security
+
+
+        Parameters
+        -------
+        isin: str
+            ISIN of the security
+
+
+        Returns
+        -------
+        SecurityTimeSeries
+            Prices and total returns index of the security, read from the panel
+        """
+        if self._cols is None:
+            self._cols = {str(isin): col for col, isin in enumerate(self._isins)}
+
+        col = self._cols[str(isin)]
+
+        return SecurityTimeSeries(
+            self._dates,
+            np.array(self._prices[:, col]),
+            np.array(self._tot_ret_idx[:, col]),
+        )
+
+    def flush(self) -> None:
+        """Write changes of a writable panel to disk"""
+        for array in (self._prices, self._tot_ret_idx):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+
+class UniverseBuilder:
+    """Class to simulate universes of securities in parallel
+
+
+    ISINs are split in chunks of chunk_size securities, simulated by worker
+    processes straight into a PanelStore. Each security's path only depends on its
+    ISIN, see Generator.generate_window, so the panel is the same whatever
+    chunk_size and max_workers are.
+
+
+    Parameters
+    -------
+    asset_type: AbstractAssetType
+        Asset type simulating each security, e.g. SimEquityAssetType()
+
+
+    Attributes
+    -------
+    chunk_size: int
+        Number of securities simulated by a worker at a time
+    max_workers: int
+        Number of worker processes, None to use every core, 1 to run in this process
+
+
+    Example
+    -------
+    >>> builder = UniverseBuilder(SimEquityAssetType())
+    >>> builder.set_chunk_size(500)
+    >>> store = builder.build(range(15000, 65000), ("2000-01-01", "2020-12-31"), "universe")
+    """
+
+    def __init__(self, asset_type: data.AbstractAssetType):
+        self.asset_type = asset_type
+        self.chunk_size: int = 1000
+        self.max_workers: int = None
+
+    def set_chunk_size(self, chunk_size: int) -> None:
+        """Setter for chunk_size
+
+
+        Parameters
+        -------
+        chunk_size: int
+            Number of securities simulated by a worker at a time
+        """
+        self.chunk_size = chunk_size
+
+    def set_max_workers(self, max_workers: int) -> None:
+        """Setter for max_workers
+
+
+        Parameters
+        -------
+        max_workers: int
+            Number of worker processes, None to use every core, 1 to run in this process
+        """
+        self.max_workers = max_workers
+
+    def build(
+        self, isins: List[str], date_range: Tuple[str, str], path: str
+    ) -> PanelStore:
+        """Simulate every security into a new panel
+
+
+        Parameters
+        -------
+        isins: List[str]
+            ISINs of the securities to simulate
+        date_range: Tuple[str, str]
+            Date range to simulate
+        path: str
+            Directory of the panel, an existing panel is overwritten
+
+
+        Returns
+        -------
+        PanelStore
+            Read-only panel of the universe
+        """
+        isins = [str(isin) for isin in isins]
+        if not isins:
+            raise ValueError("isins should not be empty, a panel needs a security")
+
+        dates = self.asset_type.get_timeseries(date_range, int(isins[0])).get_dates()
+
+        PanelStore.create(path, dates, isins)
+
+        starts = list(range(0, len(isins), self.chunk_size))
+        args = (
+            [self.asset_type] * len(starts),
+            [date_range] * len(starts),
+            [path] * len(starts),
+            starts,
+            [isins[start : start + self.chunk_size] for start in starts],
+        )
+
+        if self.max_workers == 1:
+            list(map(_build_chunk, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(_build_chunk, *args))
+
+        return PanelStore(path)
@@ -0,0 +1,132 @@
+from typing import List, Dict
+
+import numpy as np
+import pandas as pd
+
+from ..abstracts.data import AbstractSecurity
+
+"""
+Categorical exposure matrices used by Portfolio
+"""
+
+
+class ExposureMatrix:
+    """Class to represent exposure fields of a list of securities as one-hot matrices
+
+
+    Each exposure field (sector, geography, strategy, risk...) is encoded once into
+    an (N securities x C categories) matrix, so that portfolio exposures become a
+    single matrix product with a vector or time series of weights.
+
+    A security can also report a field as a dict of category weights, which is what
+    PortfolioSecurity does. Its row then holds those weights instead of a single one,
+    so nested portfolios are looked through by the same matrix product.
+
+
+    Parameters
+    -------
+    securities: List[AbstractSecurity]
+        Securities to encode, one row per security
+
+
+    Attributes
+    -------
+    fields: List[str]
+        Exposure fields, in order of first appearance
+    categories: Dict[str, List[str]]
+        Categories of each field, in order of first appearance
+    matrices: Dict[str, numpy.ndarray]
+        (N x C) matrix of each field
+    fees: numpy.ndarray
+        Fee of each security, 0 if the security has no fee
+
+
+    Example
+    -------
+    >>> matrix = ExposureMatrix(securities)
+    >>> matrix.categories["geography"]
+    ['Canada', 'United States']
+    >>> weights @ matrix.matrices["geography"]
+    array([0.4, 0.6])
+    """
+
+    def __init__(self, securities: List[AbstractSecurity]):
+        self.fields: List[str] = []
+        self.categories: Dict[str, List[str]] = {}
+        self.matrices: Dict[str, np.ndarray] = {}
+        self.fees: np.ndarray = None
+
+        exposures = [security.get_exposures() for security in securities]
+
+        for security_exposures in exposures:
+            for field in security_exposures:
+                if field not in self.categories:
+                    self.fields.append(field)
+                    self.categories[field] = []
+
+        for field in self.fields:
+            values = [security_exposures.get(field) for security_exposures in exposures]
+
+            if any(isinstance(value, dict) for value in values):
+                categories, matrix = self.__encode_look_through(values)
+            else:
+                categories, matrix = self.__encode_one_hot(values)
+
+            self.categories[field] = categories
+            self.matrices[field] = matrix
+
+        fees = [security.get_description().get("fee") for security in securities]
+        self.fees = np.array(
+            [0.0 if fee is None else fee for fee in fees], dtype=np.float64
+        )
+
+    def __encode_one_hot(self, values: list):
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+
+        matrix = np.zeros((len(values), len(uniques)), dtype=np.float64)
+        rows = np.flatnonzero(codes >= 0)
+        matrix[rows, codes[rows]] = 1.0
+
+        return list(uniques), matrix
+
+    def __encode_look_through(self, values: list):
+        categories = {}
+        for value in values:
+            for category in value if isinstance(value, dict) else [value]:
+                if category is not None:
+                    categories.setdefault(category, len(categories))
+
+        matrix = np.zeros((len(values), len(categories)), dtype=np.float64)
+        for row, value in enumerate(values):
+            if isinstance(value, dict):
+                for category, weight in value.items():
+                    matrix[row, categories[category]] = weight
+            elif value is not None:
+                matrix[row, categories[value]] = 1.0
+
+        return list(categories), matrix
+
+    def aggregate(
+        self, weights: np.ndarray, rows: np.ndarray = None
+    ) -> Dict[str, np.ndarray]:
+        """Aggregate weights into exposures of each field
+
+
+        Parameters
+        -------
+        weights: numpy.ndarray
+            Either a (N,) vector or a (T x N) time series of security weights
+        rows: numpy.ndarray
+            Securities the columns of weights belong to, defaults to None (all N
+            securities, in order)
+
+
+        Returns
+        -------
+        Dict[str, numpy.ndarray]
+            Exposures of each field, (C,) or (T x C) following the shape of weights
+        """
+        if rows is None:
+            return {field: weights @ self.matrices[field] for field in self.fields}
+
+        return {field: weights @ self.matrices[field][rows] for field in self.fields}
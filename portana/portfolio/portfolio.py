@@ -1,12 +1,15 @@
-from typing import List, Dict, Tuple, Literal
+from typing import List, Dict, Tuple, Literal, Union
 
 import numpy as np
 
 from ..abstracts.portfolio import AbstractPortfolio
 from ..abstracts.data import AbstractSecurity
 from ..timeseries.securitytimeseries import SecurityTimeSeries
+from ..timeseries.analyzerseries import AnalyzerSeries
 from ..data.security import PortfolioSecurity
 from ..analyzer.equity_analyzer import EquityAnalyzer
+from ..data.async_connection import resolve_universe
+from .exposures import ExposureMatrix
 
 
 class Portfolio(AbstractPortfolio):
@@ -27,7 +30,7 @@ class Portfolio(AbstractPortfolio):
     """
 
     def __init__(self):
-        self.name: str = "Custom Portfolio"
+        self._name: str = "Custom Portfolio"
         self.securities: List[AbstractSecurity] = []
         self.weights: list = []
         self.starting_nav = 0
@@ -38,6 +41,26 @@ class Portfolio(AbstractPortfolio):
         self._latest_common_date: np.datetime64 = None
         self._date_series: np.ndarray = None
         self._weights_timeseries: np.ndarray = None
+        self._exposure_matrix: ExposureMatrix = None
+        self._security: PortfolioSecurity = None
+
+        # Nested portfolios, keyed by their position in securities
+        self._children: Dict[int, "Portfolio"] = {}
+
+        # Target-weight schedule, stored column-compressed: only securities that
+        # are ever held get a column in _schedule_weights, and in _weights_timeseries
+        self._schedule_dates: np.ndarray = None
+        self._schedule_cols: np.ndarray = None
+        self._schedule_weights: np.ndarray = None
+
+    @property
+    def name(self) -> str:
+        """Name of the portfolio, used as the ISIN of its PortfolioSecurity"""
+        return self._name
+
+    @name.setter
+    def name(self, name: str) -> None:
+        self.set_name(name)
 
     def __update_earliest_common_date(self) -> None:
         start_dates = []
@@ -59,10 +82,42 @@ class Portfolio(AbstractPortfolio):
         start = self._earliest_common_date
         end = self._latest_common_date
 
+        if start > end:
+            raise ValueError("securities of the portfolio have no dates in common")
+
         dates = self.securities[0].get_timeseries()[start:end].get_dates()
 
         self._date_series = dates
 
+    def __rebuild(self) -> None:
+        self._exposure_matrix = None
+        self.__invalidate()
+
+        if not self.securities:
+            self._earliest_common_date = None
+            self._latest_common_date = None
+            self._date_series = None
+            self._weights_timeseries = None
+            return
+
+        self.__update_earliest_common_date()
+        self.__update_latest_common_date()
+        self.__build_dates()
+        self.__calculate_weights_timeseries()
+
+    def __add(self, securities: List[AbstractSecurity], weights: List[float]) -> None:
+        self.securities.extend(securities)
+        self.weights.extend(weights)
+
+        try:
+            self.__rebuild()
+        except Exception:
+            # Leave the portfolio as it was before the securities were added
+            del self.securities[len(self.securities) - len(securities) :]
+            del self.weights[len(self.weights) - len(weights) :]
+            self.__rebuild()
+            raise
+
     def __get_individual_price_returns(self) -> np.ndarray:
         analyzer = EquityAnalyzer()
         for security in self.securities:
@@ -72,16 +127,97 @@ class Portfolio(AbstractPortfolio):
 
         return rets.get_data()
 
-    def __get_individual_total_returns(self) -> np.ndarray:
-        analyzer = EquityAnalyzer()
-        for security in self.securities:
-            analyzer.add_security(security)
+    def __invalidate(self) -> None:
+        self._security = None
 
-        rets, _ = analyzer.get_returns("tr")
+    def __refresh_children(self) -> None:
+        changed = False
 
-        return rets.get_data()
+        # A child hands back the same PortfolioSecurity for as long as its inputs
+        # (and those of its own children) are unchanged
+        for idx, child in self._children.items():
+            security = child.securitize()
+            if security is not self.securities[idx]:
+                self.securities[idx] = security
+                changed = True
+
+        if changed:
+            self._exposure_matrix = None
+            self.__invalidate()
+            self.__update_earliest_common_date()
+            self.__update_latest_common_date()
+            self.__build_dates()
+            self.__calculate_weights_timeseries()
+
+    def __get_exposure_matrix(self) -> ExposureMatrix:
+        if self._exposure_matrix is None:
+            self._exposure_matrix = ExposureMatrix(self.securities)
+
+        return self._exposure_matrix
+
+    def __get_active_cols(self) -> np.ndarray:
+        if self._schedule_cols is not None:
+            return self._schedule_cols
+
+        return np.arange(len(self.securities))
+
+    def __get_current_weights(self) -> np.ndarray:
+        if self._schedule_weights is None:
+            return np.array(self.weights, dtype=np.float64)
+
+        # Latest drifted weights of the schedule, or its last targets if there is
+        # no return period yet
+        if len(self._weights_timeseries):
+            latest = self._weights_timeseries[-1]
+        else:
+            latest = self._schedule_weights[-1]
+
+        weights = np.zeros(len(self.securities), dtype=np.float64)
+        weights[self._schedule_cols] = latest
+
+        return weights
+
+    def __get_individual_levels(
+        self, mode: Literal["px", "tr"], cols: np.ndarray
+    ) -> np.ndarray:
+        start = str(self._earliest_common_date)
+        end = str(self._latest_common_date)
+
+        levels = np.empty((len(self._date_series), len(cols)), dtype=np.float64)
+
+        for idx, col in enumerate(cols):
+            prices, tot_ret_idx = (
+                self.securities[col].get_timeseries()[start:end].get_data()
+            )
+            levels[:, idx] = prices if mode == "px" else tot_ret_idx
+
+        return levels
+
+    def __calculate_scheduled_weights_timeseries(self) -> None:
+        cols = self._schedule_cols
+        periods = len(self._date_series) - 1
+
+        # Each return period holds the targets of the latest rebalance on or before it,
+        # drifted by price moves since that rebalance. Periods before the first
+        # rebalance drift from the first target.
+        rebal_indices = np.searchsorted(self._date_series, self._schedule_dates)
+        in_force = np.searchsorted(rebal_indices, np.arange(periods), side="right") - 1
+        anchors = np.where(in_force >= 0, rebal_indices[np.maximum(in_force, 0)], 0)
+        in_force = np.maximum(in_force, 0)
+
+        levels = self.__get_individual_levels("px", cols)
+
+        drifted = self._schedule_weights[in_force] * levels[:periods] / levels[anchors]
+        totals = drifted.sum(axis=1, keepdims=True)
+        self._weights_timeseries = np.divide(
+            drifted, totals, out=np.zeros_like(drifted), where=totals != 0
+        )
 
     def __calculate_weights_timeseries(self):
+        if self._schedule_weights is not None:
+            self.__calculate_scheduled_weights_timeseries()
+            return
+
         if self.rebal:
             if self.rebal_freq == "data":
                 weights = np.array(self.weights, dtype=np.float64)
@@ -161,17 +297,12 @@ class Portfolio(AbstractPortfolio):
 
         self._weights_timeseries = weights
 
-    def __get_port_price_returns(self) -> np.ndarray:
-        rets = self.__get_individual_price_returns()
-        weights = self._weights_timeseries.transpose()
-
-        return np.dot(rets, weights)[:, 0]
-
-    def __get_port_total_returns(self) -> np.ndarray:
-        rets = self.__get_individual_total_returns()
-        weights = self._weights_timeseries.transpose()
+    def __get_port_returns(self, mode: Literal["px", "tr"]) -> np.ndarray:
+        cols = self.__get_active_cols()
+        levels = self.__get_individual_levels(mode, cols)
+        rets = np.diff(levels, axis=0) / levels[:-1]
 
-        return np.dot(rets, weights)[:, 0]
+        return np.einsum("ij,ij->i", rets, self._weights_timeseries)
 
     def add_security(self, security: AbstractSecurity, weight: float):
         """Add a security to portfolio
@@ -189,13 +320,88 @@ class Portfolio(AbstractPortfolio):
         -------
         None
         """
-        self.securities.append(security)
-        self.weights.append(weight)
+        self.__add([security], [weight])
 
-        self.__update_earliest_common_date()
-        self.__update_latest_common_date()
-        self.__build_dates()
-        self.__calculate_weights_timeseries()
+    def add_securities(self, securities: List[AbstractSecurity], weights: List[float]):
+        """Add many securities to portfolio, calculating weights only once
+
+
+        Parameters
+        -------
+        securities: List[AbstractSecurity]
+            Securities to be added, or a SecurityPanel of them, or an awaitable
+            returning either (e.g. AsyncFetcher.fetch(isins, date_range))
+        weights: List[float]
+            The weight of each security in the portfolio
+
+
+        Returns
+        -------
+        None
+        """
+        securities = resolve_universe(securities)
+        if len(securities) != len(weights):
+            raise ValueError("securities and weights must have the same length")
+
+        self.__add(list(securities), list(weights))
+
+    def add_portfolio(self, portfolio: "Portfolio", weight: float, name: str = None):
+        """Add a nested portfolio to portfolio
+
+        The nested portfolio is added as the PortfolioSecurity returned by its securitize(),
+        and is re-securitized whenever its inputs change. Its exposures and fees are
+        looked through when calculating exposures and fees of this portfolio.
+
+
+        Parameters
+        -------
+        portfolio: Portfolio
+            Portfolio to be added
+        weight: float
+            The weight of the nested portfolio in the portfolio
+        name: str
+            New name of the nested portfolio, defaults to None (keep its name)
+
+
+        Note
+        -------
+        The name of a nested portfolio is the ISIN of its security, so it must differ
+        from the ISINs of the other securities in the portfolio, e.g. from the names
+        of other nested portfolios, which all default to "Custom Portfolio".
+
+
+        Returns
+        -------
+        None
+        """
+        name = portfolio.name if name is None else name
+        if name in [security.get_isin() for security in self.securities]:
+            raise ValueError(
+                f"portfolio already holds a security named {name}, "
+                "nested portfolios need unique names"
+            )
+
+        portfolio.set_name(name)
+
+        # Registered once added, so that a failed add leaves no child behind
+        self.add_security(portfolio.securitize(), weight)
+        self._children[len(self.securities) - 1] = portfolio
+
+    def set_name(self, name: str) -> None:
+        """Set the name of the portfolio
+
+
+        Parameters
+        -------
+        name: str
+            Name of the portfolio, used as the ISIN of its PortfolioSecurity
+
+        Returns
+        -------
+        None
+        """
+        self._name = name
+        self.__invalidate()
 
     def set_starting_nav(self, starting_nav: float):
         """Set the starting NAV of the portfolio
@@ -211,6 +417,7 @@ class Portfolio(AbstractPortfolio):
         None
         """
         self.starting_nav = starting_nav
+        self.__invalidate()
 
     def set_rebal(
         self, is_enabled: bool, freq: Literal["data", "M", "Q", "Y"] = "data"
@@ -232,8 +439,97 @@ class Portfolio(AbstractPortfolio):
         """
         self.rebal = is_enabled
         self.rebal_freq = freq
+        self.__invalidate()
+        self.__calculate_weights_timeseries()
+
+    def set_weights_schedule(
+        self, schedule: Union[AnalyzerSeries, np.ndarray], dates: np.ndarray = None
+    ) -> None:
+        """Set dated target weights, overriding the static weights and rebal policy
+
+
+        Parameters
+        -------
+        schedule: Union[AnalyzerSeries, numpy.ndarray]
+            Target weights, one row per rebalance date and one column per security.
+            If an AnalyzerSeries is passed in, its dates are used as rebalance dates
+            and its col_names are matched against the ISINs of securities in the portfolio.
+            Otherwise columns follow the order in which securities were added.
+        dates: numpy.ndarray
+            Rebalance dates, required if schedule is a numpy.ndarray
+
+
+        Note
+        -------
+        Securities can enter and leave the portfolio by having zero target weights
+        on some rebalance dates. Only securities with a non-zero target on at least one
+        rebalance date are tracked: targets, levels and drifted weights are stored as
+        (periods x held securities) matrices, so large universes with few positions
+        stay cheap. Periods before the first rebalance date drift from the first row
+        of targets. Exposures and fees are those of the latest drifted weights.
+
+
+        Returns
+        -------
+        None
+        """
+        if isinstance(schedule, AnalyzerSeries):
+            isins = [security.get_isin() for security in self.securities]
+            try:
+                cols = np.array([isins.index(isin) for isin in schedule.col_names])
+            except ValueError as err:
+                raise ValueError(
+                    "schedule contains a security not in portfolio"
+                ) from err
+
+            dates = schedule.get_dates()
+            schedule = schedule.get_data()
+        else:
+            if dates is None:
+                raise ValueError("dates are required when schedule is a numpy.ndarray")
+            if np.ndim(schedule) != 2 or np.shape(schedule)[1] != len(self.securities):
+                raise ValueError(
+                    f"schedule must have one column per security in portfolio "
+                    f"({len(self.securities)}), got shape {np.shape(schedule)}"
+                )
+            cols = np.arange(len(self.securities))
+
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        schedule = np.asarray(schedule, dtype=np.float64)
+
+        if len(schedule) != len(dates):
+            raise ValueError("schedule must have one row per rebalance date")
+
+        order = np.argsort(dates, kind="stable")
+        active = np.flatnonzero(np.any(schedule != 0, axis=0))
+
+        self._schedule_dates = dates[order]
+        self._schedule_cols = cols[active]
+        self._schedule_weights = schedule[order][:, active]
+        self.__invalidate()
         self.__calculate_weights_timeseries()
 
+    def get_weights_timeseries(self) -> AnalyzerSeries:
+        """Get drifted weights of each security held over each period
+
+
+        Returns
+        -------
+        AnalyzerSeries
+            Weights of securities, dated by the end of each period, with one column
+            per security in portfolio
+        """
+        self.__refresh_children()
+
+        isins = [security.get_isin() for security in self.securities]
+
+        weights = self._weights_timeseries
+        if self._schedule_cols is not None:
+            weights = np.zeros((len(weights), len(self.securities)), dtype=np.float64)
+            weights[:, self._schedule_cols] = self._weights_timeseries
+
+        return AnalyzerSeries(self._date_series[1:], weights, isins)
+
     def securitize(self) -> PortfolioSecurity:
         """Get simulated historical NAV of the portfolio,
         and return them in an AbstractSecurity object.
@@ -242,13 +538,25 @@ class Portfolio(AbstractPortfolio):
         -------
         AbstractSecurity
             Security object representing the portfolio
+
+
+        Note
+        -------
+        The returned security is cached and handed back again until the inputs of this
+        portfolio or of any nested portfolio change. Its description carries the
+        portfolio's look-through "fee", and its exposures are dicts of category weights.
         """
+        self.__refresh_children()
+
+        if self._security is not None:
+            return self._security
+
         prices = np.zeros(len(self._date_series))
         tot_ret_idx = np.zeros(len(self._date_series))
 
         px_ret, tot_ret = (
-            self.__get_port_price_returns(),
-            self.__get_port_total_returns(),
+            self.__get_port_returns("px"),
+            self.__get_port_returns("tr"),
         )
         px_ret, tot_ret = px_ret + 1, tot_ret + 1
 
@@ -262,10 +570,14 @@ class Portfolio(AbstractPortfolio):
 
         timeseries = SecurityTimeSeries(self._date_series, prices, tot_ret_idx)
 
-        return PortfolioSecurity(
-            self.name, timeseries, self.get_fees(), self.get_exposures()
+        description = {"name": self.name, "fee": self.get_fees()["fees"]}
+
+        self._security = PortfolioSecurity(
+            self.name, timeseries, description, self.get_exposures()
         )
 
+        return self._security
+
     def get_exposures(self) -> Dict[str, Dict[str, float]]:
         """Get categorized exposure of the entire porfolio
 
@@ -290,17 +602,51 @@ class Portfolio(AbstractPortfolio):
             ...
         }
         """
-        exposures_table = {}
+        self.__refresh_children()
+
+        matrix = self.__get_exposure_matrix()
+        weights = self.__get_current_weights()
 
-        for idx, security in enumerate(self.securities):
-            exposures = security.get_exposures()
-            for exposure in exposures:
-                exposures_table.setdefault(exposure, {})
-                exposures_table[exposure].setdefault(exposures[exposure], 0)
-                exposures_table[exposure][exposures[exposure]] += self.weights[idx]
+        exposures_table = {}
+        for field, exposures in matrix.aggregate(weights).items():
+            exposures_table[field] = {
+                category: float(exposure)
+                for category, exposure in zip(matrix.categories[field], exposures)
+            }
 
         return exposures_table
 
+    def get_exposures_timeseries(self) -> Dict[str, AnalyzerSeries]:
+        """Get categorized exposure of the entire portfolio over time,
+        using drifted weights of each period
+
+
+        Returns
+        -------
+        Dict[str, AnalyzerSeries]
+            AnalyzerSeries of exposures for each exposure field,
+            with one column per category
+
+
+        Example
+        -------
+        >>> Portfolio.get_exposures_timeseries()["geography"].to_df()
+                    Canada  United States
+        2020-01-02    0.50           0.50
+        2020-01-03    0.51           0.49
+        ...
+        """
+        self.__refresh_children()
+
+        matrix = self.__get_exposure_matrix()
+        dates = self._date_series[1:]
+        exposures = matrix.aggregate(self._weights_timeseries, self.__get_active_cols())
+
+        return {
+            field: AnalyzerSeries(dates, field_exposures, matrix.categories[field])
+            for field, field_exposures in exposures.items()
+        }
+
     def get_exposures_detailed(self) -> Dict[str, Dict[str, Tuple[str, float]]]:
         """Get categorized exposure of the entire porfolio,
         broken down by security
@@ -328,16 +674,22 @@ class Portfolio(AbstractPortfolio):
             ...
         }
         """
-        exposures_table = {}
+        self.__refresh_children()
 
-        for idx, security in enumerate(self.securities):
-            exposures = security.get_exposures()
-            for exposure in exposures:
-                exposures_table.setdefault(exposure, {})
-                exposures_table[exposure].setdefault(exposures[exposure], [])
-                exposures_table[exposure][exposures[exposure]].append(
-                    (security.get_isin(), self.weights[idx])
-                )
+        matrix = self.__get_exposure_matrix()
+        weights = self.__get_current_weights()
+        isins = [security.get_isin() for security in self.securities]
+
+        exposures_table = {}
+        for field in matrix.fields:
+            exposures_table[field] = {}
+
+            for col, category in enumerate(matrix.categories[field]):
+                shares = matrix.matrices[field][:, col]
+                exposures_table[field][category] = [
+                    (isins[idx], weights[idx] * shares[idx])
+                    for idx in np.flatnonzero(shares)
+                ]
 
         return exposures_table
 
@@ -358,10 +710,9 @@ class Portfolio(AbstractPortfolio):
             "fees": 0.005
         }
         """
-        port_fee = 0.0
-        for idx, security in enumerate(self.securities):
-            fee = security.get_description().get("fee")
-            if fee is not None:
-                port_fee += fee * self.weights[idx]
+        self.__refresh_children()
+
+        matrix = self.__get_exposure_matrix()
+        weights = self.__get_current_weights()
 
-        return {"fees": port_fee}
+        return {"fees": float(weights @ matrix.fees)}
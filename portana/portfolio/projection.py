@@ -0,0 +1,353 @@
+from typing import List, Tuple, Literal, Union
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ..timeseries.analyzerseries import AnalyzerSeries
+from ..timeseries.buffers import SharedPickle
+
+"""
+Monte Carlo projection of portfolio NAVs
+"""
+
+
+def _simulate_chunk(
+    method: str,
+    params: Union[Tuple, SharedPickle],
+    horizon: int,
+    n_paths: int,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """Simulate one chunk of growth paths, returns a (n_paths x horizon) array
+
+    Module-level so that it can be sent to worker processes.
+    """
+    rng = np.random.default_rng(seed)
+
+    if isinstance(params, SharedPickle):
+        params = params.load()
+
+    if method == "normal":
+        drift, vol = params
+        rets = rng.normal(drift, vol, (n_paths, horizon)) + 1
+
+    elif method == "bootstrap":
+        history, block_size = params
+        n_blocks = -(-horizon // block_size)
+
+        starts = rng.integers(0, len(history) - block_size + 1, (n_paths, n_blocks))
+        indices = starts[:, :, np.newaxis] + np.arange(block_size)
+        indices = indices.reshape(n_paths, n_blocks * block_size)[:, :horizon]
+
+        rets = history[indices] + 1
+
+    return np.cumprod(rets, axis=1, out=rets).astype(np.float32)
+
+
+def _count_chunk(
+    method: str,
+    params: Union[Tuple, SharedPickle],
+    horizon: int,
+    n_paths: int,
+    seed: np.random.SeedSequence,
+    lows: np.ndarray,
+    widths: np.ndarray,
+    bins: int,
+) -> np.ndarray:
+    """Simulate one chunk of growth paths, returns a (horizon x bins) histogram of
+    their log growth at each horizon
+
+    The bins of each horizon start at lows and are widths wide, paths outside of them
+    are counted in the first or last bin. Module-level so that it can be sent to
+    worker processes.
+    """
+    paths = _simulate_chunk(method, params, horizon, n_paths, seed)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        positions = (np.log(paths) - lows) / widths
+
+    positions = np.nan_to_num(positions, nan=0.0, posinf=bins - 1, neginf=0.0)
+    indices = np.clip(positions, 0, bins - 1).astype(np.int64)
+    indices += np.arange(horizon) * bins
+
+    counts = np.bincount(indices.ravel(), minlength=horizon * bins)
+
+    return counts.reshape(horizon, bins)
+
+
+def _get_percentiles(
+    counts: np.ndarray, lows: np.ndarray, widths: np.ndarray, percentiles: List[float]
+) -> np.ndarray:
+    """Interpolate percentiles of each horizon from histograms made by _count_chunk,
+    returns a (horizon x percentiles) array of log growth
+    """
+    cumulative = np.cumsum(counts, axis=1)
+    rows = np.arange(len(counts))
+
+    results = np.empty((len(counts), len(percentiles)), dtype=np.float64)
+    for col, percentile in enumerate(percentiles):
+        ranks = cumulative[:, -1] * percentile / 100
+
+        # First bin reaching the rank, values are spread evenly within a bin
+        bins = np.minimum(
+            (cumulative < ranks[:, np.newaxis]).sum(axis=1), counts.shape[1] - 1
+        )
+        below = cumulative[rows, bins] - counts[rows, bins]
+        fractions = (ranks - below) / np.maximum(counts[rows, bins], 1)
+
+        results[:, col] = lows + widths * (bins + fractions)
+
+    return results
+
+
+class NavProjector:
+    """Class to project future NAV paths of a portfolio by Monte Carlo simulation
+
+
+    Paths are simulated as numpy arrays in chunks of chunk_size paths. Each chunk gets
+    its own seed stream spawned from a SeedSequence, so results only depend on seed and
+    chunk_size, not on how chunks are spread across worker processes.
+
+    project does not keep the paths: each chunk is reduced to a histogram of log
+    growth at each horizon, histograms are summed and percentiles interpolated from
+    them, so memory does not grow with n_paths.
+
+
+    Parameters
+    -------
+    portfolio: Portfolio
+        Portfolio to project, its historical NAV is used to calibrate the simulation
+
+
+    Attributes
+    -------
+    method: str
+        "normal" to draw normal returns with the portfolio's historical mean and
+        standard deviation (same as Generator), "bootstrap" to resample blocks of
+        the portfolio's historical returns
+    block_size: int
+        Number of consecutive periods in each bootstrapped block
+    chunk_size: int
+        Number of paths simulated at once by a worker
+    max_workers: int
+        Number of worker processes, None to use every core, 1 to run in this process
+    seed: int
+        Seed of the root SeedSequence
+    bins: int
+        Number of histogram bins at each horizon used by project
+
+
+    Example
+    -------
+    >>> projector = NavProjector(portfolio)
+    >>> projector.set_method("bootstrap", block_size=20)
+    >>> projector.set_seed(412843)
+    >>> bands = projector.project(252, 100_000)
+    >>> bands.to_df()
+                      p5        p25        p50        p75        p95
+    2021-01-01    100.00     100.00     100.00     100.00     100.00
+    2021-01-02     98.76      99.51     100.03     100.54     101.31
+    ...
+    """
+
+    SPREAD = 8
+    """ Histograms span SPREAD standard deviations of log growth on each side """
+
+    def __init__(self, portfolio):
+        self.portfolio = portfolio
+        self.method: str = "normal"
+        self.block_size: int = 20
+        self.chunk_size: int = 10_000
+        self.max_workers: int = None
+        self.seed: int = None
+        self.bins: int = 4096
+
+    def __get_params(self, mode: str) -> Tuple[np.ndarray, tuple]:
+        prices, tot_ret_idx = self.portfolio.securitize().get_timeseries().get_data()
+        navs = prices if mode == "px" else tot_ret_idx
+        history = np.diff(navs) / navs[:-1]
+
+        if self.method == "normal":
+            params = (history.mean(), history.std(ddof=1))
+        elif self.method == "bootstrap":
+            params = (history, min(self.block_size, len(history)))
+        else:
+            raise ValueError(f"unknown projection method: {self.method}")
+
+        return navs, params
+
+    def __map(self, function, params: tuple, horizon: int, n_paths: int, *extra):
+        sizes = [self.chunk_size] * (n_paths // self.chunk_size)
+        if n_paths % self.chunk_size:
+            sizes.append(n_paths % self.chunk_size)
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+
+        args = (
+            [self.method] * len(sizes),
+            [params] * len(sizes),
+            [horizon] * len(sizes),
+            sizes,
+            seeds,
+            *([arg] * len(sizes) for arg in extra),
+        )
+
+        if self.max_workers == 1:
+            yield from map(function, *args)
+        else:
+            # Bootstrapped history is shared once, not pickled with every chunk
+            with SharedPickle(params) as shared:
+                args = (args[0], [shared] * len(sizes), *args[2:])
+
+                with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                    yield from executor.map(function, *args)
+
+    def set_method(
+        self, method: Literal["normal", "bootstrap"], block_size: int = 20
+    ) -> None:
+        """Setter for method and block_size
+
+
+        Parameters
+        -------
+        method: str
+            "normal" or "bootstrap"
+        block_size: int
+            Number of consecutive periods in each bootstrapped block, defaults to 20
+        """
+        self.method = method
+        self.block_size = block_size
+
+    def set_chunk_size(self, chunk_size: int) -> None:
+        """Setter for chunk_size
+
+
+        Parameters
+        -------
+        chunk_size: int
+            Number of paths simulated at once, bounds memory used by each worker
+        """
+        self.chunk_size = chunk_size
+
+    def set_max_workers(self, max_workers: int) -> None:
+        """Setter for max_workers
+
+
+        Parameters
+        -------
+        max_workers: int
+            Number of worker processes, None to use every core, 1 to run in this process
+        """
+        self.max_workers = max_workers
+
+    def set_seed(self, seed: int) -> None:
+        """Setter for seed
+
+
+        Parameters
+        -------
+        seed: int
+            Seed of the root SeedSequence
+        """
+        self.seed = seed
+
+    def set_bins(self, bins: int) -> None:
+        """Setter for bins
+
+
+        Parameters
+        -------
+        bins: int
+            Number of histogram bins at each horizon, more bins give more precise
+            percentiles at the cost of memory
+        """
+        self.bins = bins
+
+    def simulate(self, horizon: int, n_paths: int, mode: Literal["px", "tr"] = "tr"):
+        """Simulate NAV paths
+
+        Every path is kept in memory, use project to only get percentile bands.
+
+
+        Parameters
+        -------
+        horizon: int
+            Number of periods to project
+        n_paths: int
+            Number of paths to simulate
+        mode: str
+            "px" to project price NAV, "tr" for total returns NAV, defaults to "tr"
+
+
+        Returns
+        -------
+        numpy.ndarray
+            (n_paths x horizon) float32 array of simulated NAVs
+        """
+        navs, params = self.__get_params(mode)
+
+        paths = np.empty((n_paths, horizon), dtype=np.float32)
+
+        offset = 0
+        for chunk in self.__map(_simulate_chunk, params, horizon, n_paths):
+            paths[offset : offset + len(chunk)] = chunk
+            offset += len(chunk)
+
+        paths *= navs[-1]
+
+        return paths
+
+    def project(
+        self,
+        horizon: int,
+        n_paths: int,
+        percentiles: List[float] = (5, 25, 50, 75, 95),
+        mode: Literal["px", "tr"] = "tr",
+    ) -> AnalyzerSeries:
+        """Get percentile bands of simulated NAV paths at each horizon
+
+
+        Parameters
+        -------
+        horizon: int
+            Number of periods to project
+        n_paths: int
+            Number of paths to simulate
+        percentiles: List[float]
+            Percentiles to calculate, defaults to (5, 25, 50, 75, 95)
+        mode: str
+            "px" to project price NAV, "tr" for total returns NAV, defaults to "tr"
+
+
+        Returns
+        -------
+        AnalyzerSeries
+            Percentile bands, starting with the portfolio's latest NAV on its last date
+        """
+        navs, params = self.__get_params(mode)
+
+        # Bins of log growth centered on the expected growth at each horizon
+        log_rets = np.log1p(np.diff(navs) / navs[:-1])
+        steps = np.arange(1, horizon + 1)
+        spreads = self.SPREAD * max(log_rets.std(), 1e-6) * np.sqrt(steps)
+
+        lows = log_rets.mean() * steps - spreads
+        widths = 2 * spreads / self.bins
+
+        counts = np.zeros((horizon, self.bins), dtype=np.int64)
+        for chunk in self.__map(
+            _count_chunk, params, horizon, n_paths, lows, widths, self.bins
+        ):
+            counts += chunk
+
+        timeseries = self.portfolio.securitize().get_timeseries()
+        dates = timeseries.get_dates()[-1] + np.arange(horizon + 1)
+
+        bands = np.empty((horizon + 1, len(percentiles)), dtype=np.float64)
+        bands[0] = navs[-1]
+        bands[1:] = navs[-1] * np.exp(
+            _get_percentiles(counts, lows, widths, percentiles)
+        )
+
+        col_names = [f"p{percentile:g}" for percentile in percentiles]
+
+        return AnalyzerSeries(dates, bands, col_names)
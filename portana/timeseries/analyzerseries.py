@@ -4,6 +4,7 @@ import numpy as np
 import pandas as pd
 
 from ..abstracts import timeseries
+from . import buffers
 
 
 class AnalyzerSeries(timeseries.AbstractTimeSeries):
@@ -42,6 +43,19 @@ class AnalyzerSeries(timeseries.AbstractTimeSeries):
         self.results = results
         self.col_names = col_names
 
+    def __reduce_ex__(self, protocol: int):
+        # From protocol 5, arrays are sent as out-of-band buffers, see buffers
+        if protocol < 5:
+            return super().__reduce_ex__(protocol)
+
+        arrays = (self.dates, self.results)
+
+        return buffers.rebuild, (
+            type(self),
+            tuple(buffers.pack_array(array) for array in arrays),
+            (self.col_names,),
+        )
+
     def __make_self(self, dates: np.ndarray, results: np.ndarray, col_names: List[str]):
         return AnalyzerSeries(dates, results, col_names)
 
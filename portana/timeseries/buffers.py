@@ -0,0 +1,195 @@
+from typing import Dict, List, Set, Tuple
+from multiprocessing import resource_tracker, shared_memory
+import pickle
+
+import numpy as np
+
+"""Out-of-band pickling of time series
+
+With pickle protocol 5, SecurityTimeSeries and AnalyzerSeries hand their arrays to
+pickle as PickleBuffers: given a buffer_callback, pickle passes the arrays' memory
+to the callback instead of copying it into the pickle stream, and pickle.loads
+builds the arrays straight on top of the buffers it is given back.
+
+numpy only does so for contiguous arrays of plain dtypes: dates (datetime64),
+memory-mapped and strided arrays are copied into the stream. Time series pack every
+array as raw bytes instead, so that all of them are sent out-of-band.
+
+SharedPickle moves the out-of-band buffers of an object through one
+multiprocessing.shared_memory segment, so that sending a security or a panel of
+results to worker processes costs one copy into shared memory, whatever the number
+of workers, and loading it in a worker costs no copy at all.
+
+
+Example
+-------
+>>> with SharedPickle(security) as shared:
+...     with ProcessPoolExecutor() as executor:
+...         results = list(executor.map(work, [shared] * 8))
+
+>>> def work(shared):
+...     security = shared.load()
+"""
+
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+
+_created: Set[str] = set()
+
+
+def pack_array(array: np.ndarray) -> tuple:
+    """Pack an array as a PickleBuffer of its raw bytes, with dtype and shape
+
+    Arrays of python objects are returned as they are.
+    """
+    array = np.asarray(array)
+    if array.dtype.hasobject:
+        return (array,)
+
+    order = "F" if array.flags.f_contiguous and not array.flags.c_contiguous else "C"
+    flat = np.ascontiguousarray(array.reshape(-1, order=order))
+
+    return (pickle.PickleBuffer(flat.view(np.uint8)), array.dtype, array.shape, order)
+
+
+def unpack_array(packed: tuple) -> np.ndarray:
+    """Rebuild an array packed by pack_array, on top of its buffer"""
+    if len(packed) == 1:
+        return packed[0]
+
+    buffer, dtype, shape, order = packed
+
+    return np.frombuffer(buffer, dtype=np.uint8).view(dtype).reshape(shape, order=order)
+
+
+def rebuild(cls: type, arrays: Tuple[tuple, ...], args: tuple):
+    """Build cls from arrays packed by pack_array, followed by args
+
+    Used by __reduce_ex__ of time series.
+    """
+    return cls(*(unpack_array(packed) for packed in arrays), *args)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Map a segment in this process, for as long as the process lives
+
+    Arrays loaded from a segment point into its mapping, so it is never closed.
+    """
+    segment = _attached.get(name)
+    if segment is None:
+        segment = shared_memory.SharedMemory(name=name)
+
+        # The segment belongs to the process that created it, which unlinks it
+        if name not in _created:
+            resource_tracker.unregister(segment._name, "shared_memory")
+        _attached[name] = segment
+
+    return segment
+
+
+class SharedPickle:
+    """Class to send an object to other processes through shared memory
+
+    The object is pickled with protocol 5 on creation: its out-of-band buffers are
+    copied into one shared memory segment and the rest of the pickle is kept in the
+    SharedPickle, which is small and can be sent to worker processes as it is.
+
+
+    Parameters
+    -------
+    obj: object
+        Object to share, e.g. a Security, SecurityTimeSeries or numpy.ndarray
+
+
+    Attributes
+    -------
+    name: str
+        Name of the shared memory segment
+    nbytes: int
+        Size of the shared buffers, in bytes
+
+
+    Note
+    -------
+    Arrays loaded from a SharedPickle are views of the segment, shared by every
+    process that loads it. Writing to them is visible to all of those processes.
+
+    The process creating a SharedPickle owns the segment and must close it, e.g. by
+    using the SharedPickle as a context manager, once workers are done. Processes
+    loading it keep the segment mapped for as long as they live.
+    """
+
+    def __init__(self, obj):
+        buffers: List[pickle.PickleBuffer] = []
+        self._payload = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+
+        raws = [buffer.raw() for buffer in buffers]
+        self._sizes: List[int] = [raw.nbytes for raw in raws]
+        self.nbytes: int = sum(self._sizes)
+
+        self._segment = shared_memory.SharedMemory(
+            create=True, size=max(self.nbytes, 1)
+        )
+        self.name: str = self._segment.name
+        _created.add(self.name)
+
+        offset = 0
+        for raw, size in zip(raws, self._sizes):
+            self._segment.buf[offset : offset + size] = raw
+            offset += size
+
+    def __getstate__(self):
+        return {
+            "_payload": self._payload,
+            "_sizes": self._sizes,
+            "nbytes": self.nbytes,
+            "_segment": None,
+            "name": self.name,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self):
+        """Load the object, with its arrays built on top of the shared segment
+
+
+        Returns
+        -------
+        object
+            Copy of the shared object
+        """
+        buffer = _attach(self.name).buf
+
+        views = []
+        offset = 0
+        for size in self._sizes:
+            views.append(buffer[offset : offset + size])
+            offset += size
+
+        return pickle.loads(self._payload, buffers=views)
+
+    def close(self) -> None:
+        """Free the shared segment, only in the process that created it
+
+        The mapping made by load() in this process is closed too, unless arrays
+        loaded from it are still referenced, in which case it is kept for them.
+        Other processes that loaded the object keep their mapping until they exit.
+        """
+        if self._segment is None:
+            return
+
+        self._segment.close()
+        self._segment.unlink()
+        self._segment = None
+
+        _created.discard(self.name)
+
+        attached = _attached.pop(self.name, None)
+        if attached is not None:
+            try:
+                attached.close()
+            except BufferError:
+                _attached[self.name] = attached
@@ -5,6 +5,7 @@ import numpy as np
 import pandas as pd
 
 from ..abstracts import timeseries
+from . import buffers
 
 
 class SecurityTimeSeries(timeseries.AbstractSecurityTimeSeries):
@@ -46,6 +47,19 @@ class SecurityTimeSeries(timeseries.AbstractSecurityTimeSeries):
         self.prices = prices
         self.tot_ret_idx = tot_ret_idx
 
+    def __reduce_ex__(self, protocol: int):
+        # From protocol 5, arrays are sent as out-of-band buffers, see buffers
+        if protocol < 5:
+            return super().__reduce_ex__(protocol)
+
+        arrays = (self.dates, self.prices, self.tot_ret_idx)
+
+        return buffers.rebuild, (
+            type(self),
+            tuple(buffers.pack_array(array) for array in arrays),
+            (),
+        )
+
     def __make_self(
         self, dates: np.ndarray, prices: np.ndarray, tot_ret_idx: np.ndarray
     ):
@@ -0,0 +1,119 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+
+
+from portana.analyzer.risk import RiskAnalyzer
+from portana.portfolio.portfolio import Portfolio
+from portana.timeseries.securitytimeseries import SecurityTimeSeries
+from portana.data.simulated import Equity
+
+
+@pytest.fixture
+def universe_fixture():
+    dates = np.array("2020-01-01", dtype=np.datetime64)
+    dates = dates + np.arange(101)
+
+    rets = np.random.default_rng(412843).normal(0, 0.02, (100, 4))
+    levels = np.ones((101, 4)) * 100
+    levels[1:] = 100 * np.cumprod(rets + 1, axis=0)
+
+    securities = []
+    for idx in range(4):
+        timeseries = SecurityTimeSeries(dates, levels[:, idx], levels[:, idx])
+        securities.append(Equity(str(idx), timeseries, {}, {}))
+
+    return securities
+
+
+@pytest.fixture
+def risk_fixture(universe_fixture):
+    risk = RiskAnalyzer()
+    risk.set_comp_index(universe_fixture[0])
+    for security in universe_fixture:
+        risk.add_security(security)
+
+    weights = np.array([[1, 0, 0, 0], [0.25, 0.25, 0.25, 0.25], [0, 0.5, 0, 0.5]])
+    risk.add_weights(weights, ["A", "B", "C"])
+
+    return risk, weights
+
+
+def test_get_returns(universe_fixture, risk_fixture):
+    risk, weights = risk_fixture
+    levels = np.stack(
+        [security.get_timeseries().get_data()[0] for security in universe_fixture], 1
+    )
+    rets = np.diff(levels, axis=0) / levels[:-1]
+
+    returns = risk.get_returns("px")
+
+    assert returns.col_names == ["A", "B", "C"]
+    npt.assert_allclose(returns.get_data(), rets @ weights.T)
+
+
+def test_get_vars(risk_fixture):
+    risk, _ = risk_fixture
+    returns = np.sort(risk.get_returns("px").get_data(), axis=0)
+
+    npt.assert_allclose(risk.get_vars("px", 0.95).get_data(), returns[[5]])
+    npt.assert_allclose(
+        risk.get_cvars("px", 0.95).get_data(), returns[:6].mean(axis=0, keepdims=True)
+    )
+    assert risk.get_vars("px").get_dates()[0] == np.datetime64("2020-04-10")
+
+
+def test_get_stress_returns(universe_fixture, risk_fixture):
+    risk, weights = risk_fixture
+    index, _ = universe_fixture[0].get_timeseries().get_data()
+
+    start, end = risk.get_worst_window("px", 20)
+    window = index[20:] / index[:-20]
+    start_idx = np.argmin(window)
+
+    assert start == np.datetime64("2020-01-01") + start_idx
+    assert end == start + 20
+
+    levels = np.stack(
+        [security.get_timeseries().get_data()[0] for security in universe_fixture], 1
+    )
+    shocks = levels[start_idx + 20] / levels[start_idx] - 1
+
+    stress = risk.get_stress_returns("px", length=20)
+
+    npt.assert_allclose(stress.get_data()[0], weights @ shocks)
+    npt.assert_allclose(stress.get_data()[0, 0], window.min() - 1)
+
+
+def test_add_portfolio(universe_fixture):
+    portfolio = Portfolio()
+    portfolio.add_security(universe_fixture[1], 0.5)
+    portfolio.add_security(universe_fixture[2], 0.5)
+    portfolio.name = "P"
+
+    risk = RiskAnalyzer()
+    risk.add_security(universe_fixture[0])
+    risk.add_portfolio(portfolio)
+
+    levels = np.stack(
+        [security.get_timeseries().get_data()[0] for security in universe_fixture], 1
+    )
+    rets = np.diff(levels, axis=0) / levels[:-1]
+
+    assert risk.portfolio_names == ["P"]
+    assert [security.get_isin() for security in risk.securities] == ["0", "1", "2"]
+    npt.assert_allclose(
+        risk.get_returns("px").get_data()[:, 0], 0.5 * rets[:, 1] + 0.5 * rets[:, 2]
+    )
+
+
+def test_add_weights_shape(risk_fixture):
+    risk, weights = risk_fixture
+
+    with pytest.raises(ValueError):
+        risk.add_weights(weights[:, :3], ["A", "B", "C"])
+
+    with pytest.raises(ValueError):
+        risk.add_weights(weights, ["A", "B"])
+
+    assert risk.portfolio_names == ["A", "B", "C"]
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+
+import pytest
+import numpy as np
+import numpy.testing as npt
+
+from portana.analyzer.equity_analyzer import EquityAnalyzer
+from portana.portfolio.portfolio import Portfolio
+from portana.data.async_connection import (
+    ThreadedConnection,
+    AsyncFetcher,
+    resolve_universe,
+)
+from portana.data.simulated import SimConnection, SimEquityAssetType
+
+DATE_RANGE = ("2020-01-01", "2020-06-30")
+
+
+@pytest.fixture
+def connection_fixture():
+    connection = SimConnection()
+    connection.set_asset_type(SimEquityAssetType())
+
+    return connection
+
+
+def test_fetch(connection_fixture, monkeypatch):
+    isins = [str(isin) for isin in range(15000, 15040)]
+    connection_fixture.set_latency(0.05)
+
+    # Count batches in flight at the same time
+    lock = threading.Lock()
+    calls = {"running": 0, "peak": 0}
+    get_securities = connection_fixture.get_securities
+
+    def counted_get_securities(*args):
+        with lock:
+            calls["running"] += 1
+            calls["peak"] = max(calls["peak"], calls["running"])
+        try:
+            return get_securities(*args)
+        finally:
+            with lock:
+                calls["running"] -= 1
+
+    monkeypatch.setattr(connection_fixture, "get_securities", counted_get_securities)
+
+    fetcher = AsyncFetcher(
+        ThreadedConnection(connection_fixture), max_concurrency=8, batch_size=5
+    )
+    panel = asyncio.run(fetcher.fetch(isins, DATE_RANGE))
+
+    # 8 batches fetched concurrently, instead of 8 sequential round trips
+    assert 1 < calls["peak"] <= 8
+
+    monkeypatch.undo()
+    connection_fixture.set_latency(0)
+    expected = connection_fixture.get_securities(isins, DATE_RANGE)
+
+    assert panel.get_isins() == isins
+    npt.assert_array_equal(panel.get_dates(), expected.get_dates())
+    npt.assert_array_equal(panel.get_data(), expected.get_data())
+    assert panel.get_exposures().equals(expected.get_exposures())
+
+
+def test_fetch_empty(connection_fixture):
+    fetcher = AsyncFetcher(ThreadedConnection(connection_fixture))
+    panel = asyncio.run(fetcher.fetch([], DATE_RANGE))
+
+    assert len(panel) == 0
+
+
+def test_get_security(connection_fixture):
+    connection = ThreadedConnection(connection_fixture)
+    security = asyncio.run(connection.get_security("15003", DATE_RANGE))
+    expected = connection_fixture.get_security("15003", DATE_RANGE)
+
+    npt.assert_array_equal(
+        security.get_timeseries().get_data(), expected.get_timeseries().get_data()
+    )
+
+
+def test_resolve_universe_in_running_loop(connection_fixture):
+    isins = [str(isin) for isin in range(15000, 15004)]
+    fetcher = AsyncFetcher(ThreadedConnection(connection_fixture), batch_size=2)
+
+    async def main():
+        return resolve_universe(fetcher.fetch(isins, DATE_RANGE))
+
+    securities = asyncio.run(main())
+
+    assert [security.get_isin() for security in securities] == isins
+
+
+def test_add_securities_awaitable(connection_fixture):
+    isins = [str(isin) for isin in range(15000, 15006)]
+    fetcher = AsyncFetcher(ThreadedConnection(connection_fixture), batch_size=4)
+    securities = [connection_fixture.get_security(isin, DATE_RANGE) for isin in isins]
+
+    analyzer = EquityAnalyzer()
+    analyzer.add_securities(fetcher.fetch(isins, DATE_RANGE))
+    expected_analyzer = EquityAnalyzer()
+    expected_analyzer.add_securities(securities)
+
+    vols, _ = analyzer.get_volatilities("tr", 252)
+    expected_vols, _ = expected_analyzer.get_volatilities("tr", 252)
+    npt.assert_allclose(vols.get_data(), expected_vols.get_data())
+
+    weights = [1 / len(isins)] * len(isins)
+
+    portfolio = Portfolio()
+    portfolio.add_securities(fetcher.fetch(isins, DATE_RANGE), weights)
+    expected_portfolio = Portfolio()
+    for security, weight in zip(securities, weights):
+        expected_portfolio.add_security(security, weight)
+
+    npt.assert_allclose(
+        portfolio.get_weights_timeseries().get_data(),
+        expected_portfolio.get_weights_timeseries().get_data(),
+    )
+    assert np.isclose(
+        portfolio.get_weights_timeseries().get_data().sum(axis=1), 1
+    ).all()
+
+    with pytest.raises(ValueError):
+        Portfolio().add_securities(securities, weights[:2])
@@ -0,0 +1,82 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+
+from portana.data.connection_cache import CachedConnection
+from portana.data.simulated import SimConnection, SimEquityAssetType
+
+
+@pytest.fixture
+def connection_fixture():
+    connection = SimConnection()
+    connection.set_asset_type(SimEquityAssetType())
+
+    return connection
+
+
+def assert_same_security(result, expected):
+    assert type(result) is type(expected)
+    assert result.get_isin() == expected.get_isin()
+    assert result.get_description() == expected.get_description()
+    assert result.get_exposures() == expected.get_exposures()
+    npt.assert_array_equal(
+        result.get_timeseries().get_dates(), expected.get_timeseries().get_dates()
+    )
+    npt.assert_array_equal(
+        result.get_timeseries().get_data(), expected.get_timeseries().get_data()
+    )
+
+
+def test_cached_sub_range(connection_fixture):
+    cached = CachedConnection(connection_fixture)
+    full = cached.get_security("15000", ("2019-01-01", "2020-12-31"))
+    window = cached.get_security("15000", ("2019-03-01", "2019-03-31"))
+
+    assert_same_security(
+        window, connection_fixture.get_security("15000", ("2019-03-01", "2019-03-31"))
+    )
+    prices, _ = window.get_timeseries().get_data()
+    assert np.shares_memory(prices, full.get_timeseries().get_data()[0])
+    assert not prices.flags.writeable
+    assert cached.get_stats()["hits"] == 1
+    assert cached.get_stats()["misses"] == 1
+
+
+def test_cached_merge(connection_fixture):
+    cached = CachedConnection(connection_fixture)
+    cached.get_security("15000", ("2019-03-01", "2019-06-30"))
+    cached.get_security("15000", ("2019-01-01", "2019-04-30"))
+    cached.get_security("15000", ("2019-09-01", "2019-12-31"))
+
+    result = cached.get_security("15000", ("2019-01-01", "2019-12-31"))
+
+    assert_same_security(
+        result, connection_fixture.get_security("15000", ("2019-01-01", "2019-12-31"))
+    )
+    assert cached.get_stats() == {
+        "hits": 1,
+        "misses": 3,
+        "evictions": 0,
+        "entries": 1,
+        "bytes": 365 * 24,
+    }
+
+
+def test_cached_eviction(connection_fixture):
+    cached = CachedConnection(connection_fixture, max_bytes=2 * 31 * 24)
+    for isin in ["15000", "15001", "15000", "15002"]:
+        cached.get_security(isin, ("2020-01-01", "2020-01-31"))
+
+    assert cached.get_stats()["evictions"] == 1
+    assert cached.get_stats()["hits"] == 1
+    assert len(cached) == 2
+
+    cached.get_security("15000", ("2020-01-01", "2020-01-31"))
+    cached.get_security("15001", ("2020-01-01", "2020-01-31"))
+
+    assert cached.get_stats()["hits"] == 2
+
+    cached.invalidate()
+
+    assert len(cached) == 0
+    assert cached.get_stats()["bytes"] == 0
@@ -0,0 +1,304 @@
+import os
+
+import pytest
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+
+
+from portana.data import database, snapshot
+from portana.data.index import Bitmap
+from portana.data.predicates import Eq, In, Range
+from portana.data.query_cache import QueryCache
+from portana.data.simulated import SimQuery
+
+
+@pytest.fixture
+def equity_df_fixture():
+    path = os.path.join(database.DB_DIR, "equities.csv")
+    return pd.read_csv(path, index_col=0)
+
+
+def test_get_table_cached():
+    table = database.get_table("equity")
+
+    assert database.get_table("Equity") is table
+    assert database.reload_table("equity") is not table
+    assert database.get_table("equity") is not table
+
+
+def test_table_columns(equity_df_fixture):
+    table = database.get_table("equity")
+
+    assert table.fields == list(equity_df_fixture.columns)
+    assert list(table.categories["sector"]) == [
+        "Financials",
+        "Industrials",
+        "Technology",
+    ]
+    npt.assert_equal(table.get_column("sector"), equity_df_fixture["sector"])
+    npt.assert_equal(table.get_column("5y_sharpe"), equity_df_fixture["5y_sharpe"])
+
+
+def test_table_filter(equity_df_fixture):
+    table = database.get_table("equity")
+    rows = table.filter({"geography": "Canada", "sector": "Technology"})
+
+    expected = equity_df_fixture.query(
+        "geography == 'Canada' and sector == 'Technology'"
+    )
+
+    npt.assert_equal(table.isins[rows], expected.index)
+    assert len(table.filter({"sector": "Energy"})) == 0
+
+
+def test_send_query(equity_df_fixture):
+    query = SimQuery("equity", {"geography": "Canada"}, "5y_sharpe", 5, 3)
+    result = query.send_query()
+
+    expected = equity_df_fixture[equity_df_fixture["geography"] == "Canada"]
+    expected = expected.sort_values("5y_sharpe", ascending=False)[3:8]
+
+    assert list(result) == [str(isin) for isin in expected.index]
+    assert result == {
+        str(key): value for key, value in expected.to_dict("index").items()
+    }
+
+
+def test_bitmap():
+    bitmap = Bitmap.from_rows(np.array([0, 3, 64, 69]), 70)
+
+    assert bitmap.count() == 4
+    npt.assert_equal(bitmap.to_rows(), [0, 3, 64, 69])
+    assert (~bitmap).count() == 66
+    npt.assert_equal((~Bitmap.empty(70)).to_rows(), np.arange(70))
+    npt.assert_equal(
+        (bitmap & Bitmap.from_rows(np.array([3, 4, 69]), 70)).to_rows(), [3, 69]
+    )
+    npt.assert_equal(
+        (bitmap | Bitmap.from_rows(np.array([4]), 70)).to_rows(), [0, 3, 4, 64, 69]
+    )
+
+
+@pytest.mark.parametrize(
+    "predicate, query_str",
+    [
+        (
+            In("sector", ["Technology", "Financials"]),
+            "sector in ['Technology', 'Financials']",
+        ),
+        (Range("5y_sharpe", 0.5, 1.5), "`5y_sharpe` >= 0.5 and `5y_sharpe` <= 1.5"),
+        (
+            Range("5y_sharpe", low=1, include_low=False) & Eq("geography", "Canada"),
+            "`5y_sharpe` > 1 and geography == 'Canada'",
+        ),
+        (
+            Eq("sector", "Technology") | ~Eq("geography", "Canada"),
+            "sector == 'Technology' or not geography == 'Canada'",
+        ),
+        (
+            ~(
+                Eq("sector", "Financials")
+                | Range("5y_sharpe", high=0, include_high=False)
+            )
+            & In("ticker", ["W", "FP", "AB"]),
+            "not (sector == 'Financials' or `5y_sharpe` < 0) and ticker in ['W', 'FP', 'AB']",
+        ),
+    ],
+)
+def test_predicates(equity_df_fixture, predicate, query_str):
+    table = database.get_table("equity")
+    expected = equity_df_fixture.query(query_str)
+
+    assert str(predicate) == query_str
+    npt.assert_equal(table.isins[table.filter(predicate)], expected.index)
+    assert predicate.evaluate(table).count() == len(expected)
+
+
+def test_send_query_predicate(equity_df_fixture):
+    predicate = In("sector", ["Technology", "Industrials"]) & Range("5y_sharpe", low=1)
+    query = SimQuery("equity", predicate, "5y_sharpe")
+
+    expected = equity_df_fixture.query(str(predicate))
+    expected = expected.sort_values("5y_sharpe", ascending=False)
+
+    assert list(query.send_query()) == [str(isin) for isin in expected.index]
+
+
+def test_sort_rows_top():
+    table = database.get_table("equityfund")
+    rows = table.filter({"geography": "United States"})
+
+    full = table.sort_rows(rows, "fee")
+
+    for top in [1, 7, 50, len(rows) + 1]:
+        npt.assert_equal(table.sort_rows(rows, "fee", top), full[:top])
+
+
+def test_sort_rows_ties():
+    table = database.get_table("equity")
+    rows = table.filter({"sector": ["Financials", "Technology"]})
+
+    result = table.sort_rows(rows, "sector")
+    sectors = table.get_column("sector")[result]
+
+    # Descending values, ties in their original order
+    assert sectors[0] == "Technology" and sectors[-1] == "Financials"
+    for sector in ("Technology", "Financials"):
+        npt.assert_equal(
+            result[sectors == sector], rows[table.get_column("sector")[rows] == sector]
+        )
+    npt.assert_equal(table.sort_rows(rows, "sector", 5), result[:5])
+
+
+def test_fetch_cursor():
+    query = SimQuery("equity", {"geography": "Canada"}, "5y_sharpe", 25, 10)
+    result = query.send_query()
+
+    cursor = query.fetch_cursor(batch_size=10)
+    first = cursor.fetchone()
+    rest = list(cursor)
+
+    assert len(cursor) == 25
+    assert cursor.description == ["isin"] + database.get_table("equity").fields
+    assert [first] + rest == [
+        (int(isin),) + tuple(record.values()) for isin, record in result.items()
+    ]
+    assert cursor.fetchall() == []
+
+
+def test_fetch_columns():
+    query = SimQuery("equity", {"sector": "Technology"}, "5y_sharpe", 5)
+    result = query.send_query()
+    columns = query.fetch_columns()
+
+    npt.assert_equal(columns["isin"].astype(str), list(result))
+    npt.assert_equal(
+        columns["5y_sharpe"], [record["5y_sharpe"] for record in result.values()]
+    )
+
+
+def test_query_cache():
+    database.reload_table("equity")
+    stats = database.query_cache.get_stats()
+
+    fields = {"geography": "Canada", "sector": ["Technology", "Industrials"]}
+    first_page = SimQuery("equity", fields, "5y_sharpe", 10, 0).send_query()
+
+    fields = {"sector": ("Industrials", "Technology"), "geography": "Canada"}
+    second_page = SimQuery("equity", fields, "5y_sharpe", 10, 10).send_query()
+
+    uncached = SimQuery("equity", fields, "5y_sharpe", 20, 0, use_cache=False)
+
+    assert {**first_page, **second_page} == uncached.send_query()
+    assert database.query_cache.get_stats()["misses"] == stats["misses"] + 1
+    assert database.query_cache.get_stats()["hits"] == stats["hits"] + 1
+
+    # A deeper page sorts a longer prefix, a full screen sorts every row
+    deep_page = SimQuery("equity", fields, "5y_sharpe", 10, 40).send_query()
+    uncached = SimQuery("equity", fields, "5y_sharpe", 10, 40, use_cache=False)
+    assert deep_page == uncached.send_query()
+
+    full = SimQuery("equity", fields, "5y_sharpe").send_query()
+    assert list(full)[40:50] == list(deep_page)
+    assert database.query_cache.get_stats()["misses"] == stats["misses"] + 3
+
+    SimQuery("equity", fields, "5y_sharpe", 10, 1000).send_query()
+    assert database.query_cache.get_stats()["hits"] == stats["hits"] + 2
+
+    database.reload_table("equity")
+    SimQuery("equity", fields, "5y_sharpe", 10, 0).send_query()
+
+    assert database.query_cache.get_stats()["misses"] == stats["misses"] + 4
+
+
+def test_query_cache_eviction():
+    cache = QueryCache(max_entries=3, max_bytes=1000)
+
+    cache.put("a", np.arange(50))
+    cache.put("b", np.arange(50))
+    cache.get("a")
+    cache.put("c", np.arange(50))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get_stats() == {
+        "hits": 2,
+        "misses": 1,
+        "evictions": 1,
+        "entries": 2,
+        "bytes": 800,
+    }
+
+    cache.put("d", np.arange(10))
+    cache.put("e", np.arange(10))
+
+    assert len(cache) == 3
+    assert cache.get("c") is None
+
+    with pytest.raises(ValueError):
+        cache.get("a")[0] = 1
+
+    # A prefix only serves lookups of at most as many rows
+    cache.put("g", np.arange(10), complete=False)
+    assert cache.get("g", 10) is not None
+    assert cache.get("g", 11) is None
+    assert cache.get("g") is None
+
+    # Results too large to cache are left writeable
+    rows = np.arange(200)
+    assert cache.put("f", rows) is rows and rows.flags.writeable
+    assert cache.get("f") is None
+
+
+@pytest.mark.parametrize("asset_type", ["equity", "equityfund"])
+def test_snapshot(asset_type):
+    table = database.load_table(asset_type)
+    expected = database.load_csv(asset_type)
+
+    assert isinstance(table.get_column("5y_sharpe"), np.memmap)
+    assert table.fields == expected.fields
+    npt.assert_equal(table.isins, expected.isins)
+    for field in table.fields:
+        npt.assert_equal(table.get_column(field), expected.get_column(field))
+        npt.assert_equal(
+            table.sort_rows(np.arange(len(table)), field),
+            expected.sort_rows(np.arange(len(expected)), field),
+        )
+
+    rows = table.filter(Range("5y_sharpe", low=0) & ~Eq("geography", "Canada"))
+    assert table.get_records(rows) == expected.get_records(rows)
+
+
+def test_snapshot_stale(tmp_path, monkeypatch):
+    source = tmp_path / "equities.csv"
+    source.write_text(
+        "isin,name,sector,5y_sharpe\n1,Security 1,Financials,0.5\n2,Security 2,,0.1\n"
+    )
+    table = database.SimTable.from_df(pd.read_csv(source, index_col=0))
+
+    snapshot.write_snapshot(table, tmp_path / "snapshot", source)
+    loaded = database.SimTable(**snapshot.read_snapshot(tmp_path / "snapshot"))
+
+    assert snapshot.is_fresh(tmp_path / "snapshot", source)
+    assert snapshot.read_manifest(tmp_path / "snapshot")["source_size"] == len(
+        source.read_bytes()
+    )
+    npt.assert_equal(loaded.codes["sector"], [0, -1])
+    assert loaded.get_records(loaded.filter({"sector": "Financials"})) == {
+        "1": {"name": "Security 1", "sector": "Financials", "5y_sharpe": 0.5}
+    }
+
+    # Same size and time, the source is not read
+    monkeypatch.setattr(snapshot, "hash_file", None)
+    assert snapshot.is_fresh(tmp_path / "snapshot", source)
+    monkeypatch.undo()
+
+    # Touched but unchanged source, the hash still matches
+    os.utime(source, ns=(0, 0))
+    assert snapshot.is_fresh(tmp_path / "snapshot", source)
+
+    source.write_text("isin,name,sector,5y_sharpe\n1,Security 1,Financials,0.5\n")
+
+    assert not snapshot.is_fresh(tmp_path / "snapshot", source)
+    assert not snapshot.is_fresh(tmp_path / "missing", source)
@@ -0,0 +1,87 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+
+from portana.data.factor_model import FactorModel
+from portana.data.simulated import SimEquityAssetType
+
+
+@pytest.fixture
+def model_fixture():
+    model = FactorModel(SimEquityAssetType())
+    model.set_market_weight(0.3)
+    model.set_group_weight(0.4)
+    model.set_seed(412843)
+
+    return model
+
+
+def test_loadings(model_fixture):
+    isins = [str(isin) for isin in range(15000, 15010)]
+    model_fixture.simulate(isins, ("2020-01-01", "2020-01-31"))
+
+    assert model_fixture.factor_names[0] == "market"
+    assert "sector=Technology" in model_fixture.factor_names
+    assert "geography=Canada" in model_fixture.factor_names
+
+    exposures = SimEquityAssetType().get_exposures(15000)
+    loadings = dict(zip(model_fixture.factor_names, model_fixture.loadings[0]))
+    assert loadings["sector=" + exposures["sector"]] == pytest.approx(np.sqrt(0.2))
+    assert loadings["geography=" + exposures["geography"]] == pytest.approx(
+        np.sqrt(0.2)
+    )
+    npt.assert_allclose((model_fixture.loadings**2).sum(axis=1), 0.7)
+
+
+def test_simulate(model_fixture):
+    asset_type = SimEquityAssetType()
+    isins = list(range(15000, 15200))
+    prices, tot_ret_idx = model_fixture.simulate(isins, ("2000-01-01", "2009-12-31"))
+
+    assert prices.get_data().shape == (3653, 200)
+    npt.assert_array_less(0, prices.get_data())
+
+    drift, vol, _, _ = asset_type.generator.generate_parameters(isins)
+    returns = np.diff(np.log(prices.get_data()), axis=0)
+    npt.assert_allclose(returns.std(axis=0), vol, rtol=0.1)
+
+    z = (returns - drift) / vol
+    corr = np.corrcoef(z.transpose())
+    sectors = [asset_type.get_exposures(isin)["sector"] for isin in isins]
+    geographies = [asset_type.get_exposures(isin)["geography"] for isin in isins]
+    same_sector = np.equal.outer(sectors, sectors)
+    same_geography = np.equal.outer(geographies, geographies)
+    off_diagonal = ~np.eye(len(isins), dtype=bool)
+
+    # Expected correlations are market_weight plus group_weight / 2 per shared exposure
+    both = same_sector & same_geography & off_diagonal
+    neither = ~same_sector & ~same_geography
+    assert corr[both].mean() == pytest.approx(0.7, abs=0.03)
+    assert corr[neither].mean() == pytest.approx(0.3, abs=0.03)
+
+
+def test_windows(model_fixture):
+    isins = list(range(15000, 15020))
+    model_fixture.set_chunk_size(7)
+    prices, tot_ret_idx = model_fixture.simulate(isins, ("2019-06-01", "2020-12-31"))
+    window = model_fixture.simulate(isins[5:], ("2020-01-01", "2021-06-30"))
+
+    # Both windows are the same paths on their common dates
+    npt.assert_allclose(prices.get_data()[214:, 5:], window[0].get_data()[:366])
+    npt.assert_allclose(tot_ret_idx.get_data()[214:, 5:], window[1].get_data()[:366])
+
+    # Without factors, securities are those of SimConnection
+    model_fixture.set_market_weight(0)
+    model_fixture.set_group_weight(0)
+    prices, tot_ret_idx = model_fixture.simulate(isins, ("2019-06-01", "2020-12-31"))
+    expected = SimEquityAssetType().get_panel(("2019-06-01", "2020-12-31"), isins)
+
+    npt.assert_allclose(prices.get_data(), expected.get_data()[0])
+    npt.assert_allclose(tot_ret_idx.get_data(), expected.get_data()[1])
+
+
+def test_invalid_weights(model_fixture):
+    model_fixture.set_group_weight(0.8)
+
+    with pytest.raises(ValueError):
+        model_fixture.simulate([15000], ("2020-01-01", "2020-01-31"))
@@ -0,0 +1,90 @@
+import json
+import os
+
+import pytest
+
+from portana.data import factsheet
+from portana.data.factsheet import FactsheetParser, read_fields
+from portana.data.snapshot import hash_file
+
+TABLES = [
+    [["Fund Name", "Portana Global Equity"], ["Management Fee", "0.75%"]],
+    [["Region", "Weight"], ["Canada", "45.2%"], ["United States", "54.8%"]],
+    [["Sector Allocation", ""], ["Technology", "30"], ["Financials", "70"]],
+    [["Top Holdings", "%"], ["Apple Inc.", "5.5%"], ["Total", "n/a"]],
+]
+
+
+def test_read_fields():
+    description, exposures = read_fields(TABLES)
+
+    assert description == {
+        "name": "Portana Global Equity",
+        "fee": pytest.approx(0.0075),
+        "holdings": {"Apple Inc.": pytest.approx(0.055)},
+    }
+    assert exposures == {
+        "geography": {
+            "Canada": pytest.approx(0.452),
+            "United States": pytest.approx(0.548),
+        },
+        "sector": {"Technology": pytest.approx(0.3), "Financials": pytest.approx(0.7)},
+    }
+
+
+def test_cached(tmp_path):
+    for name in ("a.pdf", "b.pdf"):
+        with open(tmp_path / name, "wb") as file:
+            file.write(b"%PDF-1.4 same content")
+
+    parser = FactsheetParser(tmp_path / "cache")
+    digest = hash_file(tmp_path / "a.pdf")
+    with open(tmp_path / "cache" / f"{digest}.lattice.json", "w") as file:
+        json.dump(TABLES, file)
+
+    fields = parser.get_fields([tmp_path / "a.pdf", tmp_path / "b.pdf"])
+
+    assert parser.parsed == 0
+    assert fields[0] == fields[1] == read_fields(TABLES)
+
+
+def fake_read_tables(path, flavor):
+    if path.endswith("bad.pdf"):
+        raise ValueError("corrupt")
+
+    return TABLES
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_parse_errors(tmp_path, monkeypatch, max_workers):
+    monkeypatch.setattr(factsheet, "_read_tables", fake_read_tables)
+
+    for name in ("good.pdf", "bad.pdf"):
+        with open(tmp_path / name, "wb") as file:
+            file.write(f"%PDF-1.4 {name}".encode())
+
+    parser = FactsheetParser(tmp_path / "cache")
+    parser.set_max_workers(max_workers)
+    fields = parser.get_fields([tmp_path / "good.pdf", tmp_path / "bad.pdf"])
+
+    # The failing PDF is reported, without losing the other one
+    assert fields[1] is None
+    assert list(parser.errors) == [str(tmp_path / "bad.pdf")]
+
+    assert fields[0] == read_fields(TABLES)
+    assert os.listdir(tmp_path / "cache") == [
+        f"{hash_file(tmp_path / 'good.pdf')}.lattice.json"
+    ]
+
+
+def test_parse(tmp_path):
+    pytest.importorskip("camelot")
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "Output.pdf")
+
+    parser = FactsheetParser(tmp_path / "cache")
+    parser.set_max_workers(1)
+    tables = parser.parse([path])
+    parsed = parser.parsed
+
+    assert parser.parse([path]) == tables
+    assert parser.parsed == parsed
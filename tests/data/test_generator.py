@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+import random
+
+import pytest
+import numpy as np
+import numpy.testing as npt
+
+from portana.data.generator import Generator
+from portana.data.simulated import SimConnection, SimEquityAssetType
+
+
+@pytest.fixture
+def generator_fixture():
+    generator = Generator()
+    generator.set_max_drift(0.001)
+    generator.set_max_vol(0.05)
+    generator.set_max_distribution(0.005)
+    generator.set_initial_price_range((1, 1000))
+    generator.set_date_range(("2020-01-01", "2020-03-31"))
+
+    return generator
+
+
+def test_set_seed(generator_fixture):
+    generator_fixture.set_seed(15000)
+
+    random.seed(a=15000)
+    assert generator_fixture._drift == random.uniform(0, 0.001)
+    random.seed(a=15000)
+    assert generator_fixture._initial_price == random.uniform(1, 1000)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 256])
+def test_generate_batch(generator_fixture, chunk_size):
+    seeds = np.arange(15000, 15020)
+    prices, tot_ret_idx = generator_fixture.generate_batch(seeds, chunk_size)
+
+    assert prices.shape == tot_ret_idx.shape == (91, 20)
+
+    # Same paths as SimConnection, i.e. generate_window of each seed
+    connection = SimConnection()
+    connection.set_asset_type(SimEquityAssetType())
+
+    for col, seed in enumerate(seeds):
+        security = connection.get_security(str(seed), generator_fixture.date_range)
+        expected_prices, expected_tot_ret_idx = security.get_timeseries().get_data()
+
+        npt.assert_array_equal(prices[:, col], expected_prices)
+        npt.assert_array_equal(tot_ret_idx[:, col], expected_tot_ret_idx)
+
+    npt.assert_array_equal(generator_fixture.generate_prices_batch(seeds), prices)
+    npt.assert_array_equal(
+        generator_fixture.generate_tot_ret_idx_batch(seeds[:0]), np.empty((91, 0))
+    )
+
+
+def test_global_random_untouched(generator_fixture):
+    random.seed(a=1)
+    expected = random.random()
+
+    random.seed(a=1)
+    seeded = generator_fixture.for_seed(15000)
+    seeded.generate_ticker()
+    seeded.generate_fee()
+    seeded.generate_sector()
+
+    assert random.random() == expected
+    assert generator_fixture.seed is None
+
+
+def test_concurrent_get_security():
+    connection = SimConnection()
+    connection.set_asset_type(SimEquityAssetType())
+    date_range = ("2020-01-01", "2020-06-30")
+    isins = [str(isin) for isin in range(15000, 15040)]
+
+    expected = [connection.get_security(isin, date_range) for isin in isins]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(lambda isin: connection.get_security(isin, date_range), isins)
+        )
+
+    for result, security in zip(results, expected):
+        assert result.get_description() == security.get_description()
+        assert result.get_exposures() == security.get_exposures()
+        npt.assert_array_equal(
+            result.get_timeseries().get_data(), security.get_timeseries().get_data()
+        )
+
+
+@pytest.mark.parametrize(
+    "date_range",
+    [
+        ("2019-01-01", "2019-12-31"),
+        ("1990-02-01", "1990-02-01"),
+        ("1999-12-01", "2000-01-31"),
+    ],
+)
+def test_generate_window(generator_fixture, date_range):
+    generator = generator_fixture.for_seed(15000)
+    generator.set_date_range(("1990-01-01", "2020-12-31"))
+    dates = generator.generate_dates()
+    prices, tot_ret_idx = generator.generate_window()
+
+    generator.set_date_range(date_range)
+    window = np.isin(dates, generator.generate_dates())
+    window_prices, window_tot_ret_idx = generator.generate_window()
+
+    npt.assert_array_equal(window_prices, prices[window])
+    npt.assert_array_equal(window_tot_ret_idx, tot_ret_idx[window])
+
+
+def test_generate_window_returns(generator_fixture):
+    generator = generator_fixture.for_seed(15000)
+    generator.set_date_range(("1980-01-01", "2020-12-31"))
+    prices, tot_ret_idx = generator.generate_window()
+
+    returns = np.diff(np.log(prices))
+    assert returns.mean() == pytest.approx(generator._drift, abs=5e-4)
+    assert returns.std() == pytest.approx(generator._vol, rel=0.05)
+    npt.assert_allclose(
+        np.diff(np.log(tot_ret_idx)) - returns, generator._distribution, atol=1e-9
+    )
@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+
+from portana.data.ingest import CSVIngester, RaggedStore
+from portana.data.simulated import SimConnection, SimEquityAssetType
+
+
+def write_csv(path, dates, prices, tot_ret_idx):
+    with open(path, "w") as file:
+        file.write("date,price,tot_ret_idx\n")
+        for row in zip(dates.astype(str), prices.tolist(), tot_ret_idx.tolist()):
+            file.write("%s,%r,%r\n" % row)
+
+
+@pytest.fixture
+def files_fixture(tmp_path):
+    connection = SimConnection()
+    connection.set_asset_type(SimEquityAssetType())
+
+    securities = []
+    for n, isin in enumerate(range(15000, 15011)):
+        security = connection.get_security(
+            str(isin), (f"{2010 + n}-03-01", "2020-12-31")
+        )
+        timeseries = security.get_timeseries()
+        write_csv(
+            tmp_path / f"{isin}.csv", timeseries.get_dates(), *timeseries.get_data()
+        )
+        securities.append(security)
+
+    return tmp_path, securities
+
+
+@pytest.mark.parametrize("chunk_size, max_workers", [(4, 1), (3, 2)])
+def test_ingest(files_fixture, chunk_size, max_workers):
+    directory, securities = files_fixture
+    paths = sorted(directory.glob("*.csv"))
+
+    ingester = CSVIngester()
+    ingester.set_chunk_size(chunk_size)
+    ingester.set_max_workers(max_workers)
+    store = ingester.ingest(paths, directory / "store")
+
+    assert len(store) == 11
+    assert list(store.get_isins()) == [str(isin) for isin in range(15000, 15011)]
+
+    for security in securities:
+        timeseries = RaggedStore(directory / "store").get_timeseries(
+            security.get_isin()
+        )
+        expected = security.get_timeseries()
+
+        npt.assert_array_equal(timeseries.get_dates(), expected.get_dates())
+        npt.assert_array_equal(timeseries.get_data(), expected.get_data())
+
+
+def test_ingest_invalid(tmp_path):
+    dates = np.array(["2020-01-02", "2020-01-01"], dtype="datetime64[D]")
+    write_csv(tmp_path / "unsorted.csv", dates, np.ones(2), np.ones(2))
+
+    ingester = CSVIngester()
+    ingester.set_max_workers(1)
+
+    with pytest.raises(ValueError, match="increasing"):
+        ingester.ingest([tmp_path / "unsorted.csv"], tmp_path / "store")
+
+    # Columns of a failed ingestion are removed
+    assert not list((tmp_path / "store").glob("*.npy"))
+
+    with open(tmp_path / "header.csv", "w") as file:
+        file.write("date,close\n2020-01-01,1.0\n")
+
+    with pytest.raises(ValueError, match="header"):
+        ingester.ingest([tmp_path / "header.csv"], tmp_path / "store")
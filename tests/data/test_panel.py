@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+
+from portana.abstracts.data import AbstractConnection
+from portana.data.panel import SecurityPanel
+from portana.data.security import EquityFund
+from portana.data.simulated import SimConnection, SimEquityFundAssetType
+
+
+@pytest.fixture
+def connection_fixture():
+    connection = SimConnection()
+    connection.set_asset_type(SimEquityFundAssetType())
+
+    return connection
+
+
+def test_get_securities(connection_fixture):
+    isins = [str(isin) for isin in range(30000, 30012)]
+    date_range = ("2020-01-01", "2020-06-30")
+
+    panel = connection_fixture.get_securities(isins, date_range)
+    expected = AbstractConnection.get_securities(connection_fixture, isins, date_range)
+
+    assert len(panel) == 12
+    assert panel.get_isins() == expected.get_isins() == isins
+    npt.assert_array_equal(panel.get_dates(), expected.get_dates())
+    npt.assert_array_equal(panel.get_data(), expected.get_data())
+    assert panel.get_descriptions().equals(expected.get_descriptions())
+    assert panel.get_exposures().equals(expected.get_exposures())
+    assert list(panel.get_exposures().columns) == ["geography", "strategy", "risk"]
+
+    security = panel.get_security("30003")
+    assert isinstance(security, EquityFund)
+    assert security.get_description() == {
+        "name": "Simulated Security 30003",
+        "fee": 0.003,
+    }
+    npt.assert_array_equal(
+        security.get_timeseries().get_data(),
+        connection_fixture.get_security("30003", date_range)
+        .get_timeseries()
+        .get_data(),
+    )
+
+
+def test_from_securities_aligns_dates(connection_fixture):
+    securities = [
+        connection_fixture.get_security("30000", ("2020-01-01", "2020-01-10")),
+        connection_fixture.get_security("30001", ("2020-01-06", "2020-01-15")),
+    ]
+    panel = SecurityPanel.from_securities(securities)
+    prices, _ = panel.get_data()
+
+    assert len(panel.get_dates()) == 15
+    assert np.isnan(prices[10:, 0]).all()
+    assert np.isnan(prices[:5, 1]).all()
+
+    for security in securities:
+        timeseries = panel.get_security(security.get_isin()).get_timeseries()
+        npt.assert_array_equal(
+            timeseries.get_dates(), security.get_timeseries().get_dates()
+        )
+        npt.assert_array_equal(
+            timeseries.get_data(), security.get_timeseries().get_data()
+        )
@@ -0,0 +1,86 @@
+import gc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import numpy as np
+
+from portana.data.connection_cache import CachedConnection
+from portana.data.registry import SecurityRegistry, RegisteredConnection
+from portana.data.simulated import (
+    SimConnection,
+    SimEquityAssetType,
+    SimEquityFundAssetType,
+)
+
+DATE_RANGE = ("2020-01-01", "2020-12-31")
+
+
+def make_connection(asset_type=SimEquityAssetType):
+    connection = SimConnection()
+    connection.set_asset_type(asset_type())
+
+    return connection
+
+
+def test_identity():
+    registry = SecurityRegistry()
+    first = RegisteredConnection(make_connection(), registry)
+    second = RegisteredConnection(CachedConnection(make_connection()), registry)
+    funds = RegisteredConnection(make_connection(SimEquityFundAssetType), registry)
+
+    security = first.get_security("15000", DATE_RANGE)
+    prices, _ = security.get_timeseries().get_data()
+
+    assert second.get_security("15000", DATE_RANGE) is security
+    assert (
+        first.get_security(15000, (np.datetime64("2020-01-01"), "2020-12-31"))
+        is security
+    )
+    assert first.get_security("15000", ("2020-01-01", "2020-06-30")) is not security
+    assert funds.get_security("15000", DATE_RANGE) is not security
+
+    # A subclass with the same name is another source
+    renamed = type("SimEquityAssetType", (SimEquityAssetType,), {})
+    other = RegisteredConnection(make_connection(renamed), registry)
+    assert other.get_security("15000", DATE_RANGE) is not security
+
+    # So is a generator with other settings
+    riskier = make_connection()
+    riskier._asset_type.generator.set_max_vol(0.1)
+    riskier = RegisteredConnection(riskier, registry)
+    assert riskier.get_security("15000", DATE_RANGE) is not security
+    assert make_connection().get_source() == make_connection().get_source()
+
+    with pytest.raises(ValueError):
+        prices[0] = 0
+
+    stats = registry.get_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 5
+    assert stats["bytes_saved"] == 2 * 3 * 366 * 8
+
+    # Only referenced securities are kept
+    del security, prices
+    gc.collect()
+    assert registry.get_stats()["entries"] == 0
+
+
+def test_threads():
+    registry = SecurityRegistry()
+    connections = [RegisteredConnection(make_connection(), registry) for _ in range(4)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        securities = list(
+            executor.map(
+                lambda connection: [
+                    connection.get_security(str(isin), DATE_RANGE)
+                    for isin in range(15000, 15010)
+                ],
+                connections,
+            )
+        )
+
+    for isin in range(10):
+        assert len({id(batch[isin]) for batch in securities}) == 1
+
+    assert len(registry) == 10
@@ -0,0 +1,108 @@
+import os
+import shutil
+
+import pytest
+import numpy as np
+import numpy.testing as npt
+
+from portana.analyzer.equity_analyzer import EquityAnalyzer
+from portana.data import database
+from portana.data.predicates import Range
+from portana.data.screener import UniverseScreener
+from portana.data.simulated import SimConnection, SimEquityAssetType, SimQuery
+from portana.data.universe import UniverseBuilder
+
+DATE_RANGE = ("2020-01-01", "2020-12-31")
+
+
+@pytest.fixture
+def connection_fixture():
+    connection = SimConnection()
+    connection.set_asset_type(SimEquityAssetType())
+
+    yield connection
+
+    database.reload_table("equity")
+
+
+def test_screen(connection_fixture):
+    benchmark = connection_fixture.get_security("0", ("2019-01-01", "2021-12-31"))
+
+    sharpes = database.get_table("equity").get_column("5y_sharpe").copy()
+
+    screener = UniverseScreener("equity", benchmark, DATE_RANGE)
+    screener.set_chunk_size(2000)
+    screener.set_max_workers(1)
+    columns = screener.screen()
+
+    # One year of metrics go to 1y_ columns, 5y_ columns are left as they are
+    table = database.get_table("equity")
+    assert screener.get_prefix() == "1y_"
+    assert table.fields[-5:] == [
+        "1y_return",
+        "1y_vol",
+        "1y_sharpe",
+        "1y_beta",
+        "1y_max_drawdown",
+    ]
+    assert len(columns["1y_sharpe"]) == len(table)
+    npt.assert_array_equal(table.get_column("5y_sharpe"), sharpes)
+
+    analyzer = EquityAnalyzer()
+    for isin in table.isins[[0, 2500, 4999]]:
+        analyzer.add_security(connection_fixture.get_security(str(isin), DATE_RANGE))
+    analyzer.set_comp_index(benchmark)
+
+    expected = {
+        "1y_sharpe": analyzer.get_sharpes("tr", 252, 0.0)[0],
+        "1y_vol": analyzer.get_volatilities("tr", 252)[0],
+        "1y_beta": analyzer.get_betas("tr")[0],
+        "1y_max_drawdown": analyzer.get_max_drawdowns("tr")[0],
+    }
+    for field, series in expected.items():
+        npt.assert_allclose(columns[field][[0, 2500, 4999]], series.get_data()[0])
+
+    # Screened columns are indexed, and cached results of the old table dropped
+    result = SimQuery("equity", Range("1y_beta", high=0), "1y_sharpe", 5, 0)
+    records = result.send_query()
+    sharpes = [record["1y_sharpe"] for record in records.values()]
+
+    assert all(record["1y_beta"] <= 0 for record in records.values())
+    assert sharpes == sorted(columns["1y_sharpe"][columns["1y_beta"] <= 0])[::-1][:5]
+
+
+def test_screen_store(connection_fixture, tmp_path, monkeypatch):
+    shutil.copy(os.path.join(database.DB_DIR, "equities.csv"), tmp_path)
+    monkeypatch.setattr(database, "DB_DIR", str(tmp_path))
+    monkeypatch.setattr(database, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    database.reload_table("equity")
+
+    builder = UniverseBuilder(SimEquityAssetType())
+    builder.set_max_workers(1)
+    store = builder.build(range(15000, 15100), DATE_RANGE, tmp_path / "panel")
+
+    benchmark = connection_fixture.get_security("0", DATE_RANGE)
+    screener = UniverseScreener("equity", benchmark, DATE_RANGE)
+    screener.set_prefix("2020_")
+    screener.set_max_workers(1)
+    columns = screener.screen(store, persist=True)
+
+    assert not np.isnan(columns["2020_sharpe"][:100]).any()
+    assert np.isnan(columns["2020_sharpe"][100:]).all()
+
+    # Persisted columns survive a reload from the csv file
+    table = database.reload_table("equity")
+    npt.assert_allclose(table.get_column("2020_beta"), columns["2020_beta"])
+    assert "5y_sharpe" in table.fields
+
+
+def test_with_columns():
+    table = database.get_table("equity")
+
+    with pytest.raises(ValueError, match="rows"):
+        table.with_columns({"other": np.zeros(3)})
+
+    updated = table.with_columns({"sector": np.arange(len(table), dtype=float)})
+    assert updated.fields == table.fields
+    assert updated.generation != table.generation
+    npt.assert_array_equal(updated.filter({"sector": [0, 1]}), [0, 1])
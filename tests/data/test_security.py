@@ -0,0 +1,54 @@
+import copy
+
+import pytest
+
+from portana.data.security import Equity, EquityFund, PortfolioSecurity, FieldView
+
+
+def make_fund(isin, geography):
+    # Built from separate string objects, as when parsed from a file
+    return EquityFund(
+        isin,
+        None,
+        {"name": f"Fund {isin}", "fee": 0.005},
+        {"geography": "".join(geography), "strategy": "Income", "risk": "Low"},
+    )
+
+
+def test_slots():
+    for security_class in (Equity, EquityFund, PortfolioSecurity):
+        security = security_class("1", None, {}, {})
+        assert not hasattr(security, "__dict__")
+
+        with pytest.raises(AttributeError):
+            security.other = 1
+
+
+def test_fields():
+    first = make_fund("1", ["United ", "States"])
+    second = make_fund("2", ["United ", "States"])
+
+    assert isinstance(first.get_exposures(), FieldView)
+    assert first.get_description() == {"name": "Fund 1", "fee": 0.005}
+    assert first.get_exposures() == {
+        "geography": "United States",
+        "strategy": "Income",
+        "risk": "Low",
+    }
+    assert list(first.get_exposures()) == ["geography", "strategy", "risk"]
+
+    # Shared schema and interned values
+    assert first._schema is second._schema
+    assert first.get_exposures()["geography"] is second.get_exposures()["geography"]
+
+    with pytest.raises(TypeError):
+        first.get_exposures()["risk"] = "High"
+
+    first.exposures = {"geography": "Canada"}
+    assert first.get_exposures() == {"geography": "Canada"}
+    assert first.get_description() == {"name": "Fund 1", "fee": 0.005}
+
+    copied = copy.copy(second)
+    copied.timeseries = "other"
+    assert copied.get_exposures() == second.get_exposures()
+    assert second.timeseries is None
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import numpy as np
+import numpy.testing as npt
+
+from portana.data import database
+from portana.data.predicates import Eq, In, Range
+from portana.data.security import Equity
+from portana.data.simulated import SimConnection, SimQuery, SimEquityAssetType
+from portana.data.sqlite import SQLiteDatabase, SQLiteConnection, SQLiteQuery
+
+ISINS = [str(isin) for isin in range(15000, 15020)]
+DATE_RANGE = ("2019-01-01", "2020-12-31")
+
+
+@pytest.fixture(scope="module")
+def db_fixture(tmp_path_factory):
+    connection = SimConnection()
+    connection.set_asset_type(SimEquityAssetType())
+
+    db = SQLiteDatabase(str(tmp_path_factory.mktemp("sqlite") / "portana.sqlite"))
+    db.load_table("equity", database.load_csv("equity"))
+    db.load_panel(connection.get_securities(ISINS, DATE_RANGE))
+
+    yield db, connection
+
+    db.close()
+
+
+@pytest.mark.parametrize(
+    "fields, sort_by, limit, offset",
+    [
+        ({"geography": "Canada"}, "5y_sharpe", 10, 5),
+        ({"sector": ["Technology", "Financials"]}, None, None, 0),
+        (
+            Range("5y_sharpe", low=1, include_low=False) & ~Eq("geography", "Canada"),
+            "name",
+            20,
+            0,
+        ),
+        (In("sector", ["Energy"]) | Range("5y_sharpe", high=-1), "geography", 30, 10),
+        ({}, "5y_sharpe", None, 3),
+    ],
+)
+def test_query(db_fixture, fields, sort_by, limit, offset):
+    db, _ = db_fixture
+
+    query = SQLiteQuery(db, "equity", fields, sort_by, limit, offset)
+    expected = SimQuery("equity", fields, sort_by, limit, offset, use_cache=False)
+
+    result = query.send_query()
+    expected_result = expected.send_query()
+
+    assert list(result) == list(expected_result)
+    assert result == expected_result
+    assert query.fetch_isins() == list(expected_result)
+
+    columns = query.fetch_columns()
+    expected_columns = expected.fetch_columns()
+    npt.assert_array_equal(columns["5y_sharpe"], expected_columns["5y_sharpe"])
+    npt.assert_array_equal(columns["sector"], expected_columns["sector"])
+
+
+def test_get_security(db_fixture):
+    db, connection = db_fixture
+    sqlite_connection = SQLiteConnection(db, "equity")
+    record = SimQuery("equity", Eq("name", "Simulated Security 15003")).send_query()
+
+    date_range = ("2020-03-01", "2020-06-30")
+    security = sqlite_connection.get_security("15003", date_range)
+    expected = connection.get_security("15003", date_range).get_timeseries()
+
+    assert isinstance(security, Equity)
+    assert security.get_description() == {
+        "name": record["15003"]["name"],
+        "ticker": record["15003"]["ticker"],
+    }
+    assert security.get_exposures() == {
+        "sector": record["15003"]["sector"],
+        "geography": record["15003"]["geography"],
+    }
+    npt.assert_array_equal(security.get_timeseries().get_dates(), expected.get_dates())
+    npt.assert_array_equal(security.get_timeseries().get_data(), expected.get_data())
+
+    with pytest.raises(KeyError):
+        sqlite_connection.get_security("99999999", date_range)
+
+
+def test_get_source(db_fixture):
+    db, _ = db_fixture
+    source = SQLiteConnection(db, "equity").get_source()
+
+    assert SQLiteConnection(db, "Equity").get_source() == source
+    assert SQLiteConnection(db, "equityfund").get_source() != source
+
+    # A subclass with the same name is another source
+    renamed = type("SQLiteConnection", (SQLiteConnection,), {})
+    assert renamed(db, "equity").get_source() != source
+
+
+def test_get_securities(db_fixture):
+    db, connection = db_fixture
+    sqlite_connection = SQLiteConnection(db, "equity")
+
+    isins = ISINS[5:] + ISINS[:5]
+    panel = sqlite_connection.get_securities(isins, DATE_RANGE)
+    expected = connection.get_securities(isins, DATE_RANGE)
+
+    assert panel.get_isins() == isins
+    assert panel.prices.flags.f_contiguous
+    npt.assert_array_equal(panel.get_dates(), expected.get_dates())
+    npt.assert_array_equal(panel.get_data(), expected.get_data())
+
+    security = panel.get_security("15007")
+    assert (
+        security.get_exposures()
+        == sqlite_connection.get_security("15007", DATE_RANGE).get_exposures()
+    )
+
+
+def test_threads(db_fixture):
+    db, connection = db_fixture
+    sqlite_connection = SQLiteConnection(db, "equity")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        securities = list(
+            executor.map(
+                lambda isin: sqlite_connection.get_security(isin, DATE_RANGE), ISINS
+            )
+        )
+
+    for isin, security in zip(ISINS, securities):
+        expected = connection.get_security(isin, DATE_RANGE).get_timeseries()
+        npt.assert_array_equal(
+            security.get_timeseries().get_data(), expected.get_data()
+        )
+
+    assert len(db._connections) > 1
+
+
+def test_load_prices(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "prices.sqlite"))
+    db.load_table("equity", database.load_csv("equity"))
+    connection = SQLiteConnection(db, "equity")
+
+    dates = np.arange("2019-12-01", "2020-02-01", dtype="datetime64[D]")
+    db.load_prices("15000", dates, np.arange(62.0), np.arange(62.0) + 100)
+
+    # Overlapping the year boundary, other stored dates are kept
+    db.load_prices("15000", dates[20:40], np.zeros(20), np.zeros(20))
+
+    timeseries = connection.get_security("15000", ("2019-12-15", "2020-01-31"))
+    prices, tot_ret_idx = timeseries.get_timeseries().get_data()
+    expected = np.arange(62.0)
+    expected[20:40] = 0
+
+    npt.assert_array_equal(timeseries.get_timeseries().get_dates(), dates[14:])
+    npt.assert_array_equal(prices, expected[14:])
+    assert tot_ret_idx[0] == 114
+
+    db.close()
@@ -0,0 +1,40 @@
+import pytest
+import numpy.testing as npt
+
+from portana.data.simulated import SimConnection, SimEquityFundAssetType
+from portana.data.universe import PanelStore, UniverseBuilder
+
+
+@pytest.mark.parametrize("chunk_size, max_workers", [(7, 1), (4, 2)])
+def test_build_universe(tmp_path, chunk_size, max_workers):
+    date_range = ("2019-06-01", "2020-05-31")
+    isins = [str(isin) for isin in range(30000, 30018)]
+
+    builder = UniverseBuilder(SimEquityFundAssetType())
+    builder.set_chunk_size(chunk_size)
+    builder.set_max_workers(max_workers)
+    store = builder.build(isins, date_range, tmp_path / "universe")
+
+    connection = SimConnection()
+    connection.set_asset_type(SimEquityFundAssetType())
+
+    prices, tot_ret_idx = store.get_data()
+    assert prices.shape == tot_ret_idx.shape == (366, 18)
+    assert list(store.get_isins()) == isins
+
+    for col, isin in enumerate(isins):
+        expected = connection.get_security(isin, date_range).get_timeseries()
+        npt.assert_array_equal(store.get_dates(), expected.get_dates())
+        npt.assert_array_equal(prices[:, col], expected.get_data()[0])
+        npt.assert_array_equal(tot_ret_idx[:, col], expected.get_data()[1])
+
+    timeseries = PanelStore(tmp_path / "universe").get_timeseries("30005")
+    npt.assert_array_equal(timeseries.get_data()[0], prices[:, 5])
+    npt.assert_array_equal(timeseries.get_data()[1], tot_ret_idx[:, 5])
+
+
+def test_build_empty(tmp_path):
+    builder = UniverseBuilder(SimEquityFundAssetType())
+
+    with pytest.raises(ValueError, match="empty"):
+        builder.build([], ("2019-06-01", "2020-05-31"), tmp_path / "universe")
@@ -0,0 +1,303 @@
+import pytest
+import numpy as np
+import numpy.testing as npt
+
+
+from portana.portfolio.portfolio import Portfolio
+from portana.portfolio.projection import NavProjector
+from portana.timeseries.securitytimeseries import SecurityTimeSeries
+from portana.timeseries.analyzerseries import AnalyzerSeries
+from portana.data.simulated import Equity, EquityFund
+
+
+@pytest.fixture
+def security_1_fixture():
+    dates = np.array("2020-01-01", dtype=np.datetime64)
+    dates = dates + np.arange(6)
+
+    isin = "1"
+    prices = np.array([200, 202, 204, 206, 208, 215], dtype=np.float64)
+    tot_ret_idx = np.array([200, 202, 204, 206, 208, 215], dtype=np.float64)
+    timeseries = SecurityTimeSeries(dates, prices, tot_ret_idx)
+
+    return Equity(isin, timeseries, {}, {"sector": "Technology", "geography": "Canada"})
+
+
+@pytest.fixture
+def security_2_fixture():
+    dates = np.array("2020-01-01", dtype=np.datetime64)
+    dates = dates + np.arange(6)
+
+    isin = "2"
+    prices = np.array([100, 98, 97, 99, 100, 101], dtype=np.float64)
+    tot_ret_idx = np.array([100, 98, 97, 99, 100, 101], dtype=np.float64)
+    timeseries = SecurityTimeSeries(dates, prices, tot_ret_idx)
+
+    return Equity(isin, timeseries, {}, {"sector": "Financials", "geography": "Canada"})
+
+
+@pytest.fixture
+def security_3_fixture():
+    dates = np.array("2020-01-01", dtype=np.datetime64)
+    dates = dates + np.arange(6)
+
+    isin = "3"
+    prices = np.array([50, 51, 49, 50, 52, 53], dtype=np.float64)
+    tot_ret_idx = np.array([50, 51.5, 49.5, 50.5, 52.5, 54], dtype=np.float64)
+    timeseries = SecurityTimeSeries(dates, prices, tot_ret_idx)
+
+    return Equity(
+        isin, timeseries, {}, {"sector": "Technology", "geography": "United States"}
+    )
+
+
+@pytest.fixture
+def portfolio_fixture(security_1_fixture, security_2_fixture, security_3_fixture):
+    portfolio = Portfolio()
+    portfolio.add_security(security_1_fixture, 0.5)
+    portfolio.add_security(security_2_fixture, 0.3)
+    portfolio.add_security(security_3_fixture, 0.2)
+    portfolio.set_starting_nav(100)
+
+    return portfolio
+
+
+def test_weights_schedule_every_period(portfolio_fixture):
+    dates = portfolio_fixture._date_series
+    schedule = np.repeat([[0.5, 0.3, 0.2]], len(dates), axis=0)
+    expected = portfolio_fixture.securitize().get_timeseries().get_data()
+
+    portfolio_fixture.set_weights_schedule(schedule, dates)
+    result = portfolio_fixture.securitize().get_timeseries().get_data()
+
+    npt.assert_allclose(result[0], expected[0])
+    npt.assert_allclose(result[1], expected[1])
+
+
+def test_weights_schedule_drift(portfolio_fixture):
+    schedule = np.array([[0.5, 0.5, 0.0], [0.0, 0.5, 0.5]])
+    dates = np.array(["2020-01-01", "2020-01-04"], dtype=np.datetime64)
+
+    portfolio_fixture.set_weights_schedule(schedule, dates)
+
+    prices = np.array([[200, 100], [202, 98], [204, 97]], dtype=np.float64)
+    drifted = 0.5 * prices / prices[0]
+    drifted = drifted / drifted.sum(axis=1, keepdims=True)
+
+    weights = portfolio_fixture.get_weights_timeseries().get_data()
+
+    npt.assert_allclose(weights[:3, :2], drifted)
+    npt.assert_equal(weights[:3, 2], 0)
+    npt.assert_allclose(weights[3], [0, 0.5, 0.5])
+    drifted = np.array([0, 0.5 * 100 / 99, 0.5 * 52 / 50])
+    npt.assert_allclose(weights[4], drifted / drifted.sum())
+
+    with pytest.raises(ValueError, match="one column per security"):
+        portfolio_fixture.set_weights_schedule(schedule[:, :2], dates)
+
+
+def test_weights_schedule_nav(portfolio_fixture):
+    schedule = np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+    dates = np.array(["2020-01-01", "2020-01-04"], dtype=np.datetime64)
+
+    portfolio_fixture.set_weights_schedule(schedule, dates)
+    prices, tot_ret_idx = portfolio_fixture.securitize().get_timeseries().get_data()
+
+    npt.assert_allclose(prices, [100, 101, 102, 103, 103 * 52 / 50, 103 * 53 / 50])
+    npt.assert_allclose(
+        tot_ret_idx, [100, 101, 102, 103, 103 * 52.5 / 50.5, 103 * 54 / 50.5]
+    )
+
+    # Only the held securities are tracked
+    assert portfolio_fixture._weights_timeseries.shape == (5, 2)
+    npt.assert_allclose(
+        portfolio_fixture.get_weights_timeseries().get_data()[4], [0, 0, 1]
+    )
+
+
+def test_weights_schedule_analyzer_series(portfolio_fixture):
+    dates = np.array(["2020-01-01", "2020-01-04"], dtype=np.datetime64)
+    schedule = AnalyzerSeries(dates, np.array([[0.0, 1.0], [1.0, 0.0]]), ["3", "1"])
+
+    portfolio_fixture.set_weights_schedule(schedule)
+    weights = portfolio_fixture.get_weights_timeseries().get_data()
+
+    npt.assert_equal(portfolio_fixture._schedule_cols, [2, 0])
+    npt.assert_allclose(weights[0], [1, 0, 0])
+    npt.assert_allclose(weights[3], [0, 0, 1])
+
+
+def test_get_exposures(portfolio_fixture):
+    exposures = portfolio_fixture.get_exposures()
+
+    assert exposures == {
+        "sector": {"Technology": pytest.approx(0.7), "Financials": 0.3},
+        "geography": {"Canada": pytest.approx(0.8), "United States": 0.2},
+    }
+
+
+def test_get_exposures_detailed(portfolio_fixture):
+    exposures = portfolio_fixture.get_exposures_detailed()
+
+    assert exposures == {
+        "sector": {"Technology": [("1", 0.5), ("3", 0.2)], "Financials": [("2", 0.3)]},
+        "geography": {
+            "Canada": [("1", 0.5), ("2", 0.3)],
+            "United States": [("3", 0.2)],
+        },
+    }
+
+
+def test_get_exposures_timeseries(portfolio_fixture):
+    schedule = np.array([[1.0, 0.0, 0.0], [0.0, 0.5, 0.5]])
+    dates = np.array(["2020-01-01", "2020-01-04"], dtype=np.datetime64)
+    portfolio_fixture.set_weights_schedule(schedule, dates)
+
+    exposures = portfolio_fixture.get_exposures_timeseries()
+    weights = portfolio_fixture.get_weights_timeseries().get_data()
+
+    assert exposures["sector"].col_names == ["Technology", "Financials"]
+    npt.assert_equal(
+        exposures["sector"].get_dates(), portfolio_fixture._date_series[1:]
+    )
+    npt.assert_allclose(
+        exposures["sector"].get_data(),
+        np.stack([weights[:, 0] + weights[:, 2], weights[:, 1]], axis=1),
+    )
+    npt.assert_allclose(exposures["geography"].get_data()[:3], [[1, 0]] * 3)
+
+
+def test_securitize_cached(portfolio_fixture, security_1_fixture):
+    security = portfolio_fixture.securitize()
+
+    assert portfolio_fixture.securitize() is security
+
+    portfolio_fixture.set_starting_nav(200)
+
+    assert portfolio_fixture.securitize() is not security
+
+
+def test_add_portfolio(security_1_fixture, security_2_fixture, security_3_fixture):
+    child = Portfolio()
+    child.add_security(security_1_fixture, 0.5)
+    child.add_security(security_2_fixture, 0.5)
+    child.set_starting_nav(100)
+
+    fund = EquityFund(
+        "4",
+        security_3_fixture.get_timeseries(),
+        {"fee": 0.01},
+        {"sector": "Financials", "geography": "United States"},
+    )
+
+    parent = Portfolio()
+    parent.add_portfolio(child, 0.6)
+    parent.add_security(fund, 0.4)
+    parent.set_starting_nav(100)
+
+    exposures = parent.get_exposures()
+
+    assert exposures["sector"] == {
+        "Technology": pytest.approx(0.3),
+        "Financials": pytest.approx(0.7),
+    }
+    assert exposures["geography"] == {
+        "Canada": pytest.approx(0.6),
+        "United States": pytest.approx(0.4),
+    }
+    assert parent.get_fees() == {"fees": pytest.approx(0.004)}
+    assert parent.get_exposures_detailed()["sector"]["Technology"] == [
+        ("Custom Portfolio", pytest.approx(0.3))
+    ]
+
+
+def test_add_portfolio_refresh(security_1_fixture, security_2_fixture):
+    child = Portfolio()
+    child.add_security(security_1_fixture, 1.0)
+    child.add_security(security_2_fixture, 0.0)
+    child.set_starting_nav(100)
+
+    parent = Portfolio()
+    parent.add_portfolio(child, 1.0)
+    parent.set_starting_nav(100)
+
+    security = parent.securitize()
+    prices, _ = security.get_timeseries().get_data()
+    npt.assert_allclose(prices, [100, 101, 102, 103, 104, 107.5])
+
+    assert parent.securitize() is security
+
+    schedule = np.array([[0.0, 1.0]])
+    child.set_weights_schedule(schedule, np.array(["2020-01-01"], dtype=np.datetime64))
+
+    prices, _ = parent.securitize().get_timeseries().get_data()
+    npt.assert_allclose(prices, [100, 98, 97, 99, 100, 101])
+
+    # Look-through exposures follow the schedule, not the static weights
+    assert child.get_exposures()["sector"] == {"Technology": 0.0, "Financials": 1.0}
+    assert parent.get_exposures()["sector"] == {"Technology": 0.0, "Financials": 1.0}
+    assert parent.get_exposures_detailed()["sector"]["Financials"] == [
+        ("Custom Portfolio", 1.0)
+    ]
+
+    child.name = "Child"
+    assert parent.get_weights_timeseries().col_names == ["Child"]
+
+    with pytest.raises(ValueError, match="unique names"):
+        parent.add_portfolio(Portfolio(), 0.0, "Child")
+
+    # A failed add leaves neither the security nor the child behind
+    timeseries = security_1_fixture.get_timeseries()
+    late = Portfolio()
+    late.add_security(
+        Equity(
+            "4",
+            SecurityTimeSeries(timeseries.get_dates() + 10, *timeseries.get_data()),
+            {},
+            {},
+        ),
+        1.0,
+    )
+    late.set_starting_nav(100)
+
+    with pytest.raises(ValueError, match="no dates in common"):
+        parent.add_portfolio(late, 0.0, "Late")
+
+    assert len(parent.securities) == 1 and len(parent._children) == 1
+
+
+@pytest.mark.parametrize("method", ["normal", "bootstrap"])
+def test_projection(portfolio_fixture, method):
+    projector = NavProjector(portfolio_fixture)
+    projector.set_method(method, block_size=2)
+    projector.set_chunk_size(300)
+    projector.set_max_workers(1)
+    projector.set_seed(412843)
+
+    bands = projector.project(10, 1000)
+    _, tot_ret_idx = portfolio_fixture.securitize().get_timeseries().get_data()
+
+    assert bands.col_names == ["p5", "p25", "p50", "p75", "p95"]
+    assert bands.get_dates()[0] == np.datetime64("2020-01-06")
+    assert len(bands.get_dates()) == 11
+    npt.assert_allclose(bands.get_data()[0], tot_ret_idx[-1])
+    assert np.all(np.diff(bands.get_data()[1:], axis=1) >= 0)
+
+    projector.set_max_workers(2)
+
+    npt.assert_allclose(projector.project(10, 1000).get_data(), bands.get_data())
+
+
+@pytest.mark.parametrize("method", ["normal", "bootstrap"])
+def test_projection_histograms(portfolio_fixture, method):
+    projector = NavProjector(portfolio_fixture)
+    projector.set_method(method, block_size=2)
+    projector.set_chunk_size(3000)
+    projector.set_max_workers(1)
+    projector.set_seed(412843)
+
+    bands = projector.project(10, 20_000)
+    paths = projector.simulate(10, 20_000)
+    expected = np.percentile(paths, [5, 25, 50, 75, 95], axis=0).transpose()
+
+    npt.assert_allclose(bands.get_data()[1:], expected, rtol=1e-3)
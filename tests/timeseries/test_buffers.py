@@ -0,0 +1,69 @@
+from concurrent.futures import ProcessPoolExecutor
+import pickle
+
+import numpy as np
+import numpy.testing as npt
+
+from portana.data.simulated import SimConnection, SimEquityAssetType
+from portana.timeseries.analyzerseries import AnalyzerSeries
+from portana.timeseries import buffers
+from portana.timeseries.buffers import SharedPickle
+
+
+def get_security():
+    connection = SimConnection()
+    connection.set_asset_type(SimEquityAssetType())
+
+    return connection.get_security("15000", ("2010-01-01", "2020-12-31"))
+
+
+def sum_prices(shared):
+    return float(shared.load().get_timeseries().get_data()[0].sum())
+
+
+def test_out_of_band():
+    security = get_security()
+
+    buffers = []
+    payload = pickle.dumps(security, protocol=5, buffer_callback=buffers.append)
+    loaded = pickle.loads(payload, buffers=buffers)
+
+    # Dates, prices and total returns index are all sent out-of-band
+    assert len(buffers) == 3
+    assert len(payload) < 1000
+    assert loaded._schema is security._schema
+    assert loaded.get_exposures() == security.get_exposures()
+
+    for array, expected in zip(
+        (loaded.get_timeseries().get_dates(), *loaded.get_timeseries().get_data()),
+        (security.get_timeseries().get_dates(), *security.get_timeseries().get_data()),
+    ):
+        npt.assert_array_equal(array, expected)
+        assert array.dtype == expected.dtype
+
+    series = AnalyzerSeries(
+        np.arange(3).astype("datetime64[D]"), np.ones((3, 2), order="F"), ["a", "b"]
+    )
+    loaded = pickle.loads(pickle.dumps(series, protocol=5))
+
+    assert loaded.col_names == ["a", "b"]
+    assert loaded.results.flags.f_contiguous
+    npt.assert_array_equal(loaded.results, series.results)
+
+
+def test_shared_pickle():
+    security = get_security()
+    expected = float(security.get_timeseries().get_data()[0].sum())
+
+    with SharedPickle(security) as shared:
+        assert shared.nbytes == 3 * 8 * len(security.get_timeseries().get_dates())
+        assert len(pickle.dumps(shared)) < 1000
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(sum_prices, [shared] * 4))
+
+        assert results == [expected] * 4
+        assert sum_prices(shared) == expected
+
+    assert shared.name not in buffers._attached
+    assert shared.name not in buffers._created